@@ -10,6 +10,12 @@ def parse_args():
         prog='termux-cli',
         description='A local coding agent for your terminal'
     )
+    parser.add_argument(
+        'command',
+        nargs='?',
+        choices=['index'],
+        help='Run a maintenance command instead of the REPL (index: build the search indexes)'
+    )
     parser.add_argument(
         '--dir', '-d',
         type=str,
@@ -27,6 +33,11 @@ def parse_args():
         type=str,
         help='Path to config file'
     )
+    parser.add_argument(
+        '--semantic',
+        action='store_true',
+        help='With index: also build the semantic (vector) index; needs numpy'
+    )
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -38,9 +49,43 @@ def main():
     """Main entry point."""
     args = parse_args()
     
+    if args.command == 'index':
+        return cmd_index(args.dir, semantic=args.semantic)
+    
     from .repl import REPL
     repl = REPL(working_dir=args.dir, model=args.model)
     repl.run()
 
+def cmd_index(working_dir: str, semantic: bool = False) -> int:
+    """Build or refresh the trigram search and symbol indexes for a directory,
+    and the semantic index if asked."""
+    import time
+    from tools.search import Search
+    
+    start = time.time()
+    search = Search(working_dir, index=True)
+    stats = search.build_index()
+    print(f"Indexed {search.index.root} in {time.time() - start:.1f}s: "
+          f"{stats['added']} added, {stats['updated']} updated, {stats['removed']} removed "
+          f"({len(search.index.entries)} files)")
+    
+    start = time.time()
+    stats = search.build_symbols()
+    print(f"Indexed symbols in {time.time() - start:.1f}s: "
+          f"{stats['added']} added, {stats['updated']} updated, {stats['removed']} removed "
+          f"({len(search.symbols.files)} source files)")
+    
+    if semantic:
+        start = time.time()
+        try:
+            stats = search.build_vectors()
+        except ImportError as e:
+            print(f"Warning: Skipping semantic index: {e}")
+            return 1
+        print(f"Indexed embeddings in {time.time() - start:.1f}s: "
+              f"{stats['added']} added, {stats['updated']} updated, {stats['removed']} removed, "
+              f"{stats['embedded']} chunks embedded ({len(search.vectors.chunks)} chunks)")
+    return 0
+
 if __name__ == '__main__':
     main()
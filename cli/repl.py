@@ -11,10 +11,16 @@ class REPL:
         self.model = model
         self.running = False
         self.history = []
+        self.agent = None  # Created on the first prompt
+        self.slash_commands = None
+        self._search = None
+        self._completions = []
     
     def run(self):
         """Start the REPL loop."""
         self.running = True
+        self._get_agent()
+        self._setup_completion()
         self._print_welcome()
         
         while self.running:
@@ -27,11 +33,43 @@ class REPL:
                     self._handle_command(user_input)
                 else:
                     self._process_input(user_input)
-                    
+            
             except KeyboardInterrupt:
                 print("\nUse /exit to quit.")
             except EOFError:
                 break
+        
+        self.agent.session.close()
+        self.slash_commands.catalog.close()
+    
+    def _setup_completion(self):
+        """Complete @file references with the fuzzy finder on Tab."""
+        try:
+            import readline
+        except ImportError:
+            return
+        readline.set_completer_delims(" \t\n")
+        readline.set_completer(self._complete)
+        readline.parse_and_bind("tab: complete")
+    
+    def _complete(self, text: str, state: int) -> Optional[str]:
+        """readline completer for @ references."""
+        if not text.startswith("@"):
+            return None
+        if state == 0:
+            if self._search is None:
+                from tools.search import Search
+                self._search = Search(str(self.working_dir))
+            paths = self._search.fuzzy_find(text[1:], limit=20)
+            if len(paths) <= 1:
+                self._completions = ["@" + path for path in paths]
+            else:
+                # readline replaces the word with the candidates' common
+                # prefix; listing the typed text too keeps it as typed
+                self._completions = [text] + paths
+        if state < len(self._completions):
+            return self._completions[state]
+        return None
     
     def _print_welcome(self):
         """Print welcome message."""
@@ -41,17 +79,52 @@ class REPL:
         print("  Type /help for commands")
         print("="*50)
     
+    def _create_model(self):
+        """Chat model for the --model name; clients connect on first use."""
+        from config.defaults import DEFAULTS
+        name = self.model or DEFAULTS["model"]["name"]
+        if name.startswith("claude"):
+            from models.anthropic import AnthropicModel
+            return AnthropicModel(model=name)
+        if name.startswith(("gpt", "o1")):
+            from models.openai import OpenAIModel
+            return OpenAIModel(model=name)
+        from models.ollama import OllamaModel
+        return OllamaModel(model=name)
+    
+    def _get_agent(self):
+        """The agent that runs prompts, created at startup or on first use."""
+        if self.agent is None:
+            from core.agent import Agent
+            from core.session import Session
+            from prompts.snapshot import PromptSnapshotCache
+            from .slash_commands import SlashCommandRegistry
+            self.agent = Agent(str(self.working_dir), model=self._create_model())
+            # One FileOperations, so /undo and /rewind see the agent's checkpoints
+            self.slash_commands = SlashCommandRegistry(
+                str(self.working_dir), file_ops=self.agent.file_ops)
+            # Journal and index turns where /resume lists and searches them
+            self.agent.session = Session(store=self.slash_commands.sessions,
+                                         catalog=self.slash_commands.catalog)
+            # Served from the snapshot while no memory or command file changed
+            snapshot = PromptSnapshotCache(str(self.working_dir)).get(
+                self.agent.memory, self.slash_commands)
+            self.agent.system_prompt = snapshot.prompt
+        return self.agent
+    
     def _handle_command(self, cmd: str):
         """Handle slash commands."""
         from .commands import CommandRegistry
         command = CommandRegistry.get(cmd.split()[0])
         if command:
             command.execute()
-        else:
-            print(f"Unknown command: {cmd}")
+            return
+        memory = self._get_agent().memory
+        # The agent's memory is the conversation /compact and /resume act on
+        print(self.slash_commands.execute(cmd, memory))
     
     def _process_input(self, user_input: str):
         """Process user input through the agent."""
         self.history.append(user_input)
-        # Agent processing logic here
+        self._get_agent().run(user_input)
         print("Processing...")
@@ -9,11 +9,16 @@ Supports:
 
 import os
 import re
+from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Callable, Any
 from dataclasses import dataclass, field
 import frontmatter
 
+from utils.read_cache import get_read_cache
+
+SESSION_ID_PREFIX = re.compile(r'[0-9a-f][0-9a-f-]{7,}')
+
 @dataclass
 class SlashCommand:
     """Represents a slash command."""
@@ -31,10 +36,17 @@ class SlashCommandRegistry:
     
     PROJECT_COMMANDS_DIR = ".termux-cli/commands"
     USER_COMMANDS_DIR = "~/.termux-cli/commands"
+    SESSIONS_DIR = "~/.termux-cli/sessions"
+    CATALOG_PATH = "~/.termux-cli/sessions/catalog.db"
+    RESUME_TURNS = 50
     
-    def __init__(self, working_dir: str = "."):
+    def __init__(self, working_dir: str = ".", file_ops: Any = None):
         self.working_dir = Path(working_dir).resolve()
         self.commands: Dict[str, SlashCommand] = {}
+        self._sessions = None
+        self._catalog = None
+        # Pass the agent's FileOperations so /undo sees its current checkpoint
+        self._file_ops = file_ops
         self._register_builtins()
         self._load_custom_commands()
     
@@ -52,10 +64,12 @@ class SlashCommandRegistry:
             ("/model", "Select or change AI model", self._cmd_model),
             ("/mcp", "Manage MCP server connections", self._cmd_mcp),
             ("/permissions", "View or update permissions", self._cmd_permissions),
-            ("/resume", "Resume a conversation", self._cmd_resume),
+            ("/resume", "List, search or resume past sessions", self._cmd_resume),
             ("/review", "Request code review", self._cmd_review),
+            ("/rewind", "Undo the file changes of the last N turns", self._cmd_rewind),
             ("/status", "Show version, model, account info", self._cmd_status),
             ("/todos", "List current todo items", self._cmd_todos),
+            ("/undo", "Undo the file changes of the last turn", self._cmd_undo),
             ("/vim", "Enter vim mode", self._cmd_vim),
         ]
         
@@ -84,7 +98,7 @@ class SlashCommandRegistry:
         
         for md_file in directory.rglob("*.md"):
             try:
-                post = frontmatter.load(md_file)
+                post = frontmatter.loads(get_read_cache().read_text(md_file))
                 name = "/" + md_file.stem
                 
                 # Get namespace from subdirectory
@@ -107,6 +121,18 @@ class SlashCommandRegistry:
             except Exception as e:
                 print(f"Error loading command {md_file}: {e}")
     
+    def command_paths(self) -> List[Path]:
+        """Command directories, present or not, with their subdirectories
+        and command files: everything whose change alters the commands."""
+        paths = []
+        for directory in (self.working_dir / self.PROJECT_COMMANDS_DIR,
+                          Path(self.USER_COMMANDS_DIR).expanduser()):
+            paths.append(directory)
+            if directory.exists():
+                paths.extend(path for path in sorted(directory.rglob("*"))
+                             if path.is_dir() or path.suffix == ".md")
+        return paths
+    
     def execute(self, command_str: str, context: Any = None) -> str:
         """Execute a slash command."""
         parts = command_str.split(maxsplit=1)
@@ -149,7 +175,7 @@ class SlashCommandRegistry:
             filepath = match.group(1)
             full_path = self.working_dir / filepath
             try:
-                return full_path.read_text()
+                return get_read_cache().read_text(full_path)
             except:
                 return f"[File not found: {filepath}]"
         
@@ -192,7 +218,17 @@ class SlashCommandRegistry:
         return "__EXIT__"
     
     def _cmd_compact(self, args: str, ctx: Any) -> str:
-        return f"Compacting conversation... Focus: {args or 'general'}"
+        if ctx is None or getattr(ctx, "compactor", None) is None:
+            return "Nothing to compact: no conversation model configured"
+        try:
+            result = ctx.compact(focus=args)
+        except Exception as e:
+            return f"Compaction failed: {e}"
+        if not result.summarized:
+            return "Nothing to compact yet"
+        return (f"Compacted {result.summarized} messages (focus: {args or 'general'}): "
+                f"{result.tokens_before} -> {result.tokens_after} tokens "
+                f"(saved {result.saved})")
     
     def _cmd_config(self, args: str, ctx: Any) -> str:
         return "Opening configuration..."
@@ -215,17 +251,102 @@ class SlashCommandRegistry:
     def _cmd_permissions(self, args: str, ctx: Any) -> str:
         return "Permissions: file_ops, code_runner, shell, search, git_ops"
     
+    @property
+    def sessions(self):
+        """Session journal store, opened on first use."""
+        if self._sessions is None:
+            from core.journal import SessionStore
+            self._sessions = SessionStore(Path(self.SESSIONS_DIR).expanduser())
+        return self._sessions
+    
+    @property
+    def catalog(self):
+        """Full-text session catalog, opened on first use."""
+        if self._catalog is None:
+            from core.catalog import SessionCatalog
+            self._catalog = SessionCatalog(Path(self.CATALOG_PATH).expanduser())
+        return self._catalog
+    
     def _cmd_resume(self, args: str, ctx: Any) -> str:
-        return "__RESUME__"
+        if not args:
+            sessions = self.sessions.list_sessions(limit=10)
+            if not sessions:
+                return "No saved sessions"
+            lines = ["Recent sessions:\n"]
+            for info in sessions:
+                updated = datetime.fromtimestamp(info.updated_at).strftime("%Y-%m-%d %H:%M")
+                lines.append(f"  {info.session_id[:8]}  {updated}  {info.messages} messages")
+            lines.append("\nUse /resume <id> to continue a session")
+            return "\n".join(lines)
+        
+        query = args.strip()
+        # Only something that looks like a session ID is tried as one, so
+        # a search such as "add" cannot resume a session whose ID starts so
+        info = self.sessions.find(query) if SESSION_ID_PREFIX.fullmatch(query) else None
+        if info is None:
+            return self._search_sessions(query)
+        
+        journal = self.sessions.journal(info.session_id)
+        records = journal.read_last(self.RESUME_TURNS)
+        if ctx is not None and hasattr(ctx, "add"):
+            ctx.clear()
+            for record in records:
+                ctx.add(record["role"], record["content"])
+        return f"Resumed session {info.session_id[:8]} ({len(records)} of {len(journal)} messages)"
+    
+    def _search_sessions(self, query: str) -> str:
+        """Rank past sessions by full-text match on query."""
+        self.catalog.flush()  # Include this session's latest turns
+        hits = self.catalog.search(query)
+        if not hits:
+            return f"No session matching: {query}"
+        lines = [f"Sessions matching '{query}':\n"]
+        for hit in hits:
+            lines.append(f"  {hit.session_id[:8]}  {hit.title}")
+            if hit.snippet:
+                lines.append(f"            {hit.snippet}")
+        lines.append("\nUse /resume <id> to continue a session")
+        return "\n".join(lines)
     
     def _cmd_review(self, args: str, ctx: Any) -> str:
         return "Starting code review..."
     
+    @property
+    def file_ops(self):
+        """File tools whose checkpoints /undo and /rewind restore."""
+        if self._file_ops is None:
+            from tools.file_ops import FileOperations
+            self._file_ops = FileOperations(str(self.working_dir))
+        return self._file_ops
+    
+    def _cmd_rewind(self, args: str, ctx: Any) -> str:
+        try:
+            count = int(args) if args.strip() else 1
+        except ValueError:
+            return "Usage: /rewind <turns>"
+        if count < 1:
+            return "Usage: /rewind <turns>"
+        checkpoints = self.file_ops.checkpoints.list(count) if self.file_ops.checkpoints else []
+        if not checkpoints:
+            return "No checkpoints to rewind"
+        try:
+            files = self.file_ops.rewind(count)
+        except OSError as e:
+            return f"Rewind failed, no files changed: {e}"
+        turns = f"{len(checkpoints)} turn{'s' if len(checkpoints) != 1 else ''}"
+        if not files:
+            return f"Rewound {turns}; files already matched"
+        restored = f"{len(files)} file{'s' if len(files) != 1 else ''}"
+        return f"Rewound {turns}, restored {restored}:\n" + "\n".join(f"  {f}" for f in files)
+    
     def _cmd_status(self, args: str, ctx: Any) -> str:
         return "Termux-CLI v0.1.0 | Model: claude-3-sonnet | Status: Ready"
     
     def _cmd_todos(self, args: str, ctx: Any) -> str:
         return "No todos in current session"
     
+    def _cmd_undo(self, args: str, ctx: Any) -> str:
+        return self._cmd_rewind("1", ctx)
+    
     def _cmd_vim(self, args: str, ctx: Any) -> str:
         return "Entering vim mode..."
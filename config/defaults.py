@@ -22,13 +22,35 @@ DEFAULTS = {
         ],
         "shell": {
             "timeout": 60,
+            "persistent": False,  # One long-lived bash keeps cd, exports and venvs
             "blocked_commands": []
         },
         "code_runner": {
             "timeout": 30,
             "languages": ["python", "javascript", "bash"]
+        },
+        "search": {
+            # gitignore-style patterns skipped at any depth on top of .gitignore files
+            "ignore": [
+                ".git/",
+                "node_modules/",
+                "__pycache__/",
+                ".venv/",
+                "venv/",
+                ".tox/",
+                ".mypy_cache/",
+                ".pytest_cache/",
+                ".termux-cli/objects/",
+                ".termux-cli/checkpoints/"
+            ]
         }
     },
+    "memory": {
+        "auto_compact": True,
+        "compact_threshold": 0.8,  # Fraction of model.max_tokens
+        "compact_target": 0.5,  # Auto-compaction folds down to this fraction
+        "compact_keep_recent": 6
+    },
     "ui": {
         "theme": "default",
         "show_tokens": False,
@@ -3,14 +3,29 @@
 class Agent:
     """Main coding agent that orchestrates all operations."""
     
-    def __init__(self, working_dir: str = None):
+    def __init__(self, working_dir: str = None, model=None, session=None):
+        from tools.file_ops import FileOperations
+        from .memory import AgentMemory
+        
         self.working_dir = working_dir
-        self.memory = None
+        self.model = model
+        self.memory = AgentMemory(working_dir or ".")
+        if model is not None:
+            # /compact and auto-compaction summarize through the chat model
+            self.memory.enable_compaction(model)
+        self.session = session  # Journals turns for /resume when set
+        self.system_prompt = None
         self.tools = []
+        # Shared with the slash commands, so /undo restores this agent's edits
+        self.file_ops = FileOperations(working_dir or ".")
     
     def run(self, prompt: str):
         """Process a user prompt and execute actions."""
-        pass
+        # Each turn is a checkpoint: /undo restores the files it changed
+        self.file_ops.checkpoint(prompt[:80])
+        self.memory.add("user", prompt)
+        if self.session is not None:
+            self.session.add_message("user", prompt)
     
     def load_tools(self):
         """Load available tools."""
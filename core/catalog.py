@@ -0,0 +1,220 @@
+"""Session catalog - SQLite index of past conversations
+
+Stores sessions and messages in a WAL-mode SQLite database with an FTS5
+index over message content, so past sessions can be found by what was
+said in them. Inserts are queued and written in batches by a background
+thread; searches and listings run on the caller's connection.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    messages INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at, id);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, seq);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content, content='messages', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content)
+    VALUES ('delete', old.id, old.content);
+END;
+"""
+
+@dataclass
+class SessionHit:
+    """A session found by catalog search or listing."""
+    session_id: str
+    title: str
+    messages: int
+    updated_at: float
+    score: float = 0.0
+    snippet: str = ""
+
+class SessionCatalog:
+    """SQLite-backed session storage with full-text search."""
+    
+    BATCH_SIZE = 256
+    
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else (
+            Path.home() / ".termux-cli" / "sessions" / "catalog.db"
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = self._connect()
+        self.has_fts = self._init_schema()
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue()
+        self._seq: Dict[str, int] = {}
+        self._writer = threading.Thread(
+            target=self._write_loop, name="termux-cli-catalog", daemon=True
+        )
+        self._writer.start()
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _init_schema(self) -> bool:
+        """Create tables; returns False when SQLite lacks FTS5."""
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            try:
+                self._conn.executescript(FTS_SCHEMA)
+                return True
+            except sqlite3.OperationalError:
+                return False
+    
+    def add_message(self, session_id: str, role: str, content: str,
+                    ts: Optional[float] = None):
+        """Queue a message for the background writer."""
+        self._queue.put((session_id, role, content, ts or time.time()))
+    
+    def flush(self):
+        """Block until every queued message has been written."""
+        self._queue.join()
+    
+    def close(self):
+        """Write queued messages and stop the background writer."""
+        self._queue.put(None)
+        self._writer.join()
+        self._conn.close()
+    
+    def _write_loop(self):
+        """Drain the queue in batches, one transaction per batch."""
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while item is not None and len(batch) < self.BATCH_SIZE:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            
+            rows = [row for row in batch if row is not None]
+            try:
+                if rows:
+                    self._write_batch(conn, rows)
+            except sqlite3.Error as e:
+                print(f"Warning: Could not write session catalog: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            
+            if len(rows) != len(batch):
+                conn.close()
+                return
+    
+    def _write_batch(self, conn: sqlite3.Connection, rows: List[Tuple]):
+        with conn:
+            records = []
+            for session_id, role, content, ts in rows:
+                if session_id not in self._seq:
+                    last = conn.execute(
+                        "SELECT COALESCE(MAX(seq), -1) FROM messages WHERE session_id = ?",
+                        (session_id,)
+                    ).fetchone()[0]
+                    self._seq[session_id] = last + 1
+                records.append((session_id, self._seq[session_id], role, content, ts))
+                self._seq[session_id] += 1
+                
+                title = content[:80].splitlines()[0] if role == "user" and content else ""
+                conn.execute(
+                    "INSERT INTO sessions (id, created_at, updated_at, title, messages) "
+                    "VALUES (?, ?, ?, ?, 1) ON CONFLICT(id) DO UPDATE SET "
+                    "updated_at = excluded.updated_at, messages = messages + 1, "
+                    "title = CASE WHEN title = '' THEN excluded.title ELSE title END",
+                    (session_id, ts, ts, title)
+                )
+            conn.executemany(
+                "INSERT INTO messages (session_id, seq, role, content, ts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                records
+            )
+    
+    def list_sessions(self, limit: int = 20,
+                      before: Optional[Tuple[float, str]] = None) -> List[SessionHit]:
+        """List sessions, newest first.
+
+        Pass the (updated_at, session_id) of the last hit as ``before`` to get
+        the next page; keyset pagination keeps deep pages as fast as the first.
+        """
+        sql = "SELECT id, title, messages, updated_at FROM sessions"
+        params: List[Any] = []
+        if before is not None:
+            sql += " WHERE (updated_at, id) < (?, ?)"
+            params.extend(before)
+        sql += " ORDER BY updated_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return [SessionHit(*row) for row in self._conn.execute(sql, params)]
+    
+    def search(self, query: str, limit: int = 10) -> List[SessionHit]:
+        """Find sessions whose messages match query, best match first."""
+        terms = [t.replace('"', '""') for t in query.split()]
+        if not terms:
+            return []
+        
+        if self.has_fts:
+            match = " ".join(f'"{t}"' for t in terms)
+            rows = self._conn.execute(
+                # LIMIT -1 stops SQLite from flattening the CTE, which keeps
+                # bm25() inside the FTS query without AS MATERIALIZED (3.35+);
+                # MIN() makes SQLite take the snippet from each session's best hit
+                "WITH hits AS ("
+                "  SELECT m.session_id AS session_id, bm25(messages_fts) AS score, "
+                "         snippet(messages_fts, 0, '[', ']', '...', 12) AS snippet "
+                "  FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+                "  WHERE messages_fts MATCH ? LIMIT -1) "
+                "SELECT s.id, s.title, s.messages, s.updated_at, MIN(hits.score), hits.snippet "
+                "FROM hits JOIN sessions s ON s.id = hits.session_id "
+                "GROUP BY s.id ORDER BY 5, s.updated_at DESC LIMIT ?",
+                (match, limit)
+            ).fetchall()
+        else:
+            clause = " AND ".join("m.content LIKE ?" for _ in terms)
+            rows = self._conn.execute(
+                "SELECT s.id, s.title, s.messages, s.updated_at, -COUNT(*), "
+                "       substr(MAX(m.content), 1, 80) "
+                f"FROM messages m JOIN sessions s ON s.id = m.session_id WHERE {clause} "
+                "GROUP BY s.id ORDER BY 5, s.updated_at DESC LIMIT ?",
+                [f"%{t}%" for t in terms] + [limit]
+            ).fetchall()
+        return [SessionHit(*row) for row in rows]
+    
+    def read_last(self, session_id: str, n: int) -> List[Dict[str, Any]]:
+        """Read the last n messages of a session in conversation order."""
+        rows = self._conn.execute(
+            "SELECT role, content, ts FROM messages WHERE session_id = ? "
+            "ORDER BY seq DESC LIMIT ?",
+            (session_id, n)
+        ).fetchall()
+        return [{"role": r, "content": c, "ts": ts} for r, c, ts in reversed(rows)]
@@ -0,0 +1,94 @@
+"""Compactor - Folds older conversation turns into a rolling summary
+
+Only the turns added since the previous compaction are sent to the model,
+together with the current summary, so compaction cost stays proportional to
+new history instead of the whole session.
+
+Automatic compaction has hysteresis: it starts when the context reaches
+the threshold and folds turns until it is down to the lower target. If
+pinned messages and the summary keep it above the threshold anyway, it
+waits for the context to grow by the gap between the two before calling
+the model again, instead of calling it on every new message.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from config.defaults import DEFAULTS
+from prompts.system import COMPACT_PROMPT
+
+from .conversation import ConversationWindow
+
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+
+@dataclass
+class CompactResult:
+    """Outcome of a compaction."""
+    tokens_before: int
+    tokens_after: int
+    summarized: int  # Number of messages folded into the summary
+    
+    @property
+    def saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+class Compactor:
+    """Summarizes conversation history through a chat model."""
+    
+    def __init__(self, model, keep_recent: Optional[int] = None,
+                 threshold: Optional[float] = None, max_tokens: Optional[int] = None,
+                 target: Optional[float] = None):
+        memory_config = DEFAULTS["memory"]
+        self.model = model
+        self.keep_recent = (
+            keep_recent if keep_recent is not None else memory_config["compact_keep_recent"]
+        )
+        self.threshold = threshold if threshold is not None else memory_config["compact_threshold"]
+        self.max_tokens = max_tokens or DEFAULTS["model"]["max_tokens"]
+        self.target = target if target is not None else memory_config["compact_target"]
+        self.target = min(self.target, self.threshold)
+        self._rearm_at = 0  # Context size at which auto-compaction may run again
+    
+    def should_compact(self, window: ConversationWindow) -> bool:
+        """Check whether the context crossed the auto-compaction threshold."""
+        limit = self.threshold * self.max_tokens
+        if window.total_tokens < limit:
+            self._rearm_at = 0
+            return False
+        return window.total_tokens >= self._rearm_at
+    
+    def maybe_compact(self, window: ConversationWindow) -> Optional[CompactResult]:
+        """Compact down to the target only when the threshold is crossed."""
+        if not self.should_compact(window):
+            return None
+        result = self.compact(window, target_tokens=int(self.target * self.max_tokens))
+        self._rearm_at = window.total_tokens + (self.threshold - self.target) * self.max_tokens
+        return result
+    
+    def compact(self, window: ConversationWindow, focus: str = "",
+                target_tokens: Optional[int] = None) -> CompactResult:
+        """Fold everything but the most recent turns into the summary, and
+        with target_tokens, recent turns too until the context fits it."""
+        tokens_before = window.total_tokens
+        turns = window.foldable(self.keep_recent, target_tokens)
+        if not turns:
+            return CompactResult(tokens_before, tokens_before, 0)
+        
+        previous = ""
+        if window.summary is not None:
+            previous = window.summary[1]["content"][len(SUMMARY_HEADER):]
+        
+        summary = self.model.chat(self._build_messages(previous, turns, focus)).strip()
+        window.fold(len(turns), SUMMARY_HEADER + summary)
+        return CompactResult(tokens_before, window.total_tokens, len(turns))
+    
+    def _build_messages(self, previous: str, turns: List[Dict[str, Any]],
+                        focus: str) -> List[Dict[str, str]]:
+        """Build the summarization request."""
+        transcript = "\n\n".join(f"{m['role']}: {m['content']}" for m in turns)
+        prompt = COMPACT_PROMPT.format(
+            focus=f"Focus especially on: {focus}\n" if focus else "",
+            summary=previous or "(none yet)",
+            turns=transcript,
+        )
+        return [{"role": "user", "content": prompt}]
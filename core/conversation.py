@@ -0,0 +1,174 @@
+"""Conversation window - Token-budgeted message history
+
+Keeps per-message token counts and running totals so the context sent to a
+model can be cut to a budget without re-counting the whole history. Pinned
+messages (system prompts, tool-critical results) are always included, and
+the oldest turns are evicted to a JSONL file once too many are held in RAM.
+The file only backs this window: it is removed on clear(), close(), and
+when the window is garbage collected or the process exits.
+"""
+
+import json
+import heapq
+import weakref
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+MESSAGE_OVERHEAD = 4  # Tokens for role and message framing
+
+def estimate_tokens(text: str) -> int:
+    """Estimate token count (same heuristic as BaseModel.count_tokens)."""
+    return len(text) // 4
+
+# (sequence number, message, token count)
+Entry = Tuple[int, Dict[str, Any], int]
+
+class ConversationWindow:
+    """Message history with running token totals and disk eviction."""
+    
+    def __init__(self, max_messages: int = 1000, spill_path: Optional[Path] = None,
+                 count_tokens: Callable[[str], int] = estimate_tokens):
+        self.max_messages = max_messages
+        self.spill_path = Path(spill_path) if spill_path else None
+        self.count_tokens = count_tokens
+        self._recent: Deque[Entry] = deque()
+        self._pinned: List[Entry] = []
+        self._seq = 0
+        self.total_tokens = 0  # Resident messages only
+        self.pinned_tokens = 0
+        self.evicted = 0
+        self.summary: Optional[Entry] = None
+        self._finalizer = weakref.finalize(self, _remove_spill, self.spill_path)
+    
+    def add(self, role: str, content: str, pinned: bool = False) -> Dict[str, Any]:
+        """Append a message; system messages are always pinned."""
+        message = {"role": role, "content": content}
+        tokens = self.count_tokens(content) + MESSAGE_OVERHEAD
+        entry = (self._seq, message, tokens)
+        self._seq += 1
+        
+        if pinned or role == "system":
+            self._pinned.append(entry)
+            self.pinned_tokens += tokens
+        else:
+            self._recent.append(entry)
+        self.total_tokens += tokens
+        
+        if len(self._recent) > self.max_messages:
+            self._evict(len(self._recent) - self.max_messages)
+        return message
+    
+    def get_context(self, max_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get pinned messages plus the newest messages that fit the budget.
+
+        Walks back only over the k messages that end up in the window, so
+        the cost does not grow with the length of the history.
+        """
+        if max_tokens is None:
+            return self.messages
+        
+        budget = max_tokens - self.pinned_tokens
+        selected: List[Entry] = []
+        for entry in reversed(self._recent):
+            if entry[2] > budget:
+                break
+            budget -= entry[2]
+            selected.append(entry)
+        selected.reverse()
+        
+        return [message for _, message, _ in heapq.merge(self._pinned, selected)]
+    
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """All resident messages in conversation order."""
+        return [message for _, message, _ in heapq.merge(self._pinned, self._recent)]
+    
+    def foldable(self, keep_recent: int,
+                 target_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Unpinned messages older than the last keep_recent turns; with
+        target_tokens, also as many newer ones (never the newest) as it
+        takes to bring the window down to that size."""
+        count = max(len(self._recent) - keep_recent, 0)
+        if target_tokens is not None:
+            remaining = self.total_tokens - sum(self._recent[i][2] for i in range(count))
+            while remaining > target_tokens and count < len(self._recent) - 1:
+                remaining -= self._recent[count][2]
+                count += 1
+        return [self._recent[i][1] for i in range(count)]
+    
+    def fold(self, count: int, summary: str):
+        """Replace the oldest count unpinned messages with a summary message.
+        
+        The summary is pinned and takes the place of any previous summary, so
+        it always sits just before the turns that were kept.
+        """
+        folded = [self._recent.popleft() for _ in range(count)]
+        for _, _, tokens in folded:
+            self.total_tokens -= tokens
+        
+        seq = folded[-1][0] if folded else -1
+        if self.summary is not None:
+            self._pinned.remove(self.summary)
+            self.pinned_tokens -= self.summary[2]
+            self.total_tokens -= self.summary[2]
+            seq = max(seq, self.summary[0])
+        
+        message = {"role": "user", "content": summary}
+        tokens = self.count_tokens(summary) + MESSAGE_OVERHEAD
+        self.summary = (seq, message, tokens)
+        self._pinned.append(self.summary)
+        self._pinned.sort(key=lambda entry: entry[0])
+        self.pinned_tokens += tokens
+        self.total_tokens += tokens
+    
+    def __len__(self) -> int:
+        return len(self._pinned) + len(self._recent)
+    
+    def _evict(self, count: int):
+        """Move the oldest unpinned messages out of memory."""
+        evicted = [self._recent.popleft() for _ in range(count)]
+        for _, _, tokens in evicted:
+            self.total_tokens -= tokens
+        self.evicted += count
+        
+        if self.spill_path is None:
+            return
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            for seq, message, tokens in evicted:
+                f.write(json.dumps({"seq": seq, "tokens": tokens, **message}) + "\n")
+    
+    def evicted_messages(self) -> Iterator[Dict[str, Any]]:
+        """Read back messages that were evicted to disk, oldest first."""
+        if self.spill_path is None or not self.spill_path.exists():
+            return
+        with open(self.spill_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                yield {"role": record["role"], "content": record["content"]}
+    
+    def clear(self):
+        """Drop all messages, including the eviction file."""
+        self._recent.clear()
+        self._pinned = []
+        self.total_tokens = 0
+        self.pinned_tokens = 0
+        self.evicted = 0
+        self.summary = None
+        _remove_spill(self.spill_path)
+    
+    def close(self):
+        """Delete the eviction file; the evicted turns cannot be read back."""
+        self._finalizer()
+
+def _remove_spill(path: Optional[Path]):
+    """Delete a spill file if there is one."""
+    if path is None:
+        return
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Warning: Could not remove {path}: {e}")
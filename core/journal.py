@@ -0,0 +1,215 @@
+"""Session journal - Append-only JSONL session storage
+
+Each session is a JSONL journal plus an offset index (one little-endian
+uint64 per record). Appends are buffered and written, indexed and fsynced
+from a timer so they never block the REPL. Reading the last N turns seeks
+into the index and mmaps only the tail of the journal.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+OFFSET = struct.Struct("<Q")
+
+@dataclass
+class SessionInfo:
+    """Summary of a stored session."""
+    session_id: str
+    path: Path
+    messages: int
+    size: int
+    updated_at: float
+
+class SessionJournal:
+    """Append-only journal for one session."""
+    
+    def __init__(self, path: Path, flush_interval: float = 1.0):
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix(".idx")
+        self.flush_interval = flush_interval
+        self._pending: List[bytes] = []
+        self._writing: List[bytes] = []  # Batch a flush is writing right now
+        self._lock = threading.Lock()  # Guards the queues and counters; no I/O under it
+        self._io_lock = threading.Lock()  # Serializes flushes
+        self._timer: Optional[threading.Timer] = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._recover()
+    
+    def _recover(self):
+        """Bring the index in line with the journal after a crash."""
+        size = self.path.stat().st_size if self.path.exists() else 0
+        offsets = array("Q")
+        if self.index_path.exists():
+            data = self.index_path.read_bytes()
+            offsets.frombytes(data[:len(data) - len(data) % OFFSET.size])
+            if sys.byteorder != "little":
+                offsets.byteswap()
+        
+        # Drop index entries past the end of the journal
+        while offsets and offsets[-1] >= size:
+            offsets.pop()
+        
+        # Re-scan from the last indexed record, which may itself be partial
+        start = offsets.pop() if offsets else 0
+        tail = b""
+        if size > start:
+            with open(self.path, "rb") as f:
+                f.seek(start)
+                tail = f.read()
+        pos = 0
+        while True:
+            newline = tail.find(b"\n", pos)
+            if newline < 0:
+                break
+            offsets.append(start + pos)
+            pos = newline + 1
+        
+        # Cut off a partially written trailing record
+        if start + pos < size:
+            with open(self.path, "r+b") as f:
+                f.truncate(start + pos)
+        
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        self.index_path.write_bytes(offsets.tobytes())
+        self._count = len(offsets)
+        self._size = start + pos
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count + len(self._writing) + len(self._pending)
+    
+    def append(self, message: Dict[str, Any]):
+        """Queue a message; it is written by the next timed flush."""
+        record = dict(message)
+        record.setdefault("ts", time.time())
+        line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            self._pending.append(line)
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def flush(self):
+        """Write queued records, extend the index and fsync both files.
+        
+        Only swapping the queue happens under the lock append() takes; the
+        writes and fsyncs run outside it so they never stall the REPL.
+        """
+        with self._io_lock:
+            with self._lock:
+                self._timer = None
+                pending, self._pending = self._pending, []
+                if not pending:
+                    return
+                self._writing = pending
+                size = self._size
+            
+            offsets = []
+            for line in pending:
+                offsets.append(OFFSET.pack(size))
+                size += len(line)
+            with open(self.path, "ab") as f:
+                f.write(b"".join(pending))
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.index_path, "ab") as f:
+                f.write(b"".join(offsets))
+                f.flush()
+                os.fsync(f.fileno())
+            
+            with self._lock:
+                self._count += len(pending)
+                self._size = size
+                self._writing = []
+    
+    def close(self):
+        """Cancel the flush timer and write everything still queued."""
+        with self._lock:
+            timer = self._timer
+        if timer is not None:
+            timer.cancel()
+        self.flush()
+    
+    def read_last(self, n: int) -> List[Dict[str, Any]]:
+        """Read the last n records without parsing the rest of the journal.
+        
+        Records not flushed yet are taken from memory, so reading never
+        waits for a write.
+        """
+        with self._lock:
+            count, size = self._count, self._size
+            queued = self._writing + self._pending
+        if n <= 0:
+            return []
+        records = [json.loads(line) for line in queued[-n:]]
+        n = min(n - len(records), count)
+        if n <= 0:
+            return records
+        
+        with open(self.index_path, "rb") as f:
+            f.seek((count - n) * OFFSET.size)
+            start = OFFSET.unpack(f.read(OFFSET.size))[0]
+        
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                tail = mm[start:size]
+        return [json.loads(line) for line in tail.splitlines() if line] + records
+
+class SessionStore:
+    """Directory of session journals (~/.termux-cli/sessions by default)."""
+    
+    def __init__(self, root: Optional[Path] = None, flush_interval: float = 1.0):
+        self.root = Path(root) if root else Path.home() / ".termux-cli" / "sessions"
+        self.flush_interval = flush_interval
+        self._journals: Dict[str, SessionJournal] = {}
+    
+    def journal(self, session_id: str) -> SessionJournal:
+        """Get (or create) the journal for a session."""
+        if session_id not in self._journals:
+            self._journals[session_id] = SessionJournal(
+                self.root / f"{session_id}.jsonl", self.flush_interval
+            )
+        return self._journals[session_id]
+    
+    def list_sessions(self, limit: Optional[int] = None) -> List[SessionInfo]:
+        """List stored sessions, most recently updated first."""
+        if not self.root.exists():
+            return []
+        
+        sessions = []
+        for path in self.root.glob("*.jsonl"):
+            stat = path.stat()
+            index = path.with_suffix(".idx")
+            count = index.stat().st_size // OFFSET.size if index.exists() else 0
+            sessions.append(SessionInfo(
+                session_id=path.stem,
+                path=path,
+                messages=count,
+                size=stat.st_size,
+                updated_at=stat.st_mtime
+            ))
+        sessions.sort(key=lambda s: s.updated_at, reverse=True)
+        return sessions[:limit] if limit else sessions
+    
+    def find(self, prefix: str) -> Optional[SessionInfo]:
+        """Find the most recent session whose ID starts with prefix."""
+        for info in self.list_sessions():
+            if info.session_id.startswith(prefix):
+                return info
+        return None
+    
+    def close(self):
+        """Flush all open journals."""
+        for journal in self._journals.values():
+            journal.close()
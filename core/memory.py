@@ -9,10 +9,17 @@ Hierarchical memory system inspired by Claude Code:
 
 import os
 import re
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
+from utils.read_cache import get_read_cache
+from .conversation import ConversationWindow
+from .relevance import SectionIndex
+
+Fingerprint = Tuple[int, int, int]  # (mtime_ns, size, inode)
+
 @dataclass
 class MemoryFile:
     """Represents a memory file."""
@@ -21,6 +28,201 @@ class MemoryFile:
     scope: str  # enterprise, project, user, local
     priority: int  # Higher = more precedence
 
+class MemoryCache:
+    """Stat fingerprints of the memory files read, over the shared read cache.
+    
+    Only (mtime_ns, size, inode) is kept per path, to count hits and to tell
+    the watcher what changed; contents live once, in the shared read cache.
+    """
+    
+    def __init__(self):
+        self._entries: Dict[Path, Fingerprint] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def fingerprint(path: Path) -> Optional[Fingerprint]:
+        """Get the stat fingerprint of a file, or None if it is missing."""
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def read(self, path: Path) -> str:
+        """Read a file, reusing the cached content if its fingerprint matches."""
+        fp = self.fingerprint(path)
+        if fp is None:
+            self._entries.pop(path, None)
+            raise FileNotFoundError(f"No such file: {path}")
+        
+        if self._entries.get(path) == fp:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._entries[path] = fp
+        return get_read_cache().read_text(path)
+    
+    def invalidate(self, path: Optional[Path] = None):
+        """Drop one entry, or the whole cache when no path is given."""
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(path, None)
+    
+    def stats(self) -> Dict[str, int]:
+        """Get cache hit/miss counters."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+@dataclass
+class ImportNode:
+    """A parsed memory file: its lines and the @imports they reference."""
+    path: Path
+    source: str
+    lines: List[str]
+    imports: Dict[int, Tuple[str, Path]]  # line index -> (reference, resolved path)
+
+class ImportGraph:
+    """Resolves @imports between memory files as a graph.
+    
+    Each file is read and parsed at most once per load, a file imported from
+    several places is inlined only the first time it is reached, and cycles are
+    reported instead of being expanded until the depth cap.
+    """
+    
+    IMPORT_PATTERN = re.compile(r'^@([^\s]+)$')
+    MAX_DEPTH = 5
+    
+    def __init__(self, cache: MemoryCache):
+        self.cache = cache
+        self._parsed: Dict[Path, ImportNode] = {}
+        self.reset()
+    
+    def reset(self):
+        """Start a new load: forget visited files, emitted imports and cycles."""
+        self.nodes: Dict[Path, Optional[ImportNode]] = {}
+        self.edges: Dict[Path, List[Path]] = {}
+        # top-level path -> (emitted before, emitted after, cycles found)
+        self.expansions: Dict[Path, Tuple[frozenset, frozenset, List[List[Path]]]] = {}
+        self.restart()
+    
+    def restart(self):
+        """Start expanding the top-level files again, keeping parsed nodes."""
+        self.emitted: set = set()
+        self.cycles: List[List[Path]] = []
+    
+    def invalidate(self, paths) -> set:
+        """Forget the nodes of changed files; returns them plus every file
+        that imports them, directly or not."""
+        importers: Dict[Path, List[Path]] = {}
+        for source, targets in self.edges.items():
+            for target in targets:
+                importers.setdefault(target, []).append(source)
+        affected = set()
+        stack = list(paths)
+        while stack:
+            path = stack.pop()
+            if path not in affected:
+                affected.add(path)
+                stack.extend(importers.get(path, []))
+        for path in paths:
+            self.nodes.pop(path, None)
+            self.edges.pop(path, None)
+        return affected
+    
+    def reuse(self, path: Path) -> bool:
+        """Replay a top-level file's previous expansion if it started from
+        the same emitted imports; False if it must be expanded again."""
+        path = path.resolve()
+        record = self.expansions.get(path)
+        if record is None or record[0] != self.emitted:
+            return False
+        self.emitted = set(record[1])
+        self.cycles.extend(record[2])
+        return True
+    
+    @staticmethod
+    def resolve(reference: str, base_dir: Path) -> Path:
+        """Resolve an @import reference relative to the importing file."""
+        # Handle home directory
+        if reference.startswith('~'):
+            return Path(reference).expanduser().resolve()
+        return (base_dir / reference).resolve()
+    
+    def node(self, path: Path) -> Optional[ImportNode]:
+        """Get the parsed node for a file, or None if it cannot be read."""
+        if path in self.nodes:
+            return self.nodes[path]
+        
+        try:
+            source = self.cache.read(path)
+        except (OSError, UnicodeDecodeError):
+            self._parsed.pop(path, None)
+            self.nodes[path] = None
+            return None
+        
+        node = self._parsed.get(path)
+        if node is None or node.source is not source:
+            node = self._parse(path, source)
+            self._parsed[path] = node
+        self.nodes[path] = node
+        self.edges[path] = [target for _, target in node.imports.values()]
+        return node
+    
+    def _parse(self, path: Path, source: str) -> ImportNode:
+        """Split a file into lines and find its @import references."""
+        lines = source.split('\n')
+        imports = {}
+        for i, line in enumerate(lines):
+            match = self.IMPORT_PATTERN.match(line.strip())
+            if match:
+                reference = match.group(1)
+                imports[i] = (reference, self.resolve(reference, path.parent))
+        return ImportNode(path=path, source=source, lines=lines, imports=imports)
+    
+    def expand(self, path: Path) -> str:
+        """Expand a top-level memory file with all of its imports inlined."""
+        path = path.resolve()
+        node = self.node(path)
+        if node is None:
+            raise FileNotFoundError(f"No such file: {path}")
+        before = frozenset(self.emitted)
+        found = len(self.cycles)
+        self.emitted.add(path)
+        content = self._expand(node, 0, [path])
+        self.expansions[path] = (before, frozenset(self.emitted), self.cycles[found:])
+        return content
+    
+    def _expand(self, node: ImportNode, depth: int, stack: List[Path]) -> str:
+        if depth > self.MAX_DEPTH:  # Max recursion depth
+            return node.source
+        
+        result_lines = []
+        for i, line in enumerate(node.lines):
+            if i not in node.imports:
+                result_lines.append(line)
+                continue
+            
+            reference, target = node.imports[i]
+            if target in stack:
+                self.cycles.append(stack[stack.index(target):] + [target])
+                result_lines.append(f"# [Import cycle: {reference}]")
+                continue
+            if target in self.emitted:
+                result_lines.append(f"# Imported from {reference} (included above)")
+                continue
+            
+            imported = self.node(target)
+            if imported is None:
+                result_lines.append(f"# [Import not found: {reference}]")
+                continue
+            
+            self.emitted.add(target)
+            result_lines.append(f"# Imported from {reference}")
+            result_lines.append(self._expand(imported, depth + 1, stack + [target]))
+        
+        return '\n'.join(result_lines)
+
 class AgentMemory:
     """Manages hierarchical memory using AGENTS.md files."""
     
@@ -31,13 +233,31 @@ class AgentMemory:
     def __init__(self, working_dir: str = "."):
         self.working_dir = Path(working_dir).resolve()
         self.memory_files: List[MemoryFile] = []
-        self.messages: List[Dict[str, Any]] = []
+        self.conversation = ConversationWindow(spill_path=self._history_path())
+        self.compactor = None
+        self.auto_compact = False
         self.context: Dict[str, Any] = {}
+        self.cache = MemoryCache()
+        self.imports = ImportGraph(self.cache)
+        # path -> expanded content from the previous load
+        self._expanded: Dict[Path, str] = {}
+        # path -> (content, rendered prompt section)
+        self._sections: Dict[Path, Tuple[str, str]] = {}
+        self._system_prompt: Optional[str] = None
+        self._section_index: Optional[SectionIndex] = None
+        self._lock = threading.RLock()
+        self.watcher = None
         self._load_all_memories()
     
     def _load_all_memories(self):
         """Load all memory files in priority order."""
+        with self._lock:
+            self._reload()
+    
+    def _reload(self):
+        previous = self.memory_files
         self.memory_files = []
+        self.imports.reset()
         
         # 1. Enterprise policy (lowest priority, loaded first)
         enterprise_paths = self._get_enterprise_paths()
@@ -57,6 +277,93 @@ class AgentMemory:
         local_path = self.working_dir / self.LOCAL_MEMORY_FILENAME
         if local_path.exists():
             self._load_memory_file(local_path, "local", 4)
+        
+        if not self._same_files(previous, self.memory_files):
+            self._system_prompt = None
+            self._section_index = None
+    
+    @staticmethod
+    def _same_files(old: List[MemoryFile], new: List[MemoryFile]) -> bool:
+        """Check whether a reload produced exactly the same memory files."""
+        if len(old) != len(new):
+            return False
+        return all(
+            a.path == b.path and a.scope == b.scope and a.content is b.content
+            for a, b in zip(old, new)
+        )
+    
+    def watched_paths(self) -> List[Path]:
+        """All paths that can affect memory, including transitive @imports.
+        
+        Candidate locations that do not exist yet are included so that newly
+        created memory files are picked up too.
+        """
+        paths = list(self._get_enterprise_paths())
+        paths.append(Path.home() / self.PROJECT_DIR / self.MEMORY_FILENAME)
+        paths.extend(self._project_memory_candidates())
+        paths.append(self.working_dir / self.LOCAL_MEMORY_FILENAME)
+        paths.extend(mem.path for mem in self.memory_files)
+        paths.extend(self.imports.nodes)
+        return list(dict.fromkeys(paths))
+    
+    def start_watching(self, interval: float = 1.0, use_inotify: bool = True):
+        """Hot-reload memory files in the background as they change on disk."""
+        from .watcher import FileWatcher
+        
+        if self.watcher is not None:
+            return self.watcher
+        self.watcher = FileWatcher(self._on_files_changed, interval, use_inotify)
+        self.watcher.watch(self.watched_paths())
+        self.watcher.start()
+        return self.watcher
+    
+    def stop_watching(self):
+        """Stop the background memory file watcher."""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+    
+    def _on_files_changed(self, paths):
+        """Patch the loaded memory after watched files changed."""
+        with self._lock:
+            loaded = {mem.path for mem in self.memory_files}
+            if any(path.exists() != (path in loaded) for path in paths
+                   if path in self._top_level_candidates()):
+                # A memory file appeared or went away
+                self._reload()
+            else:
+                self._reload_changed(paths)
+            if self.watcher is not None:
+                self.watcher.watch(self.watched_paths())
+    
+    def _reload_changed(self, paths):
+        """Re-read only the changed files and re-expand the memory files
+        that import them; the rest keep their previous expansion."""
+        previous = self.memory_files
+        affected = self.imports.invalidate({p.resolve() for p in paths} | set(paths))
+        self.imports.restart()
+        self.memory_files = []
+        for mem in previous:
+            if mem.path.resolve() not in affected and self.imports.reuse(mem.path):
+                self.memory_files.append(mem)
+            else:
+                self._load_memory_file(mem.path, mem.scope, mem.priority)
+        
+        if not self._same_files(previous, self.memory_files):
+            self._system_prompt = None
+            self._section_index = None
+    
+    def _top_level_candidates(self) -> set:
+        """Every path a memory file (not an import) can be loaded from."""
+        paths = set(self._get_enterprise_paths())
+        paths.add(Path.home() / self.PROJECT_DIR / self.MEMORY_FILENAME)
+        paths.update(self._project_memory_candidates())
+        paths.add(self.working_dir / self.LOCAL_MEMORY_FILENAME)
+        return paths
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Get memory cache hit/miss counters."""
+        return self.cache.stats()
     
     def _get_enterprise_paths(self) -> List[Path]:
         """Get enterprise memory paths for current OS."""
@@ -74,21 +381,22 @@ class AgentMemory:
             return [Path("C:/Program Files/TermuxCLI/AGENTS.md")]
         return []
     
-    def _load_project_memories(self):
-        """Load project memories, recursing up from cwd."""
+    def _project_memory_candidates(self) -> List[Path]:
+        """Possible project memory paths, from cwd upwards."""
         current = self.working_dir
-        found_memories = []
+        candidates = []
         
         # Walk up the directory tree
         while current != current.parent:
-            # Check for AGENTS.md in directory
-            for mem_path in [
-                current / self.MEMORY_FILENAME,
-                current / self.PROJECT_DIR / self.MEMORY_FILENAME,
-            ]:
-                if mem_path.exists():
-                    found_memories.append(mem_path)
+            candidates.append(current / self.MEMORY_FILENAME)
+            candidates.append(current / self.PROJECT_DIR / self.MEMORY_FILENAME)
             current = current.parent
+        return candidates
+    
+    def _load_project_memories(self):
+        """Load project memories, recursing up from cwd."""
+        # Check for AGENTS.md in each directory
+        found_memories = [p for p in self._project_memory_candidates() if p.exists()]
         
         # Load in reverse order (higher directories first)
         for i, path in enumerate(reversed(found_memories)):
@@ -97,10 +405,15 @@ class AgentMemory:
     def _load_memory_file(self, path: Path, scope: str, priority: int):
         """Load a single memory file."""
         try:
-            content = path.read_text(encoding="utf-8")
-            
             # Process imports (@path/to/file)
-            content = self._process_imports(content, path.parent)
+            content = self.imports.expand(path)
+            
+            # Keep the previous string when nothing changed so cached
+            # prompt sections stay valid
+            previous = self._expanded.get(path)
+            if previous is not None and previous == content:
+                content = previous
+            self._expanded[path] = content
             
             self.memory_files.append(MemoryFile(
                 path=path,
@@ -111,64 +424,95 @@ class AgentMemory:
         except Exception as e:
             print(f"Warning: Could not load memory file {path}: {e}")
     
-    def _process_imports(self, content: str, base_dir: Path, depth: int = 0) -> str:
-        """Process @import references in memory files."""
-        if depth > 5:  # Max recursion depth
-            return content
+    def get_system_prompt(self, query: Optional[str] = None,
+                          max_tokens: Optional[int] = None, top_k: int = 8) -> str:
+        """Get combined memory content for system prompt.
         
-        pattern = r'^@([^\s]+)$'
-        lines = content.split('\n')
-        result_lines = []
-        
-        for line in lines:
-            match = re.match(pattern, line.strip())
-            if match:
-                import_path = match.group(1)
-                
-                # Handle home directory
-                if import_path.startswith('~'):
-                    full_path = Path(import_path).expanduser()
-                else:
-                    full_path = base_dir / import_path
-                
-                if full_path.exists():
-                    imported_content = full_path.read_text(encoding="utf-8")
-                    imported_content = self._process_imports(
-                        imported_content, full_path.parent, depth + 1
-                    )
-                    result_lines.append(f"# Imported from {import_path}")
-                    result_lines.append(imported_content)
-                else:
-                    result_lines.append(f"# [Import not found: {import_path}]")
-            else:
-                result_lines.append(line)
+        With a query, only pinned sections and the top_k sections most
+        relevant to it (within max_tokens) are included.
+        """
+        with self._lock:
+            if query is None:
+                return self._build_system_prompt()
+            return self._build_relevant_prompt(query, max_tokens, top_k)
+    
+    def _build_relevant_prompt(self, query: str, max_tokens: Optional[int], top_k: int) -> str:
+        if self._section_index is None:
+            ordered = sorted(self.memory_files, key=lambda m: m.priority)
+            self._section_index = SectionIndex(ordered)
         
-        return '\n'.join(result_lines)
+        lines = []
+        current = None
+        for section in self._section_index.select(query, max_tokens, top_k):
+            if section.file_index != current:
+                if current is not None:
+                    lines.append("")
+                lines.append(f"# Memory ({section.scope}): {section.path.name}")
+                current = section.file_index
+            lines.append(section.text)
+        return "\n".join(lines)
     
-    def get_system_prompt(self) -> str:
-        """Get combined memory content for system prompt."""
+    def _build_system_prompt(self) -> str:
+        if self._system_prompt is not None:
+            return self._system_prompt
+        
         # Sort by priority (higher priority = later = overrides)
         sorted_memories = sorted(self.memory_files, key=lambda m: m.priority)
         
         sections = []
         for mem in sorted_memories:
-            sections.append(f"# Memory ({mem.scope}): {mem.path.name}")
-            sections.append(mem.content)
-            sections.append("")
+            cached = self._sections.get(mem.path)
+            if cached is None or cached[0] is not mem.content:
+                rendered = f"# Memory ({mem.scope}): {mem.path.name}\n{mem.content}\n"
+                cached = (mem.content, rendered)
+                self._sections[mem.path] = cached
+            sections.append(cached[1])
         
-        return "\n".join(sections)
+        self._system_prompt = "\n".join(sections)
+        return self._system_prompt
+    
+    def _history_path(self) -> Path:
+        """File that evicted conversation turns are written to."""
+        import uuid
+        return Path.home() / self.PROJECT_DIR / "history" / f"{uuid.uuid4().hex}.jsonl"
+    
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """Conversation messages held in memory."""
+        return self.conversation.messages
     
-    def add(self, role: str, content: str):
+    def add(self, role: str, content: str, pinned: bool = False):
         """Add message to conversation memory."""
-        self.messages.append({"role": role, "content": content})
+        self.conversation.add(role, content, pinned=pinned)
+        
+        if self.auto_compact and self.compactor is not None:
+            try:
+                self.compactor.maybe_compact(self.conversation)
+            except Exception as e:
+                print(f"Warning: Auto-compaction failed: {e}")
+    
+    def enable_compaction(self, model, auto: Optional[bool] = None, **kwargs):
+        """Summarize older turns through model, optionally when the context fills up."""
+        from config.defaults import DEFAULTS
+        from .compactor import Compactor
+        
+        self.compactor = Compactor(model, **kwargs)
+        self.auto_compact = DEFAULTS["memory"]["auto_compact"] if auto is None else auto
+        return self.compactor
     
-    def get_context(self) -> List[Dict[str, Any]]:
-        """Get conversation messages."""
-        return self.messages
+    def compact(self, focus: str = ""):
+        """Fold older conversation turns into the rolling summary."""
+        if self.compactor is None:
+            raise RuntimeError("No model configured for compaction")
+        return self.compactor.compact(self.conversation, focus)
+    
+    def get_context(self, max_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get conversation messages, newest first within a token budget."""
+        return self.conversation.get_context(max_tokens)
     
     def clear(self):
         """Clear conversation memory."""
-        self.messages = []
+        self.conversation.clear()
     
     def init_project_memory(self) -> Path:
         """Initialize AGENTS.md for current project."""
@@ -217,6 +561,9 @@ class AgentMemory:
         new_content = existing.rstrip() + "\n\n- " + content + "\n"
         path.write_text(new_content, encoding="utf-8")
         
-        # Reload memories
+        # Reload memories (only the edited file misses the cache)
         self._load_all_memories()
         return True
+
+# Backwards-compatible name exported by the core package
+Memory = AgentMemory
@@ -0,0 +1,132 @@
+"""Relevance filter - Select only the memory sections a prompt needs
+
+Memory files are split into sections at markdown headings and ranked
+against the user's message with BM25. Pinned sections (enterprise policy
+and headings tagged ``[pinned]``) are always included; the best matching
+remaining sections are added until the token budget is used up.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .conversation import estimate_tokens
+
+HEADING_PATTERN = re.compile(r'^#{1,6}\s+(.*)$')
+TOKEN_PATTERN = re.compile(r'[a-z0-9_]+')
+PIN_TAG = "[pinned]"
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used for ranking."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+@dataclass
+class MemorySection:
+    """A heading and its body within a memory file."""
+    path: Path
+    scope: str
+    file_index: int  # Position of the memory file in the prompt
+    order: int  # Position of the section within its file
+    heading: str
+    text: str
+    tokens: int
+    pinned: bool
+
+class SectionIndex:
+    """BM25 index over memory file sections."""
+    
+    K1 = 1.2
+    B = 0.75
+    
+    def __init__(self, memory_files):
+        self.sections: List[MemorySection] = []
+        for file_index, mem in enumerate(memory_files):
+            self.sections.extend(self._split(mem, file_index))
+        
+        # Inverted index: term -> [(section index, term frequency)]
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+        for i, section in enumerate(self.sections):
+            terms = tokenize(section.text)
+            self._lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self._postings.setdefault(term, []).append((i, tf))
+        total = sum(self._lengths)
+        self._avg_length = total / len(self._lengths) if self._lengths else 0.0
+    
+    @staticmethod
+    def _split(mem, file_index: int) -> List[MemorySection]:
+        """Split a memory file at headings, ignoring fenced code blocks."""
+        sections = []
+        heading = ""
+        lines: List[str] = []
+        in_fence = False
+        
+        def close():
+            text = "\n".join(lines).strip("\n")
+            if text.strip():
+                sections.append(MemorySection(
+                    path=mem.path,
+                    scope=mem.scope,
+                    file_index=file_index,
+                    order=len(sections),
+                    heading=heading,
+                    text=text,
+                    tokens=estimate_tokens(text),
+                    pinned=mem.scope == "enterprise" or PIN_TAG in heading.lower()
+                ))
+        
+        for line in mem.content.split("\n"):
+            if line.lstrip().startswith("```"):
+                in_fence = not in_fence
+            match = None if in_fence else HEADING_PATTERN.match(line)
+            if match:
+                close()
+                heading = match.group(1).strip()
+                lines = []
+            lines.append(line)
+        close()
+        return sections
+    
+    def score(self, query: str) -> Dict[int, float]:
+        """BM25 score of every section that shares a term with query."""
+        scores: Dict[int, float] = {}
+        n = len(self.sections)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = 1 - self.B + self.B * self._lengths[i] / (self._avg_length or 1)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.K1 + 1) / (tf + self.K1 * norm)
+        return scores
+    
+    def select(self, query: str, max_tokens: Optional[int] = None,
+               top_k: int = 8) -> List[MemorySection]:
+        """Pinned sections plus the top-k relevant ones that fit the budget."""
+        selected = [s for s in self.sections if s.pinned]
+        budget = None if max_tokens is None else max_tokens - sum(s.tokens for s in selected)
+        
+        scores = self.score(query)
+        ranked = sorted(
+            (i for i in scores if not self.sections[i].pinned),
+            key=lambda i: scores[i],
+            reverse=True
+        )
+        added = 0
+        for i in ranked:
+            if added >= top_k:
+                break
+            section = self.sections[i]
+            if budget is not None:
+                if section.tokens > budget:
+                    continue
+                budget -= section.tokens
+            selected.append(section)
+            added += 1
+        
+        return sorted(selected, key=lambda s: (s.file_index, s.order))
@@ -1,21 +1,63 @@
 """Session management - Handles agent sessions"""
 
 from datetime import datetime
-from typing import Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .conversation import ConversationWindow
+from .journal import SessionStore
 
 class Session:
     """Manages an agent session with context and history."""
     
-    def __init__(self, session_id: Optional[str] = None):
+    def __init__(self, session_id: Optional[str] = None,
+                 store: Optional[SessionStore] = None, catalog=None):
         self.session_id = session_id or self._generate_id()
         self.created_at = datetime.now()
-        self.messages = []
+        self.conversation = ConversationWindow(
+            spill_path=Path.home() / ".termux-cli" / "history" / f"{self.session_id}.jsonl"
+        )
+        self.store = store
+        self.journal = store.journal(self.session_id) if store else None
+        self.catalog = catalog  # Optional SessionCatalog for full-text search
+    
+    @classmethod
+    def resume(cls, store: SessionStore, session_id: Optional[str] = None,
+               last_n: int = 50) -> Optional['Session']:
+        """Reopen a stored session (the latest by default) with its last N turns."""
+        info = store.find(session_id) if session_id else next(iter(store.list_sessions()), None)
+        if info is None:
+            return None
+        
+        session = cls(info.session_id, store)
+        for record in session.journal.read_last(last_n):
+            session.conversation.add(record["role"], record["content"])
+        return session
     
     def _generate_id(self) -> str:
         """Generate unique session ID."""
         import uuid
         return str(uuid.uuid4())
     
-    def add_message(self, role: str, content: str):
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """Session messages held in memory."""
+        return self.conversation.messages
+    
+    def add_message(self, role: str, content: str, pinned: bool = False):
         """Add a message to session history."""
-        self.messages.append({'role': role, 'content': content})
+        message = self.conversation.add(role, content, pinned=pinned)
+        if self.journal is not None:
+            self.journal.append(message)
+        if self.catalog is not None:
+            self.catalog.add_message(self.session_id, role, content)
+    
+    def get_context(self, max_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get session messages that fit within a token budget."""
+        return self.conversation.get_context(max_tokens)
+    
+    def close(self):
+        """Flush the session journal to disk and drop the eviction file."""
+        if self.journal is not None:
+            self.journal.close()
+        self.conversation.close()
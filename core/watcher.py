@@ -0,0 +1,193 @@
+"""File watcher - Background change detection for memory files
+
+Uses inotify on Linux (including Termux) and falls back to polling stat
+fingerprints where inotify is not available.
+"""
+
+import os
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from .memory import Fingerprint, MemoryCache
+
+class Inotify:
+    """Minimal ctypes wrapper around the Linux inotify API."""
+    
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+                  IN_MOVED_TO | IN_CREATE | IN_DELETE)
+    EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+    
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[Path, int] = {}
+        self._wds: Dict[int, Path] = {}
+    
+    @classmethod
+    def create(cls) -> Optional["Inotify"]:
+        """Create an inotify instance, or None if the platform lacks it."""
+        try:
+            return cls()
+        except (OSError, AttributeError, TypeError):
+            return None
+    
+    def watch_dirs(self, directories: Set[Path]) -> Set[Path]:
+        """Watch exactly these directories; return the ones being watched."""
+        for directory in list(self._dirs):
+            if directory not in directories:
+                wd = self._dirs.pop(directory)
+                self._wds.pop(wd, None)
+                self._libc.inotify_rm_watch(self.fd, wd)
+        
+        for directory in directories:
+            if directory in self._dirs:
+                continue
+            wd = self._libc.inotify_add_watch(
+                self.fd, os.fsencode(str(directory)), self.WATCH_MASK
+            )
+            if wd >= 0:
+                self._dirs[directory] = wd
+                self._wds[wd] = directory
+        return set(self._dirs)
+    
+    def read(self, timeout: float) -> Set[Path]:
+        """Wait up to timeout seconds and return the paths that had events."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        
+        paths = set()
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            wd, _, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            directory = self._wds.get(wd)
+            if directory is not None and name:
+                paths.add(directory / os.fsdecode(name))
+        return paths
+    
+    def close(self):
+        """Close the inotify file descriptor."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class FileWatcher:
+    """Watches a set of files and reports the ones whose contents changed.
+
+    Changes are confirmed against stat fingerprints, so with inotify only the
+    paths named in events (plus files in unwatchable directories) are stat'ed,
+    and in poll mode a cycle costs one stat per watched file.
+    """
+    
+    def __init__(self, on_change: Callable[[Set[Path]], None],
+                 interval: float = 1.0, use_inotify: bool = True):
+        self.on_change = on_change
+        self.interval = interval
+        self._fingerprints: Dict[Path, Optional[Fingerprint]] = {}
+        self._unwatched: Set[Path] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify = Inotify.create() if use_inotify else None
+    
+    @property
+    def backend(self) -> str:
+        """Name of the change-detection backend in use."""
+        return "inotify" if self._inotify else "poll"
+    
+    @property
+    def paths(self) -> List[Path]:
+        """Currently watched paths."""
+        return list(self._fingerprints)
+    
+    def watch(self, paths: Iterable[Path]):
+        """Replace the watched set, keeping fingerprints of known paths."""
+        with self._lock:
+            fingerprints = {}
+            for path in paths:
+                if path in self._fingerprints:
+                    fingerprints[path] = self._fingerprints[path]
+                else:
+                    fingerprints[path] = MemoryCache.fingerprint(path)
+            self._fingerprints = fingerprints
+            
+            if self._inotify:
+                watched = self._inotify.watch_dirs({p.parent for p in fingerprints})
+                self._unwatched = {p for p in fingerprints if p.parent not in watched}
+            else:
+                self._unwatched = set(fingerprints)
+    
+    def check(self, candidates: Optional[Iterable[Path]] = None) -> Set[Path]:
+        """Compare fingerprints and return the watched paths that changed."""
+        changed = set()
+        with self._lock:
+            paths = self._fingerprints if candidates is None else candidates
+            for path in paths:
+                if path not in self._fingerprints:
+                    continue
+                fp = MemoryCache.fingerprint(path)
+                if fp != self._fingerprints[path]:
+                    self._fingerprints[path] = fp
+                    changed.add(path)
+        return changed
+    
+    def start(self):
+        """Start watching in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="termux-cli-watcher", daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the watcher thread and release inotify resources."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+    
+    def _run(self):
+        """Watch loop."""
+        while not self._stop.is_set():
+            if self._inotify:
+                candidates = self._inotify.read(self.interval) | self._unwatched
+            else:
+                self._stop.wait(self.interval)
+                candidates = None
+            
+            if self._stop.is_set():
+                break
+            
+            changed = self.check(candidates)
+            if changed:
+                try:
+                    self.on_change(changed)
+                except Exception as e:
+                    print(f"Warning: File watcher callback failed: {e}")
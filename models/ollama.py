@@ -50,6 +50,18 @@ class OllamaModel(BaseModel):
                 if "message" in data and "content" in data["message"]:
                     yield data["message"]["content"]
     
+    def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """Embed texts in one request (model defaults to self.model)."""
+        response = requests.post(
+            f"{self.base_url}/api/embed",
+            json={
+                "model": model or self.model,
+                "input": texts
+            }
+        )
+        response.raise_for_status()
+        return response.json()["embeddings"]
+    
     def list_models(self) -> List[str]:
         """List available Ollama models."""
         response = requests.get(f"{self.base_url}/api/tags")
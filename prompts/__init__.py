@@ -2,5 +2,12 @@
 
 from .system import SYSTEM_PROMPT, get_system_prompt
 from .templates import PromptTemplate
+from .snapshot import PromptSnapshot, PromptSnapshotCache
 
-__all__ = ['SYSTEM_PROMPT', 'get_system_prompt', 'PromptTemplate']
+__all__ = [
+    'SYSTEM_PROMPT',
+    'get_system_prompt',
+    'PromptTemplate',
+    'PromptSnapshot',
+    'PromptSnapshotCache'
+]
@@ -0,0 +1,142 @@
+"""Prompt snapshots - Persistent cache of the assembled system prompt
+
+The full system prompt (base prompt, AGENTS.md memory and the custom slash
+commands) is stored under ~/.termux-cli/cache/ together with the list of
+files and directories it was built from.
+The snapshot key hashes the working directory, the platform and the stat
+fingerprint of every input file, so an unchanged project is served from the
+snapshot with a handful of stat calls and without reading any memory file.
+With repo_map_tokens set, a repo map (tools.repo_map) is appended and its
+git-based cache key joins the snapshot key.
+"""
+
+import hashlib
+import json
+import os
+import platform as platform_module
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from .system import SYSTEM_PROMPT, get_system_prompt
+
+SNAPSHOT_VERSION = 1
+
+@dataclass
+class PromptSnapshot:
+    """An assembled system prompt and where it came from."""
+    prompt: str
+    tokens: int
+    key: Optional[str]  # None when the snapshot cannot be validated later
+    inputs: List[str]
+    cached: bool = False
+
+class PromptSnapshotCache:
+    """Loads or rebuilds the system prompt snapshot for a working directory."""
+    
+    def __init__(self, working_dir: str = ".", platform: Optional[str] = None,
+                 cache_dir: Optional[Path] = None, repo_map_tokens: int = 0):
+        self.working_dir = Path(working_dir).resolve()
+        self.platform = platform or platform_module.system().lower()
+        self.cache_dir = Path(cache_dir) if cache_dir else Path.home() / ".termux-cli" / "cache"
+        name = hashlib.sha256(f"{self.working_dir}\0{self.platform}".encode()).hexdigest()
+        self.path = self.cache_dir / f"prompt-{name[:16]}.json"
+        self.repo_map_tokens = repo_map_tokens  # 0 leaves the repo map out
+        self._repo_map = None
+    
+    @property
+    def repo_map(self):
+        """The working directory's RepoMap, created on first use."""
+        if self._repo_map is None:
+            from tools.repo_map import RepoMap
+            self._repo_map = RepoMap(str(self.working_dir))
+        return self._repo_map
+    
+    def compute_key(self, inputs: List[str]) -> Optional[str]:
+        """Hash the inputs' fingerprints with the working dir and platform.
+        
+        None if the repo map is enabled but cannot be keyed (outside git).
+        """
+        from core.memory import MemoryCache
+        
+        hasher = hashlib.sha256()
+        hasher.update(f"{SNAPSHOT_VERSION}\0{self.working_dir}\0{self.platform}\0".encode())
+        if self.repo_map_tokens:
+            map_key = self.repo_map.cache_key()
+            if map_key is None:
+                return None
+            hasher.update(f"map\0{self.repo_map_tokens}\0{map_key}\0".encode())
+        hasher.update(hashlib.sha256(SYSTEM_PROMPT.encode()).digest())
+        for path in inputs:
+            hasher.update(f"{path}\0{MemoryCache.fingerprint(Path(path))}\0".encode())
+        return hasher.hexdigest()
+    
+    def load(self) -> Optional[PromptSnapshot]:
+        """Return the stored snapshot if it is intact and still current."""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") != SNAPSHOT_VERSION:
+                return None
+            prompt = data["prompt"]
+            checksum = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+            if checksum != data["checksum"]:
+                return None
+            inputs = list(data["inputs"])
+            key = self.compute_key(inputs)
+            if key is None or key != data["key"]:
+                return None
+            return PromptSnapshot(prompt, int(data["tokens"]), data["key"], inputs, cached=True)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def build(self, memory=None, commands=None) -> PromptSnapshot:
+        """Assemble the prompt from scratch and store a new snapshot.
+        
+        commands is a SlashCommandRegistry whose custom commands are listed.
+        """
+        from core.conversation import estimate_tokens
+        from core.memory import AgentMemory
+        
+        if memory is None:
+            memory = AgentMemory(str(self.working_dir))
+        prompt = get_system_prompt(str(self.working_dir), self.platform)
+        memory_prompt = memory.get_system_prompt()
+        if memory_prompt:
+            prompt = f"{prompt}\n{memory_prompt}"
+        if commands is not None:
+            lines = [f"- {c.name} {c.argument_hint}".rstrip() + f": {c.description}"
+                     for c in commands.list_commands() if c.source != "built-in"]
+            if lines:
+                prompt = f"{prompt}\n# Custom Commands\n" + "\n".join(lines) + "\n"
+        if self.repo_map_tokens:
+            repo_map = self.repo_map.get(self.repo_map_tokens)
+            if repo_map:
+                prompt = f"{prompt}\n{repo_map}\n"
+        
+        paths = memory.watched_paths() + (commands.command_paths() if commands else [])
+        inputs = [str(p) for p in paths]
+        snapshot = PromptSnapshot(prompt, estimate_tokens(prompt), self.compute_key(inputs), inputs)
+        self._store(snapshot)
+        return snapshot
+    
+    def get(self, memory=None, commands=None) -> PromptSnapshot:
+        """Serve the stored snapshot, rebuilding it if stale or corrupt."""
+        return self.load() or self.build(memory, commands)
+    
+    def _store(self, snapshot: PromptSnapshot):
+        """Write the snapshot atomically; failures only cost a rebuild later."""
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "key": snapshot.key,
+            "inputs": snapshot.inputs,
+            "tokens": snapshot.tokens,
+            "checksum": hashlib.sha256(snapshot.prompt.encode("utf-8")).hexdigest(),
+            "prompt": snapshot.prompt,
+        }
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Warning: Could not write prompt snapshot: {e}")
@@ -49,3 +49,17 @@ Please analyze the error and either:
 1. Suggest a fix and retry
 2. Explain why the action cannot be completed
 '''
+
+COMPACT_PROMPT = '''
+You maintain a running summary of a coding session between a user and an agent.
+Update the summary with the new conversation turns below. Keep decisions made,
+files touched, commands run, open problems and user preferences. Drop chatter.
+{focus}
+Current summary:
+{summary}
+
+New turns:
+{turns}
+
+Respond with the updated summary only.
+'''
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Benchmark grep, directory walking and symbol indexing in tools.search
+
+Usage:
+    python scripts/bench_search.py [DIR] [--pattern REGEX] [--files N]
+                                   [--node-modules N]
+
+Without DIR a synthetic tree of N source files, plus a gitignored
+node_modules holding N more, is generated in a temporary directory. Each configuration runs once to warm the page cache and is then
+timed over several repeats; the best time is reported.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools.search import Search
+from tools.symbols import SymbolIndex
+from tools.walker import Walker
+
+WORDS = ["config", "load", "save", "user", "session", "retry", "backoff", "token",
+         "parse", "index", "render", "cache", "buffer", "stream", "client", "server"]
+
+def make_tree(root: Path, files: int, lines: int = 400):
+    """Generate a synthetic source tree."""
+    rng = random.Random(42)
+    for i in range(files):
+        directory = root / f"pkg{i % 50}" / f"mod{i % 7}"
+        directory.mkdir(parents=True, exist_ok=True)
+        body = []
+        for n in range(lines):
+            a, b = rng.choice(WORDS), rng.choice(WORDS)
+            body.append(f"def {a}_{b}_{n}(value):  # {rng.choice(WORDS)} handling")
+        (directory / f"file{i}.py").write_text("\n".join(body) + "\n")
+
+def make_node_modules(root: Path, files: int):
+    """Generate a gitignored node_modules with many small packages."""
+    (root / ".gitignore").write_text("node_modules/\n")
+    for i in range(files):
+        package = root / "node_modules" / f"pkg{i // 20}" / "lib"
+        package.mkdir(parents=True, exist_ok=True)
+        (package / f"index{i % 20}.js").write_text(f"module.exports = {i};\n")
+
+def timed(fn, repeats: int):
+    """Best wall-clock time of fn over repeats (after one warm-up)."""
+    result = fn()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def bench_grep(root: Path, pattern: str, repeats: int):
+    baseline = None
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        search = Search(str(root), workers=workers)
+        elapsed, matches = timed(lambda: search.grep(pattern), repeats)
+        baseline = baseline or elapsed
+        print(f"grep workers={workers:<3} {elapsed * 1000:9.1f} ms  "
+              f"{len(matches):7d} matches  speedup {baseline / elapsed:4.1f}x")
+
+def bench_walk(root: Path, repeats: int):
+    """Compare a plain rglob with the ignore-aware walker."""
+    elapsed, paths = timed(lambda: [p for p in root.rglob("*") if p.is_file()], repeats)
+    print(f"walk {'rglob':<17} {elapsed * 1000:9.1f} ms  {len(paths):7d} files")
+    for label, walker in (("Walker (no rules)", Walker(str(root), ignore=[], gitignore=False)),
+                          ("Walker", Walker(str(root)))):
+        elapsed, entries = timed(lambda: list(walker.walk()), repeats)
+        print(f"walk {label:<17} {elapsed * 1000:9.1f} ms  {len(entries):7d} files")
+
+def bench_symbols(root: Path, name: str):
+    """Cold symbol index builds per worker count, a no-op refresh and lookups."""
+    with tempfile.TemporaryDirectory() as cache:
+        for workers in sorted({1, os.cpu_count() or 1}):
+            index_path = Path(cache, f"{workers}.symbols")
+            index = SymbolIndex(str(root), index_path=index_path, workers=workers)
+            start = time.perf_counter()
+            index.update()
+            elapsed = time.perf_counter() - start
+            print(f"symbols build workers={workers:<3} {elapsed * 1000:9.1f} ms  "
+                  f"{len(index.files):7d} files")
+        
+        elapsed, _ = timed(index.update, 1)
+        print(f"symbols refresh         {elapsed * 1000:9.1f} ms")
+        elapsed, found = timed(lambda: index.find_definition(name), 3)
+        print(f"find_definition         {elapsed * 1000:9.1f} ms  {len(found):7d} found")
+        elapsed, found = timed(lambda: index.find_references(name), 3)
+        print(f"find_references         {elapsed * 1000:9.1f} ms  {len(found):7d} found")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dir", nargs="?", help="Directory to search")
+    parser.add_argument("--pattern", default=r"retry_\w+_\d+", help="Regex to search for")
+    parser.add_argument("--files", type=int, default=2000, help="Synthetic tree size")
+    parser.add_argument("--node-modules", type=int, default=20000,
+                        help="Files in the synthetic node_modules")
+    parser.add_argument("--symbol", default="load", help="Name to look up in the symbol index")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    
+    if args.dir:
+        bench_walk(Path(args.dir), args.repeats)
+        bench_grep(Path(args.dir), args.pattern, args.repeats)
+        bench_symbols(Path(args.dir), args.symbol)
+        return
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        make_tree(Path(tmpdir), args.files)
+        make_node_modules(Path(tmpdir), args.node_modules)
+        bench_walk(Path(tmpdir), args.repeats)
+        bench_grep(Path(tmpdir), args.pattern, args.repeats)
+        bench_symbols(Path(tmpdir), args.symbol)
+
+if __name__ == "__main__":
+    main()
@@ -48,3 +48,240 @@ class TestSession:
         session = Session()
         assert session.session_id is not None
         assert len(session.session_id) > 0
+    
+    def test_session_context_budget(self):
+        """Test session context is cut to a token budget."""
+        from core.session import Session
+        session = Session()
+        session.add_message("system", "You are helpful")
+        for i in range(10):
+            session.add_message("user", f"message {i} " + "x" * 40)
+        context = session.get_context(max_tokens=40)
+        assert context[0]["role"] == "system"
+        assert context[-1]["content"].startswith("message 9")
+        assert len(context) < len(session.messages)
+
+class TestConversationWindow:
+    """Tests for ConversationWindow."""
+    
+    def test_budget_keeps_newest_and_pinned(self):
+        """Test newest messages fill the budget and pinned ones are kept."""
+        from core.conversation import ConversationWindow
+        window = ConversationWindow(count_tokens=len)
+        window.add("system", "s" * 10)
+        window.add("user", "a" * 50)
+        window.add("tool", "t" * 10, pinned=True)
+        window.add("user", "b" * 20)
+        window.add("assistant", "c" * 20)
+        
+        # 14 (system) + 14 (tool) pinned, leaves room for the last two turns
+        context = window.get_context(max_tokens=80)
+        assert [m["role"] for m in context] == ["system", "tool", "user", "assistant"]
+        assert window.total_tokens == 130
+    
+    def test_eviction_to_disk(self):
+        """Test old turns are evicted to the spill file."""
+        from core.conversation import ConversationWindow
+        with tempfile.TemporaryDirectory() as tmpdir:
+            spill = Path(tmpdir) / "history.jsonl"
+            window = ConversationWindow(max_messages=3, spill_path=spill)
+            window.add("system", "rules")
+            for i in range(5):
+                window.add("user", f"turn {i}")
+            
+            assert len(window) == 4
+            assert window.messages[0]["content"] == "rules"
+            assert window.evicted == 2
+            evicted = list(window.evicted_messages())
+            assert [m["content"] for m in evicted] == ["turn 0", "turn 1"]
+            window.clear()
+            assert not spill.exists()
+            
+            # The spill file goes with the window, and at process exit
+            window = ConversationWindow(max_messages=1, spill_path=spill)
+            window.add("user", "a")
+            window.add("user", "b")
+            assert spill.exists()
+            del window
+            assert not spill.exists()
+
+class TestCompactor:
+    """Tests for conversation compaction."""
+    
+    def _model(self):
+        class SummaryModel:
+            """Stand-in for a BaseModel that records summarization requests."""
+            
+            def __init__(self):
+                self.requests = []
+            
+            def chat(self, messages, **kwargs):
+                self.requests.append(messages[-1]["content"])
+                return f"summary {len(self.requests)}"
+        
+        return SummaryModel()
+    
+    def test_compact_is_incremental(self):
+        """Test only turns since the last compaction are summarized."""
+        from core.memory import AgentMemory
+        with tempfile.TemporaryDirectory() as tmpdir:
+            memory = AgentMemory(tmpdir)
+            model = self._model()
+            memory.enable_compaction(model, auto=False, keep_recent=2)
+            for i in range(6):
+                memory.add("user", f"turn {i} " + "x" * 200)
+            
+            result = memory.compact()
+            assert result.summarized == 4
+            assert result.tokens_after < result.tokens_before
+            assert memory.messages[0]["content"].endswith("summary 1")
+            assert len(memory.messages) == 3
+            
+            memory.add("user", "turn 6")
+            memory.add("user", "turn 7")
+            result = memory.compact(focus="git hooks")
+            assert result.summarized == 2
+            assert "turn 0" not in model.requests[1]
+            assert "summary 1" in model.requests[1]
+            assert "git hooks" in model.requests[1]
+            assert memory.messages[0]["content"].endswith("summary 2")
+    
+    def test_auto_compact_threshold(self):
+        """Test compaction triggers when the context crosses the threshold."""
+        from core.memory import AgentMemory
+        with tempfile.TemporaryDirectory() as tmpdir:
+            memory = AgentMemory(tmpdir)
+            memory.enable_compaction(
+                self._model(), auto=True, keep_recent=1, threshold=0.5, max_tokens=200
+            )
+            memory.add("user", "x" * 200)
+            assert memory.compactor is not None
+            assert memory.conversation.summary is None
+            memory.add("user", "y" * 200)
+            assert memory.conversation.summary is not None
+            assert memory.conversation.total_tokens < 100
+    
+    def test_auto_compact_hysteresis(self):
+        """Test auto-compaction folds to the target and does not re-run per message."""
+        from core.memory import AgentMemory
+        with tempfile.TemporaryDirectory() as tmpdir:
+            memory = AgentMemory(tmpdir)
+            model = self._model()
+            memory.enable_compaction(model, auto=True, keep_recent=6, threshold=0.8,
+                                     target=0.4, max_tokens=1000)
+            for i in range(8):
+                memory.add("user", f"turn {i} " + "x" * 400)
+            # keep_recent alone would leave ~600 tokens; the target folds more
+            assert len(model.requests) == 1
+            assert memory.conversation.total_tokens <= 400
+            
+            # Pinned text keeps the context over the threshold after folding
+            memory.add("system", "rules " * 600)
+            memory.add("user", "a")
+            assert len(model.requests) == 2
+            for i in range(5):
+                memory.add("user", "b" * 40)
+            assert len(model.requests) == 2  # Waits for the context to grow first
+            memory.add("user", "c" * 1600)
+            assert len(model.requests) == 3
+
+class TestSessionJournal:
+    """Tests for the append-only session journal."""
+    
+    def test_resume_last_turns(self):
+        """Test a stored session is reopened with only its last turns."""
+        from core.journal import SessionStore
+        from core.session import Session
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SessionStore(Path(tmpdir), flush_interval=60)
+            session = Session(store=store)
+            for i in range(20):
+                session.add_message("user", f"turn {i}")
+            session.close()
+            
+            assert store.list_sessions()[0].messages == 20
+            resumed = Session.resume(SessionStore(Path(tmpdir)), last_n=5)
+            assert resumed.session_id == session.session_id
+            assert [m["content"] for m in resumed.messages] == [
+                f"turn {i}" for i in range(15, 20)
+            ]
+    
+    def test_recover_after_crash(self):
+        """Test a torn trailing record and a stale index are repaired."""
+        from core.journal import SessionJournal
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "s.jsonl"
+            journal = SessionJournal(path)
+            journal.append({"role": "user", "content": "one"})
+            journal.append({"role": "user", "content": "two"})
+            journal.close()
+            
+            with open(path, "ab") as f:
+                f.write(b'{"role": "user", "content": "three"}\n{"role": "us')
+            
+            journal = SessionJournal(path)
+            assert len(journal) == 3
+            assert [r["content"] for r in journal.read_last(2)] == ["two", "three"]
+            assert path.read_bytes().endswith(b"\n")
+    
+    def test_append_does_not_wait_for_fsync(self, monkeypatch):
+        """Test appends and reads proceed while a flush is blocked in fsync."""
+        import os
+        import threading
+        from core.journal import SessionJournal
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "s.jsonl"
+            journal = SessionJournal(path, flush_interval=60)
+            journal.append({"role": "user", "content": "one"})
+            
+            entered, release = threading.Event(), threading.Event()
+            real_fsync = os.fsync
+            
+            def slow_fsync(fd):
+                entered.set()
+                release.wait(5)
+                real_fsync(fd)
+            
+            monkeypatch.setattr(os, "fsync", slow_fsync)
+            flusher = threading.Thread(target=journal.flush)
+            flusher.start()
+            try:
+                assert entered.wait(5)
+                journal.append({"role": "user", "content": "two"})
+                assert len(journal) == 2
+                assert [r["content"] for r in journal.read_last(5)] == ["one", "two"]
+            finally:
+                release.set()
+                flusher.join()
+            monkeypatch.undo()
+            journal.close()
+            assert [r["content"] for r in SessionJournal(path).read_last(5)] == ["one", "two"]
+
+class TestSessionCatalog:
+    """Tests for the SQLite session catalog."""
+    
+    def test_search_and_paginate(self):
+        """Test ranked full-text search and keyset pagination."""
+        from core.catalog import SessionCatalog
+        from core.session import Session
+        with tempfile.TemporaryDirectory() as tmpdir:
+            catalog = SessionCatalog(Path(tmpdir) / "catalog.db")
+            for i in range(12):
+                session = Session(f"session-{i:02d}", catalog=catalog)
+                session.add_message("user", f"question {i} about the build")
+            Session("session-hook", catalog=catalog).add_message(
+                "user", "the git hook rejects every commit"
+            )
+            catalog.flush()
+            
+            hits = catalog.search("git hook")
+            assert [h.session_id for h in hits] == ["session-hook"]
+            assert "[git]" in hits[0].snippet
+            
+            first = catalog.list_sessions(limit=5)
+            second = catalog.list_sessions(
+                limit=5, before=(first[-1].updated_at, first[-1].session_id)
+            )
+            assert len(first) == len(second) == 5
+            assert not {h.session_id for h in first} & {h.session_id for h in second}
+            catalog.close()
@@ -38,6 +38,91 @@ class TestAgentMemory:
         prompt = memory.get_system_prompt()
         assert "2-space indentation" in prompt
     
+    def test_shared_import_included_once(self, temp_dir):
+        """Test a file imported by several memory files is inlined once."""
+        from core.memory import AgentMemory
+        
+        (temp_dir / "README.md").write_text("Shared project overview")
+        (temp_dir / "AGENTS.md").write_text("# Instructions\n@README.md")
+        (temp_dir / "AGENTS.local.md").write_text("# Local\n@README.md")
+        
+        memory = AgentMemory(str(temp_dir))
+        prompt = memory.get_system_prompt()
+        assert prompt.count("Shared project overview") == 1
+        assert "(included above)" in prompt
+    
+    def test_import_cycle(self, temp_dir):
+        """Test circular @imports are detected instead of expanded."""
+        from core.memory import AgentMemory
+        
+        (temp_dir / "a.md").write_text("Rule A\n@b.md")
+        (temp_dir / "b.md").write_text("Rule B\n@a.md")
+        (temp_dir / "AGENTS.md").write_text("# Instructions\n@a.md")
+        
+        memory = AgentMemory(str(temp_dir))
+        prompt = memory.get_system_prompt()
+        assert prompt.count("Rule A") == 1
+        assert prompt.count("Rule B") == 1
+        assert "# [Import cycle: a.md]" in prompt
+        assert len(memory.imports.cycles) == 1
+    
+    @pytest.mark.parametrize("use_inotify", [True, False])
+    def test_watcher_hot_reload(self, temp_dir, use_inotify):
+        """Test edits made outside the agent are picked up by the watcher."""
+        import time
+        from core.memory import AgentMemory
+        
+        (temp_dir / "style.md").write_text("Use tabs")
+        (temp_dir / "AGENTS.md").write_text("# Instructions\n@style.md")
+        
+        memory = AgentMemory(str(temp_dir))
+        watcher = memory.start_watching(interval=0.05, use_inotify=use_inotify)
+        try:
+            assert (temp_dir / "style.md").resolve() in watcher.paths
+            (temp_dir / "style.md").write_text("Use 4 spaces everywhere")
+            (temp_dir / "AGENTS.local.md").write_text("Local override")
+            
+            deadline = time.time() + 5
+            while time.time() < deadline:
+                prompt = memory.get_system_prompt()
+                if "4 spaces" in prompt and "Local override" in prompt:
+                    break
+                time.sleep(0.02)
+            assert "Use 4 spaces everywhere" in prompt
+            assert "Local override" in prompt
+        finally:
+            memory.stop_watching()
+    
+    def test_change_reloads_only_affected_files(self, temp_dir):
+        """Test a changed import re-reads only itself and its importers."""
+        from core.memory import AgentMemory
+        
+        (temp_dir / "style.md").write_text("Use tabs")
+        (temp_dir / "shared.md").write_text("Shared overview")
+        (temp_dir / "AGENTS.md").write_text("# Instructions\n@style.md\n@shared.md")
+        (temp_dir / "AGENTS.local.md").write_text("# Local\n@shared.md")
+        
+        memory = AgentMemory(str(temp_dir))
+        local = memory.memory_files[-1]
+        stats = memory.cache_stats()
+        (temp_dir / "style.md").write_text("Use 4 spaces everywhere")
+        memory._on_files_changed({(temp_dir / "style.md").resolve()})
+        
+        # style.md is re-read; AGENTS.md is re-expanded from its parsed node
+        # and AGENTS.local.md is reused as it was
+        after = memory.cache_stats()
+        assert (after["misses"], after["hits"]) == (stats["misses"] + 1, stats["hits"])
+        assert memory.memory_files[-1] is local
+        prompt = memory.get_system_prompt()
+        assert "Use 4 spaces everywhere" in prompt and "Use tabs" not in prompt
+        assert prompt.count("Shared overview") == 1
+        
+        # A change to a shared import re-expands both importers
+        (temp_dir / "shared.md").write_text("New overview")
+        memory._on_files_changed({(temp_dir / "shared.md").resolve()})
+        prompt = memory.get_system_prompt()
+        assert prompt.count("New overview") == 1 and "(included above)" in prompt
+    
     def test_init_project_memory(self, temp_dir):
         """Test initializing new AGENTS.md."""
         from core.memory import AgentMemory
@@ -60,6 +145,133 @@ class TestAgentMemory:
         
         content = (temp_dir / "AGENTS.md").read_text()
         assert "descriptive names" in content
+    
+    def test_add_memory_reuses_cached_imports(self, temp_dir):
+        """Test add_memory only re-reads the file that changed."""
+        from core.memory import AgentMemory
+        
+        (temp_dir / "style.md").write_text("Use 2-space indentation")
+        (temp_dir / "AGENTS.md").write_text("# Instructions\n@style.md")
+        
+        memory = AgentMemory(str(temp_dir))
+        misses = memory.cache_stats()["misses"]
+        memory.add_memory("Prefer pathlib")
+        
+        # Only AGENTS.md is re-read; style.md is served from the cache
+        stats = memory.cache_stats()
+        assert stats["misses"] == misses + 1
+        assert stats["hits"] >= 1
+        prompt = memory.get_system_prompt()
+        assert "Prefer pathlib" in prompt
+        assert "2-space indentation" in prompt
+    
+    def test_contents_kept_once_in_read_cache(self, temp_dir):
+        """Test memory files are held by the shared read cache, not copied."""
+        from core.memory import AgentMemory
+        from utils.read_cache import get_read_cache
+        
+        (temp_dir / "AGENTS.md").write_text("# Instructions\nUse tabs")
+        memory = AgentMemory(str(temp_dir))
+        path = (temp_dir / "AGENTS.md").resolve()
+        assert memory.cache._entries[path] == memory.cache.fingerprint(path)
+        assert memory.cache.read(path) is get_read_cache().read_text(path)
+    
+    def test_reload_picks_up_changed_import(self, temp_dir):
+        """Test editing an imported file invalidates the cached expansion."""
+        from core.memory import AgentMemory
+        
+        (temp_dir / "style.md").write_text("Use tabs")
+        (temp_dir / "AGENTS.md").write_text("# Instructions\n@style.md")
+        
+        memory = AgentMemory(str(temp_dir))
+        assert "Use tabs" in memory.get_system_prompt()
+        
+        (temp_dir / "style.md").write_text("Use 4 spaces everywhere")
+        memory._load_all_memories()
+        prompt = memory.get_system_prompt()
+        assert "Use 4 spaces everywhere" in prompt
+        assert "Use tabs" not in prompt
+    
+    def test_relevant_sections_only(self, temp_dir):
+        """Test a query keeps pinned sections and the best matching ones."""
+        from core.memory import AgentMemory
+        
+        (temp_dir / "AGENTS.md").write_text(
+            "# Instructions\n"
+            "## Safety [pinned]\nNever push to main directly.\n"
+            "## Database\nMigrations live in db/migrations and run with alembic.\n"
+            "## Frontend\nComponents use React hooks and CSS modules.\n"
+            "## Release\nTag releases with semantic versions.\n"
+        )
+        
+        memory = AgentMemory(str(temp_dir))
+        prompt = memory.get_system_prompt(query="add an alembic migration", top_k=1)
+        assert "Never push to main" in prompt
+        assert "alembic" in prompt
+        assert "React hooks" not in prompt
+        assert "semantic versions" not in prompt
+        
+        full = memory.get_system_prompt()
+        assert "React hooks" in full
+    
+    def test_relevant_sections_budget(self, temp_dir):
+        """Test sections that do not fit the token budget are skipped."""
+        from core.memory import AgentMemory
+        
+        (temp_dir / "AGENTS.md").write_text(
+            "## Testing\n" + "Run pytest with coverage. " * 40 + "\n"
+            "## Testing tips\nUse pytest fixtures.\n"
+        )
+        
+        memory = AgentMemory(str(temp_dir))
+        prompt = memory.get_system_prompt(query="pytest", max_tokens=50)
+        assert "Use pytest fixtures" in prompt
+        assert "coverage" not in prompt
+
+class TestPromptSnapshot:
+    """Tests for the persistent system prompt snapshot."""
+    
+    def test_snapshot_reused_until_input_changes(self, temp_dir):
+        """Test the snapshot is served until a memory file changes."""
+        from prompts.snapshot import PromptSnapshotCache
+        
+        project = temp_dir / "project"
+        project.mkdir()
+        (project / "style.md").write_text("Use tabs")
+        (project / "AGENTS.md").write_text("# Instructions\n@style.md")
+        cache = PromptSnapshotCache(str(project), "linux", temp_dir / "cache")
+        
+        first = cache.get()
+        assert not first.cached
+        assert "Use tabs" in first.prompt
+        assert first.tokens > 0
+        
+        second = cache.get()
+        assert second.cached
+        assert second.prompt == first.prompt
+        
+        (project / "style.md").write_text("Use 4 spaces everywhere")
+        third = cache.get()
+        assert not third.cached
+        assert "Use 4 spaces everywhere" in third.prompt
+    
+    def test_corrupt_snapshot_rebuilt(self, temp_dir):
+        """Test a damaged snapshot file is detected and rebuilt."""
+        from prompts.snapshot import PromptSnapshotCache
+        
+        (temp_dir / "AGENTS.md").write_text("# Instructions")
+        cache = PromptSnapshotCache(str(temp_dir), "linux", temp_dir / "cache")
+        cache.get()
+        
+        cache.path.write_text(cache.path.read_text().replace("Instructions", "Tampered"))
+        assert cache.load() is None
+        snapshot = cache.get()
+        assert not snapshot.cached
+        assert "# Instructions" in snapshot.prompt
+        
+        cache.path.write_text("{not json")
+        assert not cache.get().cached
+        assert cache.get().cached
 
 @pytest.fixture
 def temp_dir():
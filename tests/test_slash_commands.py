@@ -69,6 +69,153 @@ class TestSlashCommands:
         
         assert "PR #456" in result
         assert "alice" in result
+    
+    def test_compact_without_model(self, temp_dir):
+        """Test /compact reports when no model is configured."""
+        from cli.slash_commands import SlashCommandRegistry
+        from core.memory import AgentMemory
+        
+        registry = SlashCommandRegistry(str(temp_dir))
+        result = registry.execute("/compact", AgentMemory(str(temp_dir)))
+        
+        assert "Nothing to compact" in result
+    
+    def test_compact_through_repl(self, temp_dir, monkeypatch, capsys):
+        """Test the REPL runs /compact on the agent's memory and model."""
+        from cli.repl import REPL
+        
+        class SummaryModel:
+            def chat(self, messages, **kwargs):
+                return "summary"
+        
+        monkeypatch.setenv("HOME", str(temp_dir))
+        monkeypatch.setattr(REPL, "_create_model", lambda self: SummaryModel())
+        repl = REPL(str(temp_dir))
+        for i in range(8):
+            repl._get_agent().memory.add("user", f"message {i}")
+        
+        repl._handle_command("/compact tests")
+        assert "Compacted 2 messages (focus: tests)" in capsys.readouterr().out
+        assert repl.agent.memory.messages[0]["content"].endswith("summary")
+        repl.slash_commands.catalog.close()
+    
+    def test_resume_lists_sessions(self, temp_dir):
+        """Test /resume lists stored sessions and resumes one by ID."""
+        from cli.slash_commands import SlashCommandRegistry
+        from core.journal import SessionStore
+        from core.memory import AgentMemory
+        
+        store = SessionStore(temp_dir / "sessions")
+        journal = store.journal("abc12345-session")
+        journal.append({"role": "user", "content": "fix the git hook"})
+        journal.close()
+        
+        registry = SlashCommandRegistry(str(temp_dir))
+        registry._sessions = store
+        assert "abc12345" in registry.execute("/resume")
+        
+        memory = AgentMemory(str(temp_dir))
+        result = registry.execute("/resume abc12345", memory)
+        assert "Resumed session abc12345" in result
+        assert memory.messages[0]["content"] == "fix the git hook"
+        
+        # Short or non-hex arguments are searches, never ID prefixes
+        registry._catalog = type("NoHits", (), {"search": lambda self, q: [], "flush": lambda self: None})()
+        assert registry.execute("/resume abc", memory) == "No session matching: abc"
+    
+    def test_resume_search(self, temp_dir):
+        """Test /resume <query> ranks sessions from the catalog."""
+        from cli.slash_commands import SlashCommandRegistry
+        from core.catalog import SessionCatalog
+        from core.journal import SessionStore
+        
+        catalog = SessionCatalog(temp_dir / "catalog.db")
+        catalog.add_message("abc12345-session", "user", "fix the git hook")
+        catalog.flush()
+        
+        registry = SlashCommandRegistry(str(temp_dir))
+        registry._sessions = SessionStore(temp_dir / "sessions")
+        registry._catalog = catalog
+        result = registry.execute("/resume git hook")
+        assert "abc12345" in result
+        assert "[git] [hook]" in result
+        catalog.close()
+    
+    def test_resume_search_through_repl(self, temp_dir, monkeypatch, capsys):
+        """Test turns the REPL's agent journals are found by /resume <query>."""
+        from cli.repl import REPL
+        
+        monkeypatch.setenv("HOME", str(temp_dir))
+        monkeypatch.setattr(REPL, "_create_model", lambda self: None)
+        repl = REPL(str(temp_dir))
+        repl._get_agent().run("fix the flaky websocket test")
+        
+        repl._handle_command("/resume websocket")
+        out = capsys.readouterr().out
+        assert repl.agent.session.session_id[:8] in out
+        assert "[websocket]" in out
+        repl.agent.session.close()
+        repl.slash_commands.catalog.close()
+    
+    def test_prompt_snapshot_lists_commands(self, temp_dir, monkeypatch):
+        """Test the prompt snapshot is rebuilt when a command file changes."""
+        from cli.slash_commands import SlashCommandRegistry
+        from prompts.snapshot import PromptSnapshotCache
+        
+        monkeypatch.setenv("HOME", str(temp_dir))
+        cmd_dir = temp_dir / ".termux-cli" / "commands"
+        cmd_dir.mkdir(parents=True)
+        (cmd_dir / "deploy.md").write_text("Deploy to staging")
+        cache = PromptSnapshotCache(str(temp_dir), "linux", temp_dir / "cache")
+        
+        def snapshot():
+            return cache.get(commands=SlashCommandRegistry(str(temp_dir)))
+        
+        assert "- /deploy: Deploy to staging" in snapshot().prompt
+        assert snapshot().cached
+        
+        (cmd_dir / "deploy.md").write_text("Deploy to production")
+        rebuilt = snapshot()
+        assert not rebuilt.cached and "Deploy to production" in rebuilt.prompt
+        
+        (cmd_dir / "ops").mkdir()
+        (cmd_dir / "ops" / "restart.md").write_text("Restart the service")
+        assert "- /restart: Restart the service" in snapshot().prompt
+    
+    def test_undo_and_rewind(self, temp_dir):
+        """Test /undo and /rewind restore the agent's turns through one FileOperations."""
+        from cli.slash_commands import SlashCommandRegistry
+        from core.agent import Agent
+        
+        (temp_dir / "a.py").write_text("zero")
+        agent = Agent(str(temp_dir))
+        registry = SlashCommandRegistry(str(temp_dir), file_ops=agent.file_ops)
+        assert registry.execute("/undo") == "No checkpoints to rewind"
+        
+        agent.run("turn 1")
+        agent.file_ops.write("a.py", "one")
+        agent.run("turn 2")
+        agent.file_ops.write("a.py", "two")
+        agent.file_ops.write("b.py", "new")
+        
+        assert registry.execute("/undo") == "Rewound 1 turn, restored 2 files:\n  a.py\n  b.py"
+        assert agent.file_ops.read("a.py") == "one" and not agent.file_ops.exists("b.py")
+        
+        # Edits after the undo, in the same turn, go to a fresh checkpoint
+        agent.file_ops.write("a.py", "again")
+        assert registry.execute("/undo").startswith("Rewound 1 turn")
+        assert agent.file_ops.read("a.py") == "one"
+        
+        # A registry with its own FileOperations reads the checkpoints from
+        # disk, and the agent's store does not revive the ones it dropped
+        agent.run("turn 3")
+        agent.file_ops.write("a.py", "three")
+        other = SlashCommandRegistry(str(temp_dir))
+        assert other.execute("/rewind 5").startswith("Rewound 2 turns")
+        assert agent.file_ops.read("a.py") == "zero"
+        agent.file_ops.write("a.py", "four")
+        assert registry.execute("/undo") == "Rewound 1 turn, restored 1 file:\n  a.py"
+        assert agent.file_ops.read("a.py") == "zero"
 
 @pytest.fixture
 def temp_dir():
@@ -1,6 +1,7 @@
 """Tools tests"""
 
 import pytest
+import re
 import tempfile
 from pathlib import Path
 
@@ -31,6 +32,207 @@ class TestFileOperations:
             ops.edit("test.txt", "World", "Python")
             content = ops.read("test.txt")
             assert content == "Hello, Python!"
+    
+    def test_batch_edit(self, monkeypatch):
+        """Test batch edits commit together and roll back together."""
+        import os
+        from tools.file_ops import FileOperations
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ops = FileOperations(tmpdir, checkpoints=False)
+            ops.write("a.py", "import old\nold.run()\n")
+            ops.write("b.py", "from old import x\n")
+            
+            result = ops.batch_edit([
+                ("a.py", "import old", "import new"),
+                ("a.py", "old.run()", "new.run()"),
+                ("b.py", "from old", "from new"),
+                ("pkg/c.py", "", "import new\n"),
+            ])
+            assert result.files == ["a.py", "b.py", "pkg/c.py"]
+            assert result.edits == 4
+            assert result.bytes_written == 50
+            assert ops.read("a.py") == "import new\nnew.run()\n"
+            assert ops.read("pkg/c.py") == "import new\n"
+            
+            with pytest.raises(ValueError):
+                ops.batch_edit([("a.py", "new", "newer"), ("b.py", "missing", "x")])
+            assert ops.read("a.py") == "import new\nnew.run()\n"
+            
+            real_replace = os.replace
+            calls = []
+            
+            def failing_replace(src, dst):
+                calls.append(dst)
+                if len(calls) == 2:
+                    raise OSError("disk full")
+                real_replace(src, dst)
+            
+            monkeypatch.setattr(os, "replace", failing_replace)
+            with pytest.raises(OSError):
+                ops.batch_edit([("a.py", "new", "newer"), ("b.py", "new", "newer"),
+                                ("d.py", "", "x")])
+            monkeypatch.undo()
+            assert ops.read("a.py") == "import new\nnew.run()\n"
+            assert ops.read("b.py") == "from new import x\n"
+            assert not ops.exists("d.py")
+            assert sorted(os.listdir(tmpdir)) == ["a.py", "b.py", "pkg"]
+    
+    def test_write_through_symlink_keeps_mode(self, monkeypatch):
+        """Test writes follow symlinks, keep modes and leave the umask alone."""
+        import os
+        from tools import file_ops
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ops = file_ops.FileOperations(tmpdir, checkpoints=False)
+            root = Path(tmpdir)
+            ops.write("real.txt", "one\n")
+            os.chmod(root / "real.txt", 0o640)
+            os.symlink("real.txt", root / "link.txt")
+            
+            ops.write("link.txt", "two\n")
+            assert (root / "link.txt").is_symlink()
+            assert (root / "real.txt").read_text() == "two\n"
+            assert (root / "real.txt").stat().st_mode & 0o777 == 0o640
+            ops.batch_edit([("link.txt", "two", "three")])
+            assert (root / "link.txt").is_symlink()
+            assert ops.read("real.txt") == "three\n"
+            
+            def no_umask(mask):
+                raise AssertionError("umask changed")
+            
+            monkeypatch.setattr(os, "umask", no_umask)
+            ops.write("new.txt", "x")
+            monkeypatch.undo()
+            umask = os.umask(0)
+            os.umask(umask)
+            assert (root / "new.txt").stat().st_mode & 0o777 == 0o666 & ~umask
+    
+    def test_read_cache(self):
+        """Test the shared read cache dedupes, evicts and sees writes."""
+        from tools.file_ops import FileOperations
+        from utils.read_cache import ReadCache, get_read_cache
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ReadCache(max_bytes=200)
+            cache.max_file_bytes = 200
+            for name in ("a.txt", "b.txt"):
+                Path(tmpdir, name).write_text("same\r\n" * 10)
+            assert cache.read_text(Path(tmpdir, "a.txt")) == "same\n" * 10
+            assert cache.read_text(Path(tmpdir, "b.txt")) is cache.read_text(Path(tmpdir, "a.txt"))
+            stats = cache.stats()
+            assert (stats["hits"], stats["misses"], stats["blobs"]) == (1, 2, 1)
+            assert stats["bytes_cached"] == 60 and stats["bytes_saved"] == 60
+            
+            Path(tmpdir, "c.txt").write_text("x" * 100)
+            Path(tmpdir, "d.txt").write_text("y" * 100)
+            cache.read_text(Path(tmpdir, "c.txt"))
+            cache.read_text(Path(tmpdir, "d.txt"))
+            # a.txt and b.txt share one blob, which is freed once both go
+            assert (cache.stats()["entries"], cache.stats()["bytes_cached"]) == (2, 200)
+            
+            ops = FileOperations(tmpdir)
+            assert ops.read("c.txt") == "x" * 100
+            hits = get_read_cache().stats()["hits"]
+            assert ops.read("c.txt") == "x" * 100
+            assert get_read_cache().stats()["hits"] == hits + 1
+            ops.write("c.txt", "changed")
+            assert ops.read("c.txt") == "changed"
+    
+    def test_apply_patch(self):
+        """Test multi-file, multi-hunk patches with offset, fuzz and failures."""
+        from tools.file_ops import FileOperations
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ops = FileOperations(tmpdir)
+            ops.write("a.py", "# moved down\n" + "".join(f"line {i}\n" for i in range(1, 31)))
+            ops.write("old.txt", "bye\n")
+            diff = (
+                "diff --git a/a.py b/a.py\n--- a/a.py\n+++ b/a.py\n"
+                "@@ -2,3 +2,3 @@\n line 2\n-line 3\n+LINE 3\n line 4\n"
+                "@@ -20,3 +20,4 @@\n line 20\n-line 21\n+line 21 (edited)\n+new\n line 99\n"
+                "--- /dev/null\n+++ b/new.py\n@@ -0,0 +1,2 @@\n+x = 1\n+y = 2\n"
+                "--- a/old.txt\n+++ /dev/null\n@@ -1 +0,0 @@\n-bye\n"
+            )
+            result = ops.apply_patch(diff)
+            assert result.applied
+            assert [(h.file, h.hunk, h.offset, h.fuzz) for h in result.hunks] == [
+                ("a.py", 1, 1, 0), ("a.py", 2, 1, 1), ("new.py", 1, 0, 0), ("old.txt", 1, 0, 0)]
+            assert result.files == ["a.py", "new.py", "old.txt"]
+            text = ops.read("a.py")
+            assert "LINE 3\nline 4\n" in text and "line 21 (edited)\nnew\nline 22\n" in text
+            assert ops.read("new.py") == "x = 1\ny = 2\n"
+            assert not ops.exists("old.txt")
+            
+            bad = ("--- a/a.py\n+++ b/a.py\n@@ -1,2 +1,2 @@\n line 1\n-line 2\n+two\n"
+                   "--- a/new.py\n+++ b/new.py\n@@ -1 +1 @@\n-z = 3\n+z = 4\n")
+            result = ops.apply_patch(bad)
+            assert not result.applied and result.files == []
+            assert [h.applied for h in result.hunks] == [True, False]
+            assert ops.read("a.py") == text
+    
+    def test_read_lines(self):
+        """Test ranged reads, head and tail, and appends to an indexed file."""
+        from tools.file_ops import FileOperations
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ops = FileOperations(tmpdir)
+            Path(tmpdir, "app.log").write_text("".join(f"line {i}\n" for i in range(1, 1001)))
+            
+            assert ops.line_count("app.log") == 1000
+            assert ops.read_lines("app.log", 500, 2) == "line 500\nline 501\n"
+            assert ops.head("app.log", 2) == "line 1\nline 2\n"
+            assert ops.tail("app.log", 1) == "line 1000\n"
+            assert ops.read_lines("app.log", 999, 10) == "line 999\nline 1000\n"
+            assert ops.read_lines("app.log", 2000, 10) == ""
+            
+            with open(Path(tmpdir, "app.log"), "a") as f:
+                f.write("appended\npartial")
+            index = ops._line_index("app.log")
+            assert index.offsets[:2].tolist() == [0, 7]
+            assert ops.line_count("app.log") == 1002
+            assert ops.tail("app.log", 2) == "appended\npartial"
+            
+            Path(tmpdir, "app.log").write_text("rewritten\n")
+            assert ops.read_lines("app.log") == "rewritten\n"
+            Path(tmpdir, "empty.txt").write_text("")
+            assert ops.line_count("empty.txt") == 0
+            assert ops.tail("empty.txt") == ""
+    
+    def test_checkpoints(self):
+        """Test undo and rewind across turns, dedup of objects, and gc."""
+        from tools.file_ops import FileOperations
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            Path(tmpdir, "a.py").write_text("v0\n")
+            ops = FileOperations(tmpdir)
+            ops.checkpoint("turn 1")
+            ops.write("a.py", "v1\n")
+            ops.edit("a.py", "v1", "v1b")
+            ops.checkpoint("turn 2")
+            ops.write("a.py", "v0\n")
+            ops.batch_edit([("new.py", "", "x = 1\n")])
+            ops.checkpoint("turn 3")
+            ops.write("a.py", "v2\n")
+            
+            store = ops.checkpoints
+            assert [c.label for c in store.list()] == ["turn 3", "turn 2", "turn 1"]
+            assert store.list(1)[0].files == store.list()[2].files  # Same bytes, one object
+            assert store.list()[1].files["new.py"] is None
+            
+            assert ops.undo() == ["a.py"]
+            assert ops.read("a.py") == "v0\n"
+            assert ops.rewind(2) == ["new.py"]  # a.py is already as before turn 1
+            assert ops.read("a.py") == "v0\n" and not ops.exists("new.py")
+            assert store.list() == [] and ops.rewind(1) == []
+            
+            ops.checkpoint("old")
+            ops.write("a.py", "big" * 1000)
+            ops.checkpoint("new")
+            ops.write("a.py", "small")
+            freed = store.gc(max_bytes=0)
+            assert freed > 0 and [c.label for c in store.list()] == ["new"]
+            assert ops.undo() == ["a.py"] and ops.read("a.py") == "big" * 1000
 
 class TestCodeRunner:
     """Tests for CodeRunner."""
@@ -52,6 +254,52 @@ class TestCodeRunner:
         result = runner.run("invalid syntax here!!!")
         assert not result.success
 
+class TestShell:
+    """Tests for Shell."""
+    
+    def test_persistent_session(self):
+        """Test state carries over, framing, timeouts and restarts."""
+        from tools.shell import Shell
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            Path(tmpdir, "sub").mkdir()
+            shell = Shell(tmpdir, timeout=10, persistent=True)
+            try:
+                result = shell.execute("cd sub && export FOO=bar; echo out; echo err >&2; false")
+                assert (result.stdout, result.stderr, result.returncode) == ("out\n", "err\n", 1)
+                result = shell.execute('printf "%s" "$FOO"; basename "$PWD"')
+                assert result.stdout == "barsub\n"
+                assert shell.execute('echo "unclosed').returncode != 0
+                assert shell.execute("cat").returncode == 0  # stdin is /dev/null
+                
+                result = shell.execute("cd ..; sleep 30", timeout=0.5)
+                assert result.returncode == -1 and "timed out" in result.stderr
+                assert shell.execute("basename $PWD").stdout == Path(tmpdir).name + "\n"
+                assert shell.session.restarts == 0
+                
+                assert shell.execute("exit 3").returncode == 3
+                assert shell.execute("echo $FOO; basename $PWD").stdout == "\n" + Path(tmpdir).name + "\n"
+                assert shell.session.restarts == 1
+                
+                # A timeout aborts the rest of the command line, not the shell
+                result = shell.execute("export BAR=1; sleep 5; echo after", timeout=0.5)
+                assert "after" not in result.stdout and result.returncode == -1
+                assert shell.execute("for i in 1 2; do sleep 5; done; echo after",
+                                     timeout=0.5).stdout == ""
+                assert shell.execute("echo $BAR").stdout == "1\n"
+                assert shell.session.restarts == 1
+                
+                # Shells that cannot be interrupted or lose a stream are restarted
+                result = shell.execute("trap '' INT; while :; do :; done", timeout=0.5)
+                assert result.stderr.startswith("Shell restarted, session state lost")
+                assert shell.session.restarts == 2
+                result = shell.execute("exec 2>&1; echo moved >&2", timeout=1)
+                assert result.stderr == "Shell restarted, session state lost"
+                assert shell.session.restarts == 3
+                assert shell.execute("echo $BAR; echo ok").stdout == "\nok\n"
+            finally:
+                shell.close()
+
 class TestSearch:
     """Tests for Search."""
     
@@ -68,3 +316,420 @@ class TestSearch:
             search = Search(tmpdir)
             py_files = search.find_files("*.py")
             assert len(py_files) == 2
+    
+    def test_grep_with_trigram_index(self):
+        """Test indexed grep matches a full scan and follows file changes."""
+        from tools.search import Search
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir, "repo")
+            (root / "pkg").mkdir(parents=True)
+            (root / "pkg" / "a.py").write_text("def load_config():\n    pass\n")
+            (root / "pkg" / "b.py").write_text("def save_config():\n    pass\n")
+            (root / "notes.md").write_text("load_config is documented here\n")
+            (root / "blob.bin").write_bytes(b"\x00load_config")
+            
+            search = Search(str(root), index=True)
+            search.index.path = Path(tmpdir, "cache", "index.trigrams")
+            assert search.build_index()["added"] == 4
+            
+            indexed = search.grep(r"load_conf\w+")
+            assert sorted(m.file for m in indexed) == [
+                "notes.md", str(Path("pkg", "a.py"))
+            ]
+            assert search.index.candidates("save_config") == {str(Path("pkg", "b.py"))}
+            assert search.index.candidates(r"\w+") is None
+            
+            (root / "pkg" / "b.py").write_text("def load_config_v2():\n    pass\n")
+            files = {m.file for m in search.grep("load_config", file_pattern="*.py")}
+            assert files == {str(Path("pkg", "a.py")), str(Path("pkg", "b.py"))}
+            assert search.index.update() == {"added": 0, "updated": 0, "removed": 0}
+            
+            # Case-insensitive literals also match the Kelvin sign and any case
+            (root / "kelvin.txt").write_text("\u212aelvin\nFoo\n", encoding="utf-8")
+            assert [m.line_number for m in search.grep("(?i)kelvin")] == [1]
+            assert [m.line_number for m in search.grep("(?i:foo)")] == [2]
+    
+    def test_parallel_grep_matches_serial(self):
+        """Test parallel grep returns the same matches in the same order."""
+        from tools.search import Search
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i in range(150):
+                Path(tmpdir, f"mod{i:03d}.py").write_text(
+                    f"def handler_{i}():\n    return retry({i})\n"
+                )
+            
+            serial = Search(tmpdir).grep(r"retry\(\d+\)")
+            parallel = Search(tmpdir, workers=2)
+            parallel.CHUNK_SIZE = 16
+            assert parallel.grep(r"retry\(\d+\)") == serial
+            assert len(serial) == 150
+    
+    def test_grep_byte_scan(self):
+        """Test grep line numbers, binary skipping and large mapped files."""
+        from tools.search import Search, MMAP_THRESHOLD
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            Path(tmpdir, "small.txt").write_text("alpha\nbeta TODO\ngamma\nTODO: delta\n")
+            Path(tmpdir, "blob.bin").write_bytes(b"\x00\x01TODO\n")
+            Path(tmpdir, "crlf.txt").write_bytes(b"one\r\nend TODO\r\n")
+            filler = "x = 1\n" * (MMAP_THRESHOLD // 6 + 10)
+            Path(tmpdir, "large.py").write_text(filler + "# TODO last\n")
+            
+            search = Search(tmpdir)
+            found = {(m.file, m.line_number, m.line_content) for m in search.grep(r"TODO")}
+            assert found == {
+                ("small.txt", 2, "beta TODO"),
+                ("small.txt", 4, "TODO: delta"),
+                ("crlf.txt", 2, "end TODO"),
+                ("large.py", filler.count("\n") + 1, "# TODO last"),
+            }
+            assert {(m.file, m.line_number) for m in search.grep(r"TODO$")} == {
+                ("small.txt", 2), ("crlf.txt", 2)
+            }
+            assert [m.match for m in search.grep(r"^\w+", file_pattern="small.txt")] == [
+                "alpha", "beta", "gamma", "TODO"
+            ]
+    
+    def test_grep_unicode_semantics(self):
+        """Test the byte scan keeps Unicode classes, \\A per line and case folding."""
+        from tools.search import Search, MMAP_THRESHOLD
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            Path(tmpdir, "u.txt").write_text(
+                "日本語\n٣٤٥\nbar\nfoo at start\nid=x—y\nKELVIN \u212a\nstop\u00a0here\n",
+                encoding="utf-8")
+            search = Search(tmpdir)
+            
+            def grep(pattern):
+                return [(m.line_number, m.match) for m in search.grep(pattern)]
+            
+            assert grep(r"^\w+$") == [(1, "日本語"), (2, "٣٤٥"), (3, "bar")]
+            assert grep(r"\d+") == [(2, "٣٤٥")]
+            assert grep(r"\Afoo") == [(4, "foo")]
+            assert grep(r"id=x\Wy") == [(5, "id=x—y")]
+            assert grep(r"id=x.y") == [(5, "id=x—y")]
+            assert grep(r"stop\shere") == [(7, "stop\u00a0here")]
+            assert grep(r"(?i)kelvin k") == [(6, "KELVIN \u212a")]
+            assert grep(r"(?i:FOO) at") == [(4, "foo at")]
+            assert grep(r"(?i:kelvin) ") == [(6, "KELVIN ")]
+            
+            # The same through a memory-mapped file
+            Path(tmpdir, "u.txt").write_text(
+                "x\n" * MMAP_THRESHOLD + "foo at start\nid=x—y\n", encoding="utf-8")
+            assert grep(r"\Afoo") == [(MMAP_THRESHOLD + 1, "foo")]
+            assert grep(r"x\Wy") == [(MMAP_THRESHOLD + 2, "x—y")]
+    
+    def test_grep_limits(self):
+        """Test max_results, max_per_file and timeout stop the search early."""
+        from tools.search import Search
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i in range(5):
+                Path(tmpdir, f"f{i}.txt").write_text("hit\n" * 100)
+            
+            for workers in (1, 2):
+                search = Search(tmpdir, workers=workers)
+                assert len(search.grep("hit", max_results=7)) == 7
+                per_file = search.grep("hit", max_per_file=2)
+                assert len(per_file) == 10
+                assert {m.line_number for m in per_file} == {1, 2}
+                assert len(search.grep("hit", max_results=3, max_per_file=2)) == 3
+                assert search.grep("hit", timeout=0) == []
+            
+            stream = Search(tmpdir).iter_grep("hit")
+            assert next(stream).line_number == 1
+            stream.close()
+            assert len(Search(tmpdir).find_files("*.txt", max_results=2)) == 2
+    
+    def test_grep_timeout_inside_file(self, monkeypatch):
+        """Test the deadline is checked while scanning one large file."""
+        import types
+        from tools import search as search_module, walker
+        
+        ticks = iter(range(1000000))
+        clock = types.SimpleNamespace(monotonic=lambda: next(ticks))
+        monkeypatch.setattr(search_module, "time", clock)
+        monkeypatch.setattr(walker, "time", clock)
+        monkeypatch.setattr(search_module, "CHECK_EVERY", 100)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            Path(tmpdir, "big.txt").write_text("hit\n" * 50000)
+            search = search_module.Search(tmpdir)
+            # Prefiltered (memory-mapped) and line-by-line text scans
+            for pattern in ("hit", r"^\w+$"):
+                found = search.grep(pattern, timeout=10)
+                assert 0 < len(found) < 50000
+                assert [m.line_number for m in found] == list(range(1, len(found) + 1))
+    
+    def test_grep_many(self):
+        """Test one-pass multi-pattern search tags each match."""
+        from tools.multi_pattern import literal_trie
+        from tools.search import Search
+        
+        assert re.findall(literal_trie(["foo", "foobar", "fob"]), "foobar fob foo") == [
+            "foobar", "fob", "foo"]
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            Path(tmpdir, "a.py").write_text("def load():\n    save(x)\n# TODO: a.b\n")
+            Path(tmpdir, "b.py").write_text("loader = 1\n")
+            
+            search = Search(tmpdir)
+            found = search.grep_many(["load", "save", r"TODO:.*"])
+            assert [(m.file, m.line_number, m.pattern) for m in found] == [
+                ("a.py", 1, "load"), ("a.py", 2, "save"),
+                ("a.py", 3, r"TODO:.*"), ("b.py", 1, "load")]
+            
+            fixed = search.grep_many(["a.b"], fixed_strings=True)
+            assert [(m.line_number, m.match) for m in fixed] == [(3, "a.b")]
+            assert search.grep_many([]) == []
+    
+    def test_grep_many_groups_and_overlaps(self):
+        """Test backreferences, repeated group names and overlapping patterns."""
+        from tools.search import Search
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            Path(tmpdir, "a.py").write_text(
+                "load_config()\nx = x\nkey: key\nif a == b: pass\nIMPORT os\n" + "pad\n" * 20000)
+            
+            for workers in (1, 2):
+                search = Search(tmpdir, workers=workers)
+                patterns = ["load", "load_config", r"(\w+) = \1", r"(?P<w>\w+): (?P=w)",
+                            r"(?P<w>\w+) == (?P<v>\w+)", r"(?i)import", r"load_\w+"]
+                found = search.grep_many(patterns)
+                assert [(m.line_number, m.pattern, m.match) for m in found] == [
+                    (1, "load", "load"), (1, "load_config", "load_config"),
+                    (1, r"load_\w+", "load_config"),
+                    (2, r"(\w+) = \1", "x = x"), (3, r"(?P<w>\w+): (?P=w)", "key: key"),
+                    (4, r"(?P<w>\w+) == (?P<v>\w+)", "a == b"), (5, r"(?i)import", "IMPORT")]
+                assert found[5].group == "v"
+
+class TestWalker:
+    """Test the ignore-aware walker."""
+    
+    def test_gitignore_rules(self):
+        """Test nested .gitignore, negation, anchoring and the ignore list."""
+        from tools.walker import Walker
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / ".git" / "info").mkdir(parents=True)
+            (root / ".git" / "info" / "exclude").write_text("secret.txt\n")
+            (root / ".gitignore").write_text("*.log\n!keep.log\n/build/\n")
+            (root / "src" / "build").mkdir(parents=True)
+            (root / "src" / ".gitignore").write_text("generated_*.py\n")
+            (root / "node_modules" / "pkg").mkdir(parents=True)
+            for rel in ["app.py", "debug.log", "keep.log", "secret.txt", "build/out.js",
+                        "src/build/kept.js", "src/generated_api.py", "src/main.py",
+                        "node_modules/pkg/index.js"]:
+                (root / rel).parent.mkdir(parents=True, exist_ok=True)
+                (root / rel).write_text("x\n")
+            
+            walker = Walker(tmpdir)
+            found = sorted(str(p.relative_to(root)) for p in walker.files())
+            assert found == [".gitignore", "app.py", "keep.log",
+                             "src/.gitignore", "src/build/kept.js", "src/main.py"]
+            assert sorted(p.name for p in walker.files(root / "src", "*.py")) == ["main.py"]
+            
+            everything = Walker(tmpdir, ignore=[".git/"], gitignore=False)
+            assert len(list(everything.files())) == 11
+    
+    def test_double_star_and_nested_ignores(self):
+        """Test ** spans zero or more directories and ignores match when nested."""
+        from tools.walker import Walker, matches_pattern
+        
+        assert matches_pattern("src/x.py", "x.py", "src/**/x.py")
+        assert matches_pattern("lib/src/a/b/x.py", "x.py", "src/**/x.py")
+        assert not matches_pattern("srcs/x.py", "x.py", "src/**/x.py")
+        assert not matches_pattern("a/c/b.py", "b.py", "a/*.py")
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / ".git").mkdir()
+            (root / ".gitignore").write_text("docs/**/draft.md\n")
+            for rel in ["docs/draft.md", "docs/a/b/draft.md", "docs/final.md",
+                        "web/node_modules/x/index.js", "pkg/gen/a/b.py", "pkg/src/main.py",
+                        "sub/.termux-cli/objects/ab", "sub/app.py"]:
+                (root / rel).parent.mkdir(parents=True, exist_ok=True)
+                (root / rel).write_text("x\n")
+            (root / "pkg" / ".gitignore").write_text("gen/**\n")
+            
+            found = sorted(str(p.relative_to(root)) for p in Walker(tmpdir).files())
+            assert found == [".gitignore", "docs/final.md", "pkg/.gitignore",
+                             "pkg/src/main.py", "sub/app.py"]
+            # Config ignores still apply when the walk root is below the git root
+            assert [p.name for p in Walker(root / "sub").files()] == ["app.py"]
+            assert [p.name for p in Walker(tmpdir).files(pattern="pkg/**/*.py")] == ["main.py"]
+
+class TestFuzzyFinder:
+    """Test the fuzzy path finder."""
+    
+    def test_ranking_and_refresh(self):
+        """Test ranked subsequence matches and incremental refresh."""
+        from tools.fuzzy import PathIndex, fuzzy_score
+        
+        assert fuzzy_score("usrsvc", "src/user_service.py") is not None
+        assert fuzzy_score("svcusr", "src/user_service.py") is None
+        assert fuzzy_score("main", "src/main.py") > fuzzy_score("main", "src/my_admin_panel.py")
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for rel in ["src/services/user_service.py", "src/services/order_service.py",
+                        "src/users/models.py", "tests/test_user_service.py", "README.md"]:
+                (root / rel).parent.mkdir(parents=True, exist_ok=True)
+                (root / rel).write_text("")
+            
+            index = PathIndex(tmpdir)
+            index.refresh()
+            assert len(index) == 5
+            results = [m.path for m in index.search("usersvc", limit=3)]
+            assert results[0] == "src/services/user_service.py"
+            assert "tests/test_user_service.py" in results
+            assert [m.path for m in index.search("usersvcpy")][:1] == results[:1]
+            assert index.search("zzz") == []
+            
+            (root / "src" / "users" / "user_views.py").write_text("")
+            (root / "docs").mkdir()
+            (root / "docs" / "user_guide.md").write_text("")
+            (root / "README.md").unlink()
+            assert index.refresh(force=True) == 2
+            assert sorted(index.paths()) == [
+                "docs/user_guide.md",
+                "src/services/order_service.py",
+                "src/services/user_service.py",
+                "src/users/models.py",
+                "src/users/user_views.py",
+                "tests/test_user_service.py",
+            ]
+            assert index.search("userviews")[0].path == "src/users/user_views.py"
+
+class TestSymbolIndex:
+    """Test the symbol index."""
+    
+    def test_definitions_and_references(self):
+        """Test definitions per language, references and incremental update."""
+        from tools.search import Search
+        from tools.symbols import SymbolIndex
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir, "repo")
+            root.mkdir()
+            (root / "service.py").write_text(
+                "RETRIES = 3\n\nclass UserService:\n    def load(self, user_id):\n"
+                "        return fetch(user_id)\n\ndef fetch(user_id):\n    return RETRIES\n"
+            )
+            # A form feed is not a line break for reference line numbers
+            (root / "app.py").write_text("from service import UserService\n\x0c\nUserService().load(1)\n")
+            (root / "client.ts").write_text(
+                "export interface User {}\nexport async function fetchUser(id: string) {}\n"
+                "class Api {\n  async load(id: string): Promise<User> {\n    return fetchUser(id);\n  }\n}\n"
+            )
+            (root / "main.go").write_text("package main\n\ntype Server struct{}\n\nfunc (s *Server) Run() {}\n")
+            (root / "build.sh").write_text("#!/bin/sh\nsetup() {\n  echo hi\n}\nsetup\n")
+            
+            index = SymbolIndex(str(root), index_path=Path(tmpdir, "cache", "index.symbols"), workers=1)
+            assert index.update()["added"] == 5
+            
+            def where(name):
+                return sorted((s.file, s.line, s.kind) for s in index.find_definition(name))
+            
+            assert where("UserService") == [("service.py", 3, "class")]
+            assert where("UserService.load") == [("service.py", 4, "method")]
+            assert where("load") == [("client.ts", 4, "method"), ("service.py", 4, "method")]
+            assert where("RETRIES") == [("service.py", 1, "variable")]
+            assert where("User") == [("client.ts", 1, "type")]
+            assert where("Run") == [("main.go", 5, "method")]
+            assert where("setup") == [("build.sh", 2, "function")]
+            
+            refs = sorted((r.file, r.line) for r in index.find_references("UserService"))
+            assert refs == [("app.py", 1), ("app.py", 3)]
+            
+            assert index.update() == {"added": 0, "updated": 0, "removed": 0}
+            (root / "app.py").write_text("def fetch_all():\n    pass\n")
+            assert index.update()["updated"] == 1
+            assert index.find_references("UserService") == []
+            
+            reloaded = SymbolIndex(str(root), index_path=Path(tmpdir, "cache", "index.symbols"))
+            assert len(reloaded.files) == 5
+            assert reloaded.find_definition("fetch_all")[0].file == "app.py"
+            
+            search = Search(str(root))
+            search.symbols = reloaded
+            assert search.find_definition("Server")[0].kind == "type"
+
+class TestRepoMap:
+    """Test the repository map."""
+    
+    def test_ranked_budgeted_and_cached(self):
+        """Test ranking by references and recency, the budget and the cache key."""
+        import subprocess
+        from tools.repo_map import RepoMap
+        from tools.symbols import SymbolIndex
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "core.py").write_text("class Engine:\n    def run(self):\n        pass\n")
+            (root / "a.py").write_text("from core import Engine\nEngine().run()\n")
+            (root / "b.py").write_text("from core import Engine\n")
+            (root / "notes.txt").write_text("notes\n")
+            git = ["git", "-c", "user.name=t", "-c", "user.email=t@t"]
+            subprocess.run(git + ["init", "-q"], cwd=root, check=True)
+            subprocess.run(git + ["add", "."], cwd=root, check=True)
+            subprocess.run(git + ["commit", "-qm", "init"], cwd=root, check=True)
+            
+            symbols = SymbolIndex(tmpdir, index_path=root / ".cache" / "symbols")
+            repo_map = RepoMap(tmpdir, symbols=symbols, cache_path=root / ".cache" / "map")
+            (root / ".git" / "info" / "exclude").write_text(".cache/\n")
+            ranked = repo_map.summaries()
+            assert ranked[0].path == "core.py"
+            assert ranked[0].symbols == ["Engine"]
+            
+            text = repo_map.get(max_tokens=1000)
+            assert "core.py [" in text and ": Engine" in text
+            key = repo_map.cache_key()
+            assert repo_map.cache_key() == key
+            assert "more files)" in repo_map.get(max_tokens=20)
+            
+            (root / "notes.txt").write_text("edited\n")
+            assert repo_map.cache_key() != key
+            assert repo_map.summaries()[0].path == "notes.txt"
+
+class TestSemanticIndex:
+    """Test the vector index."""
+    
+    def test_tokenize(self):
+        """Test identifiers split into stemmed subwords."""
+        from tools.semantic import tokenize
+        
+        assert tokenize("def retryWithBackoff(retries):") == ["retry", "backoff", "retry"]
+        assert tokenize("HTTPServer max_delay") == ["http", "server", "max", "delay"]
+    
+    def test_search_and_incremental_update(self):
+        """Test top-k search and that only changed chunks are embedded."""
+        pytest.importorskip("numpy")
+        from tools.semantic import SemanticIndex
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "net.py").write_text(
+                "def fetch(url):\n    for attempt in range(5):\n"
+                "        sleep(backoff_delay(attempt))  # retry with backoff\n")
+            (root / "ui.py").write_text("def render_table(rows):\n    print(rows)\n")
+            (root / "big.py").write_text("".join(f"value_{i} = {i}\n" for i in range(100)))
+            
+            index = SemanticIndex(tmpdir, index_path=root / ".cache" / "vectors")
+            assert index.update()["embedded"] == 5
+            best = index.search("where do we handle retry backoff", limit=2)
+            assert [m.file for m in best][0] == "net.py"
+            assert best[0].start_line == 1 and "backoff" in best[0].text
+            assert best[0].score >= best[1].score
+            
+            with open(root / "big.py", "a") as f:
+                f.write("extra = 1\n")
+            stats = SemanticIndex(tmpdir, index_path=root / ".cache" / "vectors").update()
+            assert stats["updated"] == 1 and stats["embedded"] == 1
+            (root / "ui.py").unlink()
+            reopened = SemanticIndex(tmpdir, index_path=root / ".cache" / "vectors")
+            assert reopened.update()["removed"] == 1
+            assert reopened.matrix.shape[0] == len(reopened.chunks) == 4
+            assert "ui.py" not in {m.file for m in reopened.search("render table", limit=5)}
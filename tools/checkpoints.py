@@ -0,0 +1,191 @@
+"""Checkpoints - Content-addressed history of agent file edits
+
+Before a file is changed for the first time in a checkpoint (one per agent
+turn), its previous bytes are zlib-compressed into an object store named
+by their hash, so identical contents are kept once however often they
+recur. Each checkpoint is a small JSON manifest mapping the files it
+touched to the object holding their earlier contents, or to null for a
+file that did not exist. Rewinding reads only those manifests and objects,
+so undo costs O(files changed) whatever the size of the tree.
+
+    .termux-cli/objects/ab/cdef...   zlib(previous contents)
+    .termux-cli/checkpoints/000042.json
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+@dataclass
+class Checkpoint:
+    """One turn's worth of recorded files."""
+    id: int
+    created: float
+    label: str = ""
+    files: Dict[str, Optional[str]] = field(default_factory=dict)  # path -> object or None
+
+class CheckpointStore:
+    """Object store and checkpoint manifests under a project's .termux-cli."""
+    
+    MAX_AGE = 7 * 24 * 3600  # Seconds a checkpoint is kept by gc()
+    MAX_BYTES = 256 * 1024 * 1024  # Compressed objects kept by gc()
+    
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.checkpoints_dir = self.root / "checkpoints"
+        self.current: Optional[Checkpoint] = None
+        self._collected = False
+    
+    def begin(self, label: str = "") -> Checkpoint:
+        """Start the checkpoint later records go to; the first call in a
+        store also runs gc()."""
+        if not self._collected:
+            self._collected = True
+            self.gc()
+        ids = self._ids()
+        self.current = Checkpoint(ids[-1] + 1 if ids else 1, time.time(), label)
+        return self.current
+    
+    def recorded(self, path: Path) -> bool:
+        """True if path is already in the current checkpoint."""
+        return self._live() is not None and self._name(path) in self.current.files
+    
+    def record(self, path: Path, original: Optional[bytes]):
+        """Remember path's contents before its first change in the current
+        checkpoint; original is None if the file does not exist yet."""
+        if self._live() is None:
+            self.begin()
+        name = self._name(path)
+        if name in self.current.files:
+            return
+        self.current.files[name] = self.put(original) if original is not None else None
+        self._save(self.current)
+    
+    def _live(self) -> Optional[Checkpoint]:
+        """The current checkpoint, forgotten if another store rewound it
+        (its manifest is gone), so later records start a new one instead
+        of reviving it."""
+        if (self.current is not None and self.current.files
+                and not self._manifest_path(self.current.id).exists()):
+            self.current = None
+        return self.current
+    
+    def put(self, data: bytes) -> str:
+        """Store data, once per distinct content; returns its object id."""
+        digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._write(path, zlib.compress(data))
+        return digest
+    
+    def get(self, digest: str) -> bytes:
+        """Contents of an object."""
+        return zlib.decompress(self._object_path(digest).read_bytes())
+    
+    def list(self, limit: Optional[int] = None) -> List[Checkpoint]:
+        """Checkpoints, newest first."""
+        ids = self._ids()[::-1]
+        return [c for c in (self._load(i) for i in ids[:limit]) if c is not None]
+    
+    def changes(self, count: int = 1) -> Dict[Path, Optional[bytes]]:
+        """Contents each file had before the last count checkpoints
+        (None: did not exist), i.e. what rewinding them writes back."""
+        restore: Dict[Path, Optional[bytes]] = {}
+        for checkpoint in self.list(count):
+            # Newest first, so the oldest checkpoint's copy wins
+            for name, digest in checkpoint.files.items():
+                restore[self._path(name)] = self.get(digest) if digest else None
+        return restore
+    
+    def drop(self, count: int = 1):
+        """Forget the last count checkpoints once they have been rewound."""
+        for checkpoint_id in self._ids()[::-1][:count]:
+            self._manifest_path(checkpoint_id).unlink()
+            if self.current is not None and self.current.id == checkpoint_id:
+                self.current = None
+    
+    def gc(self, max_age: Optional[float] = None, max_bytes: Optional[int] = None) -> int:
+        """Drop checkpoints older than max_age seconds, then the oldest until
+        their objects fit in max_bytes, then unreferenced objects. The newest
+        checkpoint is always kept. Returns the bytes freed."""
+        max_age = self.MAX_AGE if max_age is None else max_age
+        max_bytes = self.MAX_BYTES if max_bytes is None else max_bytes
+        sizes: Dict[str, int] = {}
+        if self.objects_dir.exists():
+            for entry in self.objects_dir.glob("*/*"):
+                sizes[entry.parent.name + entry.name] = entry.stat().st_size
+        
+        cutoff = time.time() - max_age
+        live: Set[str] = set()
+        total = 0
+        for n, checkpoint in enumerate(self.list()):
+            new = {d for d in checkpoint.files.values() if d and d not in live}
+            added = sum(sizes.get(d, 0) for d in new)
+            if n and (checkpoint.created < cutoff or total + added > max_bytes):
+                self._manifest_path(checkpoint.id).unlink()
+                continue
+            live |= new
+            total += added
+        
+        freed = 0
+        for digest, size in sizes.items():
+            if digest not in live:
+                try:
+                    self._object_path(digest).unlink()
+                    freed += size
+                except OSError:
+                    pass
+        return freed
+    
+    def _ids(self) -> List[int]:
+        """Checkpoint ids on disk, oldest first."""
+        if not self.checkpoints_dir.exists():
+            return []
+        return sorted(int(p.stem) for p in self.checkpoints_dir.glob("*.json") if p.stem.isdigit())
+    
+    def _load(self, checkpoint_id: int) -> Optional[Checkpoint]:
+        try:
+            data = json.loads(self._manifest_path(checkpoint_id).read_text())
+            return Checkpoint(checkpoint_id, data["created"], data.get("label", ""), data["files"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Could not read checkpoint {checkpoint_id}: {e}")
+            return None
+    
+    def _save(self, checkpoint: Checkpoint):
+        self.checkpoints_dir.mkdir(parents=True, exist_ok=True)
+        data = {"created": checkpoint.created, "label": checkpoint.label, "files": checkpoint.files}
+        self._write(self._manifest_path(checkpoint.id), json.dumps(data).encode("utf-8"))
+    
+    def _write(self, path: Path, data: bytes):
+        """Write via a temp file so readers never see a partial file."""
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    
+    def _manifest_path(self, checkpoint_id: int) -> Path:
+        return self.checkpoints_dir / f"{checkpoint_id:06d}.json"
+    
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest[2:]
+    
+    def _name(self, path: Path) -> str:
+        """path as stored: relative to the project when inside it."""
+        project = self.root.parent
+        return path.relative_to(project).as_posix() if project in path.parents else str(path)
+    
+    def _path(self, name: str) -> Path:
+        path = Path(name)
+        return path if path.is_absolute() else self.root.parent / path
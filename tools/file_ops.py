@@ -1,27 +1,171 @@
-"""File operations - Read, write, edit files"""
+"""File operations - Read, write, edit files
+
+Writes go to a temp file beside the target, are fsynced, and replace the
+target with os.replace, so a crash leaves either the old or the new file,
+never a truncated one. A symlink is followed and its target replaced, so
+it stays a link. A file with other hard links gets a new inode: the other
+names keep the old contents. Unless disabled, the previous contents of every
+file changed are kept in a checkpoint store (see tools.checkpoints), so the
+edits of the last turns can be undone.
+"""
 
 import os
+import tempfile
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from utils.read_cache import get_read_cache
+from .checkpoints import Checkpoint, CheckpointStore
+
+if TYPE_CHECKING:  # Imported where used, to keep startup light
+    from .line_index import LineIndex
+    from .patch import HunkResult
+
+@dataclass
+class BatchEditResult:
+    """Outcome of a committed batch_edit."""
+    files: List[str] = field(default_factory=list)
+    edits: int = 0
+    bytes_written: int = 0
+
+@dataclass
+class PatchResult:
+    """Outcome of apply_patch, hunk by hunk."""
+    files: List[str] = field(default_factory=list)  # Written; empty unless applied
+    hunks: List["HunkResult"] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)  # Problems outside any hunk
+    bytes_written: int = 0
+    
+    @property
+    def applied(self) -> bool:
+        """True if every hunk matched and there were no file errors."""
+        return not self.errors and all(h.applied for h in self.hunks)
+
+def _default_mode(directory: Path) -> int:
+    """Permissions a new file in directory gets under the current umask.
+    
+    The umask is read from /proc/self/status, as setting it to read it
+    back would race with other threads creating files; where that is
+    missing, a probe file is created and its mode read.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return 0o666 & ~int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    probe = directory / f".{uuid.uuid4().hex}.probe"
+    fd = os.open(probe, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        return os.fstat(fd).st_mode & 0o777
+    finally:
+        os.close(fd)
+        _unlink(probe)
+
+def _replace_target(path: Path) -> Path:
+    """The file a write to path replaces: the target of a symlink."""
+    return Path(os.path.realpath(path)) if path.is_symlink() else path
+
+def _write_temp(path: Path, data: bytes, mode: int) -> Path:
+    """Write data to a fsynced temp file in path's directory."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+    except BaseException:
+        _unlink(Path(tmp))
+        raise
+    return Path(tmp)
+
+def _unlink(path: Path):
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+def _fsync_dir(directory: Path):
+    """Persist renames in directory; not every platform allows it."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
 
 class FileOperations:
     """File operation tools."""
     
-    def __init__(self, working_dir: str = "."):
+    LINE_INDEX_CACHE = 16  # Files whose line offsets are kept
+    
+    CHECKPOINT_DIR = ".termux-cli"
+    
+    def __init__(self, working_dir: str = ".", checkpoints: bool = True):
         self.working_dir = Path(working_dir).resolve()
+        self._line_indexes: "OrderedDict[Path, LineIndex]" = OrderedDict()
+        self.checkpoints = CheckpointStore(self.working_dir / self.CHECKPOINT_DIR) if checkpoints else None
     
     def read(self, filepath: str) -> str:
-        """Read file contents."""
+        """Read file contents, through the shared read cache."""
+        return get_read_cache().read_text(self._resolve_path(filepath))
+    
+    def read_lines(self, filepath: str, start: int = 1, count: int = 100) -> str:
+        """Read count lines from 1-based line start, without loading the file.
+        
+        Line endings are kept. After the first call on a file, any range
+        costs one seek and one read of just those lines.
+        """
+        index = self._line_index(filepath)
+        return index.read(start - 1, count).decode('utf-8', errors='replace')
+    
+    def head(self, filepath: str, count: int = 10) -> str:
+        """The first count lines of a file."""
+        return self.read_lines(filepath, 1, count)
+    
+    def tail(self, filepath: str, count: int = 10) -> str:
+        """The last count lines of a file."""
+        index = self._line_index(filepath)
+        start = max(len(index) - count, 0)
+        return index.read(start, count).decode('utf-8', errors='replace')
+    
+    def line_count(self, filepath: str) -> int:
+        """Number of lines in a file."""
+        return len(self._line_index(filepath))
+    
+    def _line_index(self, filepath: str) -> "LineIndex":
+        """The up-to-date line index of a file, from the LRU cache if known."""
+        from .line_index import LineIndex
+        
         path = self._resolve_path(filepath)
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
+        index = self._line_indexes.pop(path, None) or LineIndex(path)
+        index.refresh()
+        self._line_indexes[path] = index
+        while len(self._line_indexes) > self.LINE_INDEX_CACHE:
+            self._line_indexes.popitem(last=False)
+        return index
     
     def write(self, filepath: str, content: str) -> bool:
-        """Write content to file."""
+        """Write content to file atomically, through a symlink."""
         path = self._resolve_path(filepath)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        target = _replace_target(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        mode = (target.stat().st_mode & 0o7777 if target.exists()
+                else _default_mode(target.parent))
+        self._record(path)
+        os.replace(_write_temp(target, content.encode('utf-8'), mode), target)
+        get_read_cache().invalidate(path)
+        get_read_cache().invalidate(target)
+        _fsync_dir(target.parent)
         return True
     
     def edit(self, filepath: str, old_text: str, new_text: str) -> bool:
@@ -32,6 +176,206 @@ class FileOperations:
         new_content = content.replace(old_text, new_text, 1)
         return self.write(filepath, new_content)
     
+    def batch_edit(self, edits: List[Tuple[str, str, str]]) -> BatchEditResult:
+        """Apply (path, old_text, new_text) edits as one transaction.
+        
+        Each file is read once and its edits applied in order in memory;
+        old_text must occur in the file as edited so far, or be empty to
+        create a missing file. Nothing is written unless every edit applies,
+        and a failure while writing rolls back the files already replaced.
+        """
+        originals: Dict[Path, Optional[bytes]] = {}
+        contents: Dict[Path, str] = {}
+        for filepath, old_text, new_text in edits:
+            path = self._resolve_path(filepath)
+            if path not in originals:
+                try:
+                    originals[path] = path.read_bytes()
+                except FileNotFoundError:
+                    originals[path] = None
+                if originals[path] is not None:
+                    contents[path] = originals[path].decode('utf-8')
+            if path not in contents:
+                if old_text:
+                    raise FileNotFoundError(f"File not found: {filepath}")
+                contents[path] = new_text
+            elif old_text not in contents[path]:
+                raise ValueError(f"Text not found in file: {filepath}")
+            else:
+                contents[path] = contents[path].replace(old_text, new_text, 1)
+        
+        result = BatchEditResult(edits=len(edits))
+        replaced, result.bytes_written = self._commit(originals, contents)
+        result.files = [self._display_path(path) for path in replaced]
+        return result
+    
+    def apply_patch(self, diff: str, fuzz: int = 2, dry_run: bool = False) -> "PatchResult":
+        """Apply a unified diff to any number of files in one transaction.
+        
+        Every hunk is located with line offset and up to fuzz lines of
+        context fuzz (see tools.patch) and reported in the result. Files
+        are only written if every hunk applies, through the same staged,
+        rolled-back commit as batch_edit; dry_run reports without writing.
+        /dev/null paths create or delete files; differing paths rename.
+        """
+        from .patch import apply_hunks, parse_patch
+        
+        result = PatchResult()
+        originals: Dict[Path, Optional[bytes]] = {}
+        contents: Dict[Path, Optional[str]] = {}
+        for file_patch in parse_patch(diff):
+            name = file_patch.new_path or file_patch.old_path
+            source = self._resolve_path(file_patch.old_path) if file_patch.old_path else None
+            target = self._resolve_path(file_patch.new_path) if file_patch.new_path else None
+            for path in (source, target):
+                if path is not None and path not in originals:
+                    try:
+                        originals[path] = path.read_bytes()
+                    except FileNotFoundError:
+                        originals[path] = None
+            
+            if source is None:
+                text = ""
+                if originals[target] is not None:
+                    result.errors.append(f"{name}: file already exists")
+            elif source in contents:
+                text = contents[source] or ""
+            elif originals[source] is None:
+                result.errors.append(f"{name}: file not found")
+                continue
+            else:
+                text = originals[source].decode('utf-8')
+            
+            text, hunks = apply_hunks(text, file_patch.hunks, name, fuzz)
+            result.hunks.extend(hunks)
+            if source is not None and source != target:
+                contents[source] = None
+            if target is not None:
+                contents[target] = text
+        
+        if not result.applied or dry_run:
+            return result
+        changed = {path: text for path, text in contents.items()
+                   if text is None or originals[path] != text.encode('utf-8')}
+        replaced, result.bytes_written = self._commit(originals, changed)
+        result.files = [self._display_path(path) for path in replaced]
+        return result
+    
+    def checkpoint(self, label: str = "") -> Optional[Checkpoint]:
+        """Start a new checkpoint, normally once per agent turn; the files
+        changed from now on are undone together."""
+        return self.checkpoints.begin(label) if self.checkpoints else None
+    
+    def undo(self) -> List[str]:
+        """Undo the changes of the latest checkpoint; see rewind."""
+        return self.rewind(1)
+    
+    def rewind(self, count: int = 1) -> List[str]:
+        """Restore the files changed in the last count checkpoints to what
+        they were before, as one transaction, and forget those checkpoints.
+        Returns the files restored."""
+        if self.checkpoints is None:
+            return []
+        contents = self.checkpoints.changes(count)
+        originals: Dict[Path, Optional[bytes]] = {}
+        for path in contents:
+            try:
+                originals[path] = path.read_bytes()
+            except FileNotFoundError:
+                originals[path] = None
+        changed = {path: data for path, data in contents.items() if originals[path] != data}
+        replaced, _ = self._commit(originals, changed, record=False)
+        self.checkpoints.drop(count)
+        return [self._display_path(path) for path in replaced]
+    
+    def _record(self, path: Path, original: Optional[bytes] = None):
+        """Keep path's current contents in the checkpoint store, once per
+        checkpoint; original saves re-reading them when already known."""
+        if self.checkpoints is None or self.checkpoints.recorded(path):
+            return
+        if original is None:
+            try:
+                original = path.read_bytes()
+            except FileNotFoundError:
+                pass
+        try:
+            self.checkpoints.record(path, original)
+        except OSError as e:
+            print(f"Warning: Could not checkpoint {path}: {e}")
+    
+    def _commit(self, originals: Dict[Path, Optional[bytes]],
+                contents: Dict[Path, Union[str, bytes, None]],
+                record: bool = True) -> Tuple[List[Path], int]:
+        """Write contents (None deletes) atomically, all or nothing.
+        
+        New contents are written to fsynced temp files, then all targets are
+        replaced; if any step fails, files already replaced get their
+        original contents back and the error is raised. Returns the paths
+        changed and the bytes written.
+        """
+        staged: List[Tuple[Optional[Path], Path]] = []
+        replaced: List[Path] = []
+        modes: Dict[Path, int] = {}
+        written = 0
+        try:
+            for path, text in contents.items():
+                if originals.get(path) is not None:
+                    modes[path] = path.stat().st_mode & 0o7777
+                if record:
+                    self._record(path, originals.get(path))
+                if text is None:
+                    staged.append((None, path))
+                    continue
+                data = text if isinstance(text, bytes) else text.encode('utf-8')
+                target = _replace_target(path)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                mode = modes[path] if path in modes else _default_mode(target.parent)
+                staged.append((_write_temp(target, data, mode), path))
+                written += len(data)
+            for tmp, path in staged:
+                if tmp is None:
+                    # Deleting a symlink removes the link, as rm does
+                    if path.exists() or path.is_symlink():
+                        path.unlink()
+                else:
+                    target = _replace_target(path)
+                    os.replace(tmp, target)
+                    get_read_cache().invalidate(target)
+                get_read_cache().invalidate(path)
+                replaced.append(path)
+        except BaseException:
+            for tmp, path in staged[len(replaced):]:
+                if tmp is not None:
+                    _unlink(tmp)
+            self._restore(originals, modes, replaced)
+            raise
+        
+        for directory in {path.parent for path in replaced}:
+            _fsync_dir(directory)
+        return replaced, written
+    
+    def _restore(self, originals: Dict[Path, Optional[bytes]], modes: Dict[Path, int],
+                 replaced: List[Path]):
+        """Put back the original contents of files a failed commit replaced."""
+        for path in replaced:
+            original = originals.get(path)
+            try:
+                if original is None:
+                    _unlink(path)
+                else:
+                    target = _replace_target(path)
+                    os.replace(_write_temp(target, original, modes[path]), target)
+                    get_read_cache().invalidate(target)
+                get_read_cache().invalidate(path)
+            except OSError as e:
+                print(f"Warning: Could not roll back {path}: {e}")
+    
+    def _display_path(self, path: Path) -> str:
+        """path relative to the working directory when inside it."""
+        if self.working_dir in path.parents:
+            return str(path.relative_to(self.working_dir))
+        return str(path)
+    
     def list_dir(self, path: str = ".") -> List[str]:
         """List directory contents."""
         dir_path = self._resolve_path(path)
@@ -0,0 +1,272 @@
+"""Fuzzy finder - Ranked subsequence matching over a cached path index
+
+Paths are kept in memory in a compact form: an interned table of
+directory prefixes, one string of file names addressed by array offsets,
+and a lowercased newline-joined haystack for matching. A regex finds every
+line containing the query as a subsequence in one C-level scan; only those
+lines are scored, fzf style, with bonuses for matches at word boundaries,
+consecutive runs and the file name. The index is refreshed incrementally:
+only directories whose mtime changed are walked again.
+"""
+
+import heapq
+import re
+import time
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SCORE_MATCH = 16
+BONUS_BOUNDARY = 8  # After _ - . or space
+BONUS_SEPARATOR = 10  # After / or at the start
+BONUS_CONSECUTIVE = 6
+BONUS_BASENAME = 12  # Whole match inside the file name
+MAX_GAP_PENALTY = 8
+
+@dataclass
+class FuzzyMatch:
+    """A ranked fuzzy finder result."""
+    path: str
+    score: int
+
+def fuzzy_score(query: str, text: str, end: Optional[int] = None) -> Optional[int]:
+    """Score query as a subsequence of text (both lowercase), or None.
+    
+    The shortest window ending at the earliest complete match is scored,
+    the way fzf's fast path does. Pass end, the offset just past that match,
+    when it is already known.
+    """
+    if end is None:
+        end = -1
+        for char in query:
+            end = text.find(char, end + 1)
+            if end == -1:
+                return None
+        end += 1
+    positions = []
+    for char in reversed(query):
+        end = text.rfind(char, 0, end)
+        positions.append(end)
+    positions.reverse()
+    
+    score = 0
+    prev = -1
+    for pos in positions:
+        score += SCORE_MATCH
+        before = text[pos - 1] if pos else "/"
+        if before == "/":
+            score += BONUS_SEPARATOR
+        elif before in "_-. ":
+            score += BONUS_BOUNDARY
+        if prev >= 0:
+            if pos == prev + 1:
+                score += BONUS_CONSECUTIVE
+            else:
+                score -= min(pos - prev - 1, MAX_GAP_PENALTY)
+        prev = pos
+    if positions[0] > text.rfind("/"):
+        score += BONUS_BASENAME
+    return score
+
+def _mtime(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return -1
+
+class PathIndex:
+    """In-memory index of the file paths under a root."""
+    
+    MAX_AGE = 2.0  # Seconds between mtime checks
+    
+    def __init__(self, root: str = ".", walker=None):
+        self.root = Path(root).resolve()
+        if walker is None:
+            from .walker import Walker
+            walker = Walker(str(self.root))
+        self.walker = walker
+        self.prefixes: List[str] = []  # Interned directory prefixes, "" for the root
+        self._prefix_ids = array("I")  # Path number -> prefix id
+        self._names = ""  # File names joined by newlines
+        self._name_starts = array("I")  # Path number -> offset into _names
+        self._haystack = ""  # Lowercased full paths joined by newlines
+        self._line_starts = array("I")  # Path number -> offset into _haystack
+        self._last: Tuple[str, List[int]] = ("", [])  # Last query and its line starts
+        self._dir_mtimes: Dict[str, int] = {}  # Prefix -> directory mtime_ns
+        self._checked = 0.0
+    
+    def __len__(self) -> int:
+        return len(self._prefix_ids)
+    
+    def path(self, i: int) -> str:
+        """The relative path of path number i."""
+        start = self._name_starts[i]
+        end = self._names.find("\n", start)
+        return self.prefixes[self._prefix_ids[i]] + self._names[start:end]
+    
+    def paths(self) -> Iterable[str]:
+        """All indexed relative paths, sorted."""
+        for i in range(len(self)):
+            yield self.path(i)
+    
+    def refresh(self, force: bool = False) -> int:
+        """Pick up changes in directories whose mtime changed; returns how many.
+        
+        A changed directory is listed again without recursing; only its new
+        subdirectories are walked, and vanished ones are dropped.
+        """
+        now = time.monotonic()
+        if not force and self._dir_mtimes and now - self._checked < self.MAX_AGE:
+            return 0
+        self._checked = now
+        
+        if not self._dir_mtimes:
+            self._build(self._walk(""))
+            return 1
+        
+        changed = [d for d, m in sorted(self._dir_mtimes.items()) if _mtime(self.root / d) != m]
+        if not changed:
+            return 0
+        
+        relisted = set()
+        dropped: List[str] = []
+        added: List[str] = []
+        for prefix in changed:
+            if any(prefix.startswith(d) for d in dropped):
+                continue
+            mtime = _mtime(self.root / prefix)
+            if mtime == -1:
+                dropped.append(prefix)
+                continue
+            self._dir_mtimes[prefix] = mtime
+            relisted.add(prefix)
+            subdirs = set()
+            for entry in self.walker.walk(self.root / prefix, dirs=True, recursive=False):
+                rel = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.add(rel + "/")
+                    if rel + "/" not in self._dir_mtimes:
+                        added.extend(self._walk(rel + "/"))
+                else:
+                    added.append(rel)
+            for d in self._dir_mtimes:
+                child = d[len(prefix):-1]
+                if d.startswith(prefix) and child and "/" not in child and d not in subdirs:
+                    dropped.append(d)
+        
+        for d in [d for d in self._dir_mtimes if any(d.startswith(t) for t in dropped)]:
+            del self._dir_mtimes[d]
+        stale = {
+            i for i, prefix in enumerate(self.prefixes)
+            if prefix in relisted or any(prefix.startswith(t) for t in dropped)
+        }
+        kept = [self.path(i) for i in range(len(self)) if self._prefix_ids[i] not in stale]
+        self._build(kept + added)
+        return len(changed)
+    
+    def _walk(self, prefix: str) -> List[str]:
+        """Files under prefix, recording directory mtimes along the way."""
+        start = self.root / prefix
+        mtime = _mtime(start)
+        if mtime == -1:
+            return []
+        self._dir_mtimes[prefix] = mtime
+        files = []
+        for entry in self.walker.walk(start, dirs=True):
+            rel = Path(entry.path).relative_to(self.root).as_posix()
+            if entry.is_dir(follow_symlinks=False):
+                try:
+                    self._dir_mtimes[rel + "/"] = entry.stat(follow_symlinks=False).st_mtime_ns
+                except OSError:
+                    continue
+            else:
+                files.append(rel)
+        return files
+    
+    def _build(self, paths: List[str]):
+        """Pack paths into the prefix table, name string and offset arrays."""
+        paths.sort()
+        prefix_table: Dict[str, int] = {}
+        prefix_ids = array("I")
+        name_starts = array("I")
+        line_starts = array("I")
+        names = []
+        offset = 0
+        line = 0
+        for path in paths:
+            cut = path.rfind("/") + 1
+            prefix = path[:cut]
+            prefix_id = prefix_table.get(prefix)
+            if prefix_id is None:
+                prefix_id = prefix_table[prefix] = len(prefix_table)
+            prefix_ids.append(prefix_id)
+            name_starts.append(offset)
+            line_starts.append(line)
+            names.append(path[cut:])
+            offset += len(path) - cut + 1
+            # Lowercasing can change the length of non-ASCII names
+            line += len(path.lower()) + 1
+        
+        self.prefixes = list(prefix_table)
+        self._prefix_ids = prefix_ids
+        self._name_starts = name_starts
+        self._names = "\n".join(names) + "\n" if names else ""
+        self._haystack = "\n".join(paths).lower()
+        self._line_starts = line_starts
+        self._last = ("", [])
+    
+    def search(self, query: str, limit: int = 20) -> List[FuzzyMatch]:
+        """Top paths containing query as a subsequence, best first."""
+        self.refresh()
+        query = "".join(query.lower().split())
+        if not query:
+            return []
+        
+        haystack = self._haystack
+        previous, lines = self._last
+        if previous and query.startswith(previous):
+            found = self._narrow(query, lines)
+        else:
+            found = self._scan(query)
+        
+        scored: List[Tuple[int, int, int]] = []
+        lines = []
+        for pos, match_end in found:
+            start = haystack.rfind("\n", 0, pos) + 1
+            end = haystack.find("\n", match_end)
+            if end == -1:
+                end = len(haystack)
+            lines.append(start)
+            score = fuzzy_score(query, haystack[start:end], match_end - start)
+            scored.append((-score, end - start, start))
+        self._last = (query, lines)
+        
+        best = heapq.nsmallest(limit, scored)
+        return [
+            FuzzyMatch(self.path(bisect_right(self._line_starts, start) - 1), -neg)
+            for neg, _, start in best
+        ]
+    
+    def _scan(self, query: str) -> Iterator[Tuple[int, int]]:
+        """(offset, match end) of query in every line that contains it.
+        
+        The regex starts at a literal so re can skip ahead quickly. Each
+        later char is found by skipping everything else, and the rest of the
+        line is consumed either way, so every line is tried at most once.
+        """
+        rest = "".join(f"[^\n{re.escape(c)}]*{re.escape(c)}" for c in query[1:])
+        regex = re.compile(f"{re.escape(query[0])}(?:{rest}()|)[^\n]*")
+        for match in regex.finditer(self._haystack):
+            if match.lastindex:
+                yield match.start(), match.start(1)
+    
+    def _narrow(self, query: str, lines: List[int]) -> Iterator[Tuple[int, int]]:
+        """Like _scan, but only re-checks the lines that matched a prefix
+        of query; a longer query can only narrow the result."""
+        regex = re.compile("".join(f"[^\n{re.escape(c)}]*{re.escape(c)}" for c in query))
+        for start in lines:
+            match = regex.match(self._haystack, start)
+            if match is not None:
+                yield start, match.end()
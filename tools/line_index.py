@@ -0,0 +1,82 @@
+"""Line index - Byte offsets of line starts for ranged reads of large files
+
+One pass over a memory-mapped file records where every line starts, in a
+compact array; after that any line range is a seek and a read, without
+touching the rest of the file. Newlines are found by a regex over the map
+feeding the array directly, so the scan stays in C and never copies a
+line, however long. An index is keyed by (inode, mtime, size): a file that
+only grew, like a log, is scanned from where the last scan stopped, and
+anything else is scanned again.
+"""
+
+import mmap
+import os
+import re
+from array import array
+from pathlib import Path
+from typing import Optional, Tuple
+
+NEWLINE = re.compile(rb"\n")
+SAMPLE_SIZE = 64  # Bytes compared to tell an append from a rewrite
+
+class LineIndex:
+    """Line start offsets of one file."""
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.key: Optional[Tuple[int, int, int]] = None  # (inode, mtime_ns, size)
+        self.size = 0
+        self.offsets = array("I", [0])  # Start of every line, plus size after a final newline
+        self._sample = b""
+    
+    def __len__(self) -> int:
+        """Number of lines; a final line without a newline counts."""
+        return len(self.offsets) - (1 if self.offsets[-1] == self.size else 0)
+    
+    def refresh(self) -> bool:
+        """Bring the index up to date; returns True if the file was scanned."""
+        st = os.stat(self.path)
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key == self.key:
+            return False
+        with open(self.path, "rb") as f:
+            if not self._appended(f, st):
+                self.size = 0
+                self.offsets = array("I", [0])
+            self._scan(f, st.st_size)
+            start = max(st.st_size - SAMPLE_SIZE, 0)
+            f.seek(start)
+            self._sample = f.read(st.st_size - start)
+        self.key = key
+        return True
+    
+    def _appended(self, f, st) -> bool:
+        """True if the file is the one indexed with bytes added at the end."""
+        if self.key is None or st.st_ino != self.key[0] or st.st_size <= self.size:
+            return False
+        f.seek(self.size - len(self._sample))
+        return f.read(len(self._sample)) == self._sample
+    
+    def _scan(self, f, size: int):
+        """Record line starts between self.size and size."""
+        if size >= 2 ** 32 and self.offsets.typecode == "I":
+            self.offsets = array("Q", self.offsets)
+        if size > self.size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                self.offsets.extend(map(re.Match.end, NEWLINE.finditer(buf, self.size, size)))
+        self.size = size
+    
+    def span(self, start: int, count: int) -> Tuple[int, int]:
+        """Byte range of count lines from 0-based line start."""
+        lines = len(self)
+        start = min(max(start, 0), lines)
+        end = min(start + max(count, 0), lines)
+        stop = self.offsets[end] if end < len(self.offsets) else self.size
+        return self.offsets[start], stop
+    
+    def read(self, start: int, count: int) -> bytes:
+        """Bytes of count lines from 0-based line start."""
+        first, stop = self.span(start, count)
+        with open(self.path, "rb") as f:
+            f.seek(first)
+            return f.read(stop - first)
@@ -0,0 +1,90 @@
+"""Multi-pattern search - Match many patterns in one pass
+
+Literal patterns are compiled into a single regex shaped like a trie
+(common prefixes shared, as in an Aho-Corasick goto graph), so re tests
+them all at each position in C. Other patterns join the same regex as
+alternatives, except those with groups, backreferences or global inline
+flags, which would be renumbered, clash or fail to compile there. The
+combined regex only finds the lines some pattern may match; every
+pattern is then run on those lines on its own, so each reports all of
+its matches, overlapping or not.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+def literal_trie(words: List[str]) -> str:
+    """A regex matching any of words, with shared prefixes factored out."""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A word ends here; the greedy ? still prefers the longer words
+            return f"(?:{body})?" if len(branches) == 1 else body + "?"
+        return body
+    
+    return build(trie)
+
+REGEX_CHARS = set(".^$*+?{}[]\\|()")
+
+def is_literal(pattern: str) -> bool:
+    """True if pattern has no regex metacharacters."""
+    return not REGEX_CHARS.intersection(pattern)
+
+class MultiPattern:
+    """Several patterns searched as one, in place of a compiled regex.
+    
+    finditer() returns the matches of every pattern on a line, by
+    position and then pattern order; pattern_of() says which pattern a
+    match came from. Literals (all patterns if fixed_strings) are matched
+    as plain text.
+    """
+    
+    def __init__(self, patterns: List[str], fixed_strings: bool = False):
+        self.regexes: List["re.Pattern"] = []
+        self._sources: Dict["re.Pattern", str] = {}
+        literals, branches = [], []
+        self._separate: List["re.Pattern"] = []
+        for pattern in dict.fromkeys(p for p in patterns if p):
+            literal = fixed_strings or is_literal(pattern)
+            regex = re.compile(re.escape(pattern) if literal else pattern)
+            if regex in self._sources:
+                continue
+            self.regexes.append(regex)
+            self._sources[regex] = pattern
+            if literal:
+                literals.append(pattern)
+            elif regex.groups or regex.flags & ~re.UNICODE:
+                self._separate.append(regex)
+            else:
+                branches.append(f"(?:{pattern})")
+        if literals:
+            branches.insert(0, literal_trie(sorted(literals)))
+        self._any = re.compile("|".join(branches)) if branches else None
+    
+    def __bool__(self) -> bool:
+        return bool(self.regexes)
+    
+    def finditer(self, line: str) -> List["re.Match"]:
+        """Matches of every pattern in line."""
+        if self._any is not None and self._any.search(line):
+            regexes = self.regexes
+        else:
+            regexes = self._separate
+        found = [match for regex in regexes for match in regex.finditer(line)]
+        found.sort(key=lambda match: match.start())
+        return found
+    
+    def pattern_of(self, match: "re.Match") -> Optional[str]:
+        """The pattern, as given, that produced match."""
+        return self._sources.get(match.re)
@@ -0,0 +1,205 @@
+"""Patch engine - Parse unified diffs and apply hunks with offset and fuzz
+
+Hunks are located the way GNU patch does it: at the line the header names,
+shifted by what earlier hunks in the file added or removed, then at the
+nearest line where the context matches, searching outward. A hunk that
+still does not match is retried ignoring trailing whitespace, then with up
+to fuzz context lines dropped from each end. Line endings of the target
+file are kept.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+DEV_NULL = "/dev/null"
+
+@dataclass
+class Hunk:
+    """One @@ block: (op, text) lines with op in " -+", text without EOL."""
+    old_start: int
+    old_count: int
+    new_start: int
+    new_count: int
+    lines: List[Tuple[str, str]] = field(default_factory=list)
+    old_eof_newline: bool = True  # False after "\ No newline at end of file"
+    new_eof_newline: bool = True
+
+@dataclass
+class FilePatch:
+    """The hunks for one file; a path is None for /dev/null."""
+    old_path: Optional[str]
+    new_path: Optional[str]
+    hunks: List[Hunk] = field(default_factory=list)
+
+@dataclass
+class HunkResult:
+    """How one hunk applied."""
+    file: str
+    hunk: int  # 1-based within the file
+    applied: bool
+    line: int = 0  # 1-based line where the matched lines start
+    offset: int = 0  # Lines away from where the header said
+    fuzz: int = 0  # Context lines ignored at each end
+    error: str = ""
+
+def _strip_path(path: str) -> Optional[str]:
+    """Header path without timestamp or a/ b/ prefix; None for /dev/null."""
+    path = path.split("\t")[0].strip()
+    if path == DEV_NULL:
+        return None
+    if path.startswith(("a/", "b/")):
+        path = path[2:]
+    return path
+
+def parse_patch(text: str) -> List[FilePatch]:
+    """Parse a unified diff; anything between file sections is ignored."""
+    patches: List[FilePatch] = []
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            patches.append(FilePatch(_strip_path(line[4:]), _strip_path(lines[i + 1][4:])))
+            i += 2
+            continue
+        match = HUNK_HEADER.match(line)
+        if not match:
+            i += 1
+            continue
+        if not patches:
+            raise ValueError(f"Hunk before any file header at line {i + 1}")
+        old_start, old_count, new_start, new_count = (
+            int(g) if g is not None else 1 for g in match.groups())
+        hunk = Hunk(old_start, old_count, new_start, new_count)
+        patches[-1].hunks.append(hunk)
+        old_left, new_left = old_count, new_count
+        i += 1
+        last = ""
+        while i < len(lines) and (old_left > 0 or new_left > 0 or lines[i].startswith("\\")):
+            line = lines[i]
+            if line.startswith("\\"):
+                # "\ No newline at end of file" marks the line before it
+                if last in (" ", "-"):
+                    hunk.old_eof_newline = False
+                if last in (" ", "+"):
+                    hunk.new_eof_newline = False
+                i += 1
+                continue
+            op, body = (line[0], line[1:]) if line else (" ", "")
+            if op not in " -+":
+                raise ValueError(f"Unexpected line in hunk at line {i + 1}: {line!r}")
+            if op in " -":
+                old_left -= 1
+            if op in " +":
+                new_left -= 1
+            if old_left < 0 or new_left < 0:
+                raise ValueError(f"Hunk longer than its header at line {i + 1}")
+            hunk.lines.append((op, body))
+            last = op
+            i += 1
+        if old_left > 0 or new_left > 0:
+            raise ValueError(f"Hunk at line {i} ends early")
+    return [p for p in patches if p.hunks or p.old_path != p.new_path]
+
+def split_lines(text: str) -> Tuple[List[str], List[str]]:
+    """Lines without endings, and each line's ending ("" for a last line
+    without one)."""
+    bodies, endings = [], []
+    for match in re.finditer(r'([^\n]*?)(\r?\n|$)', text):
+        body, ending = match.groups()
+        if not body and not ending:
+            break
+        bodies.append(body)
+        endings.append(ending)
+    return bodies, endings
+
+def _find(lines: List[str], old: List[str], expected: int, floor: int,
+          loose: bool) -> Optional[int]:
+    """Position nearest expected (not before floor) where old matches."""
+    if loose:
+        lines = [line.rstrip() for line in lines]
+        old = [line.rstrip() for line in old]
+    last = len(lines) - len(old)
+    if last < floor:
+        return None
+    expected = min(max(expected, floor), last)
+    for distance in range(max(expected - floor, last - expected) + 1):
+        for pos in (expected - distance, expected + distance):
+            if floor <= pos <= last and lines[pos:pos + len(old)] == old:
+                return pos
+    return None
+
+def apply_hunks(text: str, hunks: List[Hunk], name: str,
+                fuzz: int = 2) -> Tuple[str, List[HunkResult]]:
+    """Apply hunks to text; failed hunks are reported and skipped."""
+    lines, endings = split_lines(text)
+    newline = "\r\n" if endings and endings[0] == "\r\n" else "\n"
+    results: List[HunkResult] = []
+    shift = 0  # Lines added minus removed by the hunks applied so far
+    floor = 0  # Hunks apply in order and may not overlap
+    for number, hunk in enumerate(hunks, 1):
+        found = None
+        for level in range(fuzz + 1):
+            ops = _trim_context(hunk.lines, level)
+            if ops is None:
+                break
+            old = [body for op, body in ops if op != "+"]
+            lead = _leading_context(hunk.lines) - _leading_context(ops)
+            expected = hunk.old_start - 1 + lead + shift if hunk.old_count else hunk.old_start + shift
+            for loose in (False, True):
+                pos = _find(lines, old, expected, floor, loose)
+                if pos is not None:
+                    found = (pos, ops, level, expected)
+                    break
+            if found or not old:
+                break
+        if found is None:
+            results.append(HunkResult(name, number, False, error="context not found"))
+            continue
+        pos, ops, level, expected = found
+        # Context keeps the file's own text and endings; added lines get
+        # the file's newline style
+        new, new_endings = [], []
+        cursor = pos
+        for op, body in ops:
+            if op == " ":
+                new.append(lines[cursor])
+                new_endings.append(endings[cursor])
+            elif op == "+":
+                new.append(body)
+                new_endings.append(newline)
+            if op != "+":
+                cursor += 1
+        old_len = cursor - pos
+        if ops and ops[-1][0] == "+" and cursor == len(lines) and not hunk.new_eof_newline:
+            new_endings[-1] = ""
+        lines[pos:cursor] = new
+        endings[pos:cursor] = new_endings
+        shift += len(new) - old_len
+        floor = pos + len(new)
+        results.append(HunkResult(name, number, True, line=pos + 1,
+                                  offset=pos - expected, fuzz=level))
+    return "".join(body + ending for body, ending in zip(lines, endings)), results
+
+def _leading_context(ops: List[Tuple[str, str]]) -> int:
+    count = 0
+    for op, _ in ops:
+        if op != " ":
+            break
+        count += 1
+    return count
+
+def _trim_context(ops: List[Tuple[str, str]], level: int) -> Optional[List[Tuple[str, str]]]:
+    """ops with up to level context lines dropped from each end, or None
+    if that drops nothing more than level - 1 did."""
+    def trim(n):
+        lead = min(n, _leading_context(ops))
+        trail = min(n, _leading_context(ops[lead:][::-1]))
+        return ops[lead:len(ops) - trail]
+    
+    if level == 0:
+        return ops
+    trimmed = trim(level)
+    return None if len(trimmed) == len(trim(level - 1)) else trimmed
@@ -0,0 +1,233 @@
+"""Repo map - Ranked, token-budgeted summary of a repository
+
+Lists the directory tree, file sizes and the top-level symbols of each
+source file, most important files first, trimmed to fit a token budget so
+it can go into the system prompt. Importance combines how many other files
+mention a file's symbols with how recently git saw it change; uncommitted
+changes rank highest. The rendered map is cached by git HEAD plus the stat
+fingerprints of dirty files, and rebuilding after a few edits only parses
+those files again through the symbol index.
+"""
+
+import hashlib
+import marshal
+import math
+import os
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+MAP_VERSION = 1
+RECENT_COMMITS = 200  # Commits looked at for recency
+MAX_SYMBOLS = 12  # Public top-level symbols listed per file
+TREE_DEPTH = 2
+
+REFERENCE_WEIGHT = 1.0  # Per doubling of the files mentioning a file's symbols
+RECENCY_WEIGHT = 4.0  # For the most recently committed file, fading with age
+DIRTY_BONUS = 6.0  # Uncommitted changes
+
+@dataclass
+class FileSummary:
+    """One file's entry in the repo map."""
+    path: str
+    size: int
+    symbols: List[str] = field(default_factory=list)
+    score: float = 0.0
+
+def _format_size(size: int) -> str:
+    for unit in ("B", "K", "M"):
+        if size < 1024:
+            return f"{size}{unit}" if unit == "B" else f"{size:.0f}{unit}"
+        size /= 1024
+    return f"{size:.0f}G"
+
+def _fingerprint(path: Path) -> str:
+    try:
+        st = path.stat()
+        return f"{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        return "-"
+
+class RepoMap:
+    """Builds and caches the repo map for a working directory."""
+    
+    def __init__(self, root: str = ".", symbols=None, walker=None,
+                 cache_path: Optional[Path] = None):
+        self.root = Path(root).resolve()
+        name = hashlib.sha256(str(self.root).encode()).hexdigest()[:16]
+        if cache_path is None:
+            cache_path = Path.home() / ".termux-cli" / "cache" / "index" / f"{name}.map"
+        self.path = Path(cache_path)
+        if walker is None:
+            from .walker import Walker
+            walker = Walker(str(self.root))
+        self.walker = walker
+        if symbols is None:
+            from .symbols import SymbolIndex
+            symbols = SymbolIndex(str(self.root), walker=walker)
+        self.symbols = symbols
+        self._cache: Dict = {}
+        self._load()
+    
+    def _load(self):
+        """Load the cached map; a missing or damaged file means none."""
+        try:
+            with open(self.path, "rb") as f:
+                data = marshal.load(f)
+            if data["version"] == MAP_VERSION and data["root"] == str(self.root):
+                self._cache = data
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            self._cache = {}
+    
+    def _save(self):
+        """Write the cache atomically; failures only cost a rebuild later."""
+        data = dict(self._cache, version=MAP_VERSION, root=str(self.root))
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "wb") as f:
+                marshal.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Warning: Could not write repo map cache: {e}")
+    
+    def _git(self, *args) -> Optional[str]:
+        """Output of a git command in root, or None if it fails."""
+        try:
+            result = subprocess.run(["git", *args], cwd=self.root,
+                                    capture_output=True, text=True)
+        except OSError:
+            return None
+        return result.stdout if result.returncode == 0 else None
+    
+    def _dirty(self) -> Optional[List[str]]:
+        """Paths with uncommitted changes relative to root, or None outside git."""
+        out = self._git("status", "--porcelain", "-z", "--untracked-files=all", "--", ".")
+        if out is None:
+            return None
+        prefix = (self._git("rev-parse", "--show-prefix") or "").strip()
+        paths = []
+        entries = iter(out.split("\0"))
+        for entry in entries:
+            if len(entry) < 4:
+                continue
+            if entry[0] in "RC":
+                next(entries, None)  # The rename source follows
+            path = entry[3:]
+            paths.append(path[len(prefix):] if path.startswith(prefix) else path)
+        return sorted(paths)
+    
+    def cache_key(self) -> Optional[str]:
+        """Hash of HEAD and the fingerprints of dirty files; None outside git,
+        where the map is rebuilt (incrementally) every time."""
+        head = self._git("rev-parse", "HEAD")
+        dirty = self._dirty()
+        if head is None or dirty is None:
+            return None
+        hasher = hashlib.sha256(f"{MAP_VERSION}\0{head.strip()}\0".encode())
+        for rel in dirty:
+            hasher.update(f"{rel}\0{_fingerprint(self.root / rel)}\0".encode())
+        return hasher.hexdigest()
+    
+    def get(self, max_tokens: int = 1024) -> str:
+        """The map for max_tokens, served from the cache while the key holds."""
+        key = self.cache_key()
+        cache = self._cache
+        if key is not None and cache.get("key") == key and cache.get("tokens") == max_tokens:
+            return cache["text"]
+        text = self.render(self.summaries(), max_tokens)
+        if key is not None:
+            self._cache.update(key=key, tokens=max_tokens, text=text)
+            self._save()
+        return text
+    
+    def _recency(self) -> Dict[str, float]:
+        """Path -> 1.0 for the latest commit down towards 0 for older ones,
+        remembered per HEAD so dirty edits don't rerun git log."""
+        head = (self._git("rev-parse", "HEAD") or "").strip()
+        if head and self._cache.get("head") == head:
+            return self._cache["recency"]
+        out = self._git("log", f"-n{RECENT_COMMITS}", "--format=%x00", "--name-only",
+                        "--relative", "--", ".")
+        recency: Dict[str, float] = {}
+        if out:
+            commits = out.split("\0")[1:]
+            for age, commit in enumerate(commits):
+                for rel in commit.split("\n"):
+                    if rel and rel not in recency:
+                        recency[rel] = 1.0 - age / len(commits)
+        if head:
+            self._cache.update(head=head, recency=recency)
+        return recency
+    
+    def summaries(self) -> List[FileSummary]:
+        """Every walked file with its size, symbols and score, best first."""
+        self.symbols.update()
+        recency = self._recency()
+        dirty: Set[str] = set(self._dirty() or ())
+        
+        files: List[FileSummary] = []
+        for entry in self.walker.walk(self.root):
+            try:
+                size = entry.stat().st_size
+            except OSError:
+                continue
+            files.append(FileSummary(Path(entry.path).relative_to(self.root).as_posix(), size))
+        
+        for summary in files:
+            known = self.symbols.files.get(summary.path)
+            mentioned: Set[str] = set()
+            if known is not None:
+                top = sorted((line, name) for name, _, line, container in known[2]
+                             if not container and not name.startswith("_"))
+                summary.symbols = [name for _, name in top]
+                for name in set(summary.symbols):
+                    mentioned.update(self.symbols.mentioned_in(name))
+                mentioned.discard(summary.path)
+            summary.score = (REFERENCE_WEIGHT * math.log2(1 + len(mentioned))
+                             + RECENCY_WEIGHT * recency.get(summary.path, 0.0)
+                             + (DIRTY_BONUS if summary.path in dirty else 0.0))
+        files.sort(key=lambda s: (-s.score, s.path))
+        return files
+    
+    def render(self, files: List[FileSummary], max_tokens: int) -> str:
+        """Directory tree then file lines, best files first until the budget
+        is spent; the chosen lines are printed in path order."""
+        from core.conversation import estimate_tokens
+        
+        if not files:
+            return ""
+        counts: Dict[str, int] = {}
+        for summary in files:
+            parts = summary.path.split("/")[:-1]
+            for depth in range(1, min(len(parts), TREE_DEPTH) + 1):
+                directory = "/".join(parts[:depth]) + "/"
+                counts[directory] = counts.get(directory, 0) + 1
+        
+        header = f"Repository map ({len(files)} files, most important listed):"
+        lines = [header]
+        budget = max_tokens - estimate_tokens(header)
+        if counts:
+            tree = "Directories: " + ", ".join(f"{d} ({n})" for d, n in sorted(counts.items()))
+            if estimate_tokens(tree) <= budget // 4:
+                lines.append(tree)
+                budget -= estimate_tokens(tree)
+        
+        chosen: List[Tuple[str, str]] = []
+        for summary in files:
+            line = f"{summary.path} [{_format_size(summary.size)}]"
+            if summary.symbols:
+                names = summary.symbols[:MAX_SYMBOLS]
+                more = len(summary.symbols) - len(names)
+                line += ": " + ", ".join(names) + (f", +{more}" if more > 0 else "")
+            cost = estimate_tokens(line) + 1
+            if cost > budget:
+                continue
+            budget -= cost
+            chosen.append((summary.path, line))
+        
+        lines.extend(line for _, line in sorted(chosen))
+        if len(chosen) < len(files):
+            lines.append(f"(+{len(files) - len(chosen)} more files)")
+        return "\n".join(lines)
@@ -1,11 +1,27 @@
 """Search tool - Search files and content"""
 
+import mmap
 import os
 import re
+import time
+from collections import deque
+from fnmatch import fnmatch
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 
+from utils.helpers import BINARY_SNIFF_SIZE, is_binary_data
+from .walker import Walker
+
+if TYPE_CHECKING:  # Imported where used, to keep startup light
+    from .symbols import Symbol, SymbolRef
+    from .semantic import SemanticMatch
+
+MMAP_THRESHOLD = 64 * 1024  # Smaller files are read, larger ones mapped
+SCAN_WINDOW = 1024 * 1024  # Bytes prefiltered between deadline checks
+CHECK_EVERY = 1024  # Lines matched between deadline checks
+
 @dataclass
 class SearchMatch:
     """A search match result."""
@@ -13,49 +29,426 @@ class SearchMatch:
     line_number: int
     line_content: str
     match: str
+    group: Optional[str] = None  # Name of the regex group that matched, if any
+    pattern: Optional[str] = None  # Which pattern hit, for grep_many
+
+def _regexes(regex) -> list:
+    """The compiled regexes behind regex, several for a MultiPattern."""
+    return getattr(regex, "regexes", [regex])
+
+def _pattern_of(regex, match) -> Optional[str]:
+    """Which of a MultiPattern's patterns produced match; None otherwise."""
+    pattern_of = getattr(regex, "pattern_of", None)
+    return None if pattern_of is None else pattern_of(match)
+
+@lru_cache(maxsize=64)
+def _prefilter(sources: Tuple[Tuple[str, int], ...]):
+    """Bytes regex for the literals every match of one of the (pattern,
+    flags) sources must contain, or None if a source needs the text scan.
+    
+    The prefilter only picks candidate lines; each one is decoded and
+    matched with the original regex, so \\w, \\d, \\b, \\A, . and case
+    folding keep their Unicode, per-line meaning.
+    """
+    from .search_index import ignores_case, required_literals
+    
+    branches = set()
+    for pattern, flags in sources:
+        literals = required_literals(pattern, flags)
+        if literals is None:
+            return None
+        # Scoped (?i:...) groups count too: the literal may be any case
+        ignorecase = ignores_case(pattern, flags)
+        for literal in literals:
+            branch = re.escape(literal.encode('ascii'))
+            branches.add(b"(?i:" + branch + b")" if ignorecase else branch)
+    if not branches:
+        return None
+    return re.compile(b"|".join(sorted(branches)))
+
+def search_file(filepath: Path, regex, root: Path, limit: Optional[int] = None,
+                deadline: Optional[float] = None) -> List[SearchMatch]:
+    """Search within a single file, stopping after limit matches or once
+    time.monotonic() passes deadline, with the matches found so far.
+    
+    The file is scanned as bytes, memory-mapped when large, for the
+    literals a match requires, so files without one are never decoded.
+    Only the lines holding such a literal are decoded and matched with the
+    original regex, which keeps results the same as a line-by-line text
+    scan. Patterns without a required literal get the text scan.
+    """
+    prefilter = _prefilter(tuple((r.pattern, r.flags) for r in _regexes(regex)))
+    if prefilter is None:
+        return _search_text(filepath, regex, root, limit, deadline)
+    
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        if size < MMAP_THRESHOLD:
+            return _search_buffer(f.read(), filepath, regex, prefilter, root, limit, deadline)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return _search_buffer(buf, filepath, regex, prefilter, root, limit, deadline)
+
+def _count_newlines(buf, start: int, stop: int) -> int:
+    """Newlines in buf[start:stop], copying at most SCAN_WINDOW bytes at a
+    time (mmap has no count())."""
+    count = 0
+    for pos in range(start, stop, SCAN_WINDOW):
+        count += buf[pos:min(pos + SCAN_WINDOW, stop)].count(b'\n')
+    return count
+
+def _search_buffer(buf, filepath: Path, regex, prefilter, root: Path,
+                   limit: Optional[int] = None,
+                   deadline: Optional[float] = None) -> List[SearchMatch]:
+    """Find candidate lines with prefilter over a buffer, numbering only
+    those, and match regex on each. The buffer is prefiltered in windows
+    of whole lines so the deadline is checked as the scan goes."""
+    if is_binary_data(buf[:BINARY_SNIFF_SIZE]):
+        return []
+    if buf.find(b'\r') != -1:
+        # Text mode translates CR line endings, which $ relies on
+        return _search_text(filepath, regex, root, limit, deadline)
+    
+    rel = str(filepath.relative_to(root))
+    matches = []
+    line_num = 1
+    counted = 0
+    pos = 0
+    end = len(buf)
+    window = 0
+    candidates = 0
+    while pos < end and (limit is None or len(matches) < limit):
+        if pos >= window or candidates == CHECK_EVERY:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            candidates = 0
+        if pos >= window:
+            window = buf.find(b'\n', pos + SCAN_WINDOW)
+            window = end if window == -1 else window + 1
+        hit = prefilter.search(buf, pos, window)
+        if hit is None:
+            pos = window
+            continue
+        candidates += 1
+        start = buf.rfind(b'\n', 0, hit.start()) + 1
+        stop = buf.find(b'\n', hit.start())
+        stop = end if stop == -1 else stop + 1
+        line_num += _count_newlines(buf, counted, start)
+        counted = start
+        
+        line = buf[start:stop].decode('utf-8', errors='replace')
+        for match in regex.finditer(line):
+            matches.append(SearchMatch(
+                file=rel,
+                line_number=line_num,
+                line_content=line.strip(),
+                match=match.group(),
+                group=match.lastgroup,
+                pattern=_pattern_of(regex, match)
+            ))
+        pos = stop
+    return matches[:limit]
+
+def _search_text(filepath: Path, regex, root: Path, limit: Optional[int] = None,
+                 deadline: Optional[float] = None) -> List[SearchMatch]:
+    """Search a file line by line in text mode."""
+    matches = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            if limit is not None and len(matches) >= limit:
+                break
+            if (deadline is not None and line_num % CHECK_EVERY == 0
+                    and time.monotonic() >= deadline):
+                break
+            for match in regex.finditer(line):
+                matches.append(SearchMatch(
+                    file=str(filepath.relative_to(root)),
+                    line_number=line_num,
+                    line_content=line.strip(),
+                    match=match.group(),
+                    group=match.lastgroup,
+                    pattern=_pattern_of(regex, match)
+                ))
+    return matches[:limit]
+
+def _search_chunk(root: Path, regex, files: List[Path],
+                  max_per_file: Optional[int] = None,
+                  max_results: Optional[int] = None,
+                  deadline: Optional[float] = None) -> List[SearchMatch]:
+    """Worker entry point: search a shard of files in a child process."""
+    results = []
+    for file_path in files:
+        limit = _file_limit(max_per_file, max_results, len(results))
+        if limit == 0 or (deadline is not None and time.monotonic() >= deadline):
+            break
+        try:
+            results.extend(search_file(file_path, regex, root, limit, deadline))
+        except (UnicodeDecodeError, OSError):
+            continue
+    return results
+
+def _file_limit(max_per_file: Optional[int], max_results: Optional[int],
+                found: int) -> Optional[int]:
+    """Matches the next file may contribute, or None for no limit."""
+    limits = [n for n in (max_per_file, None if max_results is None else max_results - found)
+              if n is not None]
+    return max(min(limits), 0) if limits else None
 
 class Search:
     """Search files and content."""
     
-    def __init__(self, working_dir: str = "."):
+    CHUNK_SIZE = 64  # Files per worker task
+    
+    def __init__(self, working_dir: str = ".", index: bool = False, workers: int = 1,
+                 ignore: Optional[List[str]] = None):
         self.working_dir = Path(working_dir).resolve()
+        # Skips .gitignore'd paths plus the ignore list (default: tools.search.ignore)
+        self.walker = Walker(str(self.working_dir), ignore)
+        # Worker processes for grep; 0 or None means one per CPU
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.index = None
+        self.paths = None  # Fuzzy finder path index, built on first use
+        self.symbols = None  # Symbol index, built on first use
+        self.vectors = None  # Semantic index, built on first use
+        if index:
+            from .search_index import TrigramIndex
+            self.index = TrigramIndex(str(self.working_dir), walker=self.walker)
     
-    def find_files(self, pattern: str, path: str = ".") -> List[str]:
+    def find_files(self, pattern: str, path: str = ".",
+                   max_results: Optional[int] = None,
+                   timeout: Optional[float] = None) -> List[str]:
         """Find files matching glob pattern."""
+        return list(self.iter_find(pattern, path, max_results, timeout))
+    
+    def iter_find(self, pattern: str, path: str = ".",
+                  max_results: Optional[int] = None,
+                  timeout: Optional[float] = None) -> Iterator[str]:
+        """Yield paths matching glob pattern, stopping the walk at max_results
+        or once timeout seconds have passed."""
         search_path = self._resolve_path(path)
-        matches = list(search_path.rglob(pattern))
-        return [str(m.relative_to(self.working_dir)) for m in matches]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if max_results == 0:
+            return
+        
+        found = 0
+        for entry in self.walker.walk(search_path, pattern, dirs=True, deadline=deadline):
+            yield str(Path(entry.path).relative_to(self.working_dir))
+            found += 1
+            if found == max_results:
+                return
+    
+    def fuzzy_find(self, query: str, limit: int = 20) -> List[str]:
+        """Find files whose path contains query as a subsequence, best first."""
+        if self.paths is None:
+            from .fuzzy import PathIndex
+            self.paths = PathIndex(str(self.working_dir), walker=self.walker)
+        return [match.path for match in self.paths.search(query, limit)]
     
     def grep(self, pattern: str, path: str = ".", 
-             file_pattern: str = "*") -> List[SearchMatch]:
+             file_pattern: str = "*", max_results: Optional[int] = None,
+             max_per_file: Optional[int] = None,
+             timeout: Optional[float] = None) -> List[SearchMatch]:
         """Search for pattern in files."""
+        return list(self.iter_grep(pattern, path, file_pattern,
+                                   max_results, max_per_file, timeout))
+    
+    def iter_grep(self, pattern: str, path: str = ".", file_pattern: str = "*",
+                  max_results: Optional[int] = None,
+                  max_per_file: Optional[int] = None,
+                  timeout: Optional[float] = None) -> Iterator[SearchMatch]:
+        """Search for pattern, yielding matches in file order as they are found.
+        
+        Walking and scanning stop as soon as max_results matches have been
+        yielded or timeout seconds have passed; max_per_file caps the
+        matches taken from any one file. With more than one worker, files
+        are sharded across a process pool; shards are yielded in walk order,
+        so output is identical to a serial scan.
+        """
+        return self._iter_grep(re.compile(pattern), path, file_pattern,
+                               max_results, max_per_file, timeout)
+    
+    def _iter_grep(self, regex, path: str, file_pattern: str, max_results: Optional[int],
+                   max_per_file: Optional[int],
+                   timeout: Optional[float]) -> Iterator[SearchMatch]:
+        """iter_grep for a compiled regex or a MultiPattern."""
         search_path = self._resolve_path(path)
-        results = []
-        regex = re.compile(pattern)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        files = self._grep_files(search_path, file_pattern, regex, deadline)
+        
+        if self.workers > 1:
+            matches = self._grep_parallel(regex, files, max_per_file, max_results, deadline)
+        else:
+            matches = self._grep_serial(regex, files, max_per_file, max_results, deadline)
+        
+        found = 0
+        try:
+            for match in matches:
+                if found == max_results:
+                    break
+                yield match
+                found += 1
+        finally:
+            matches.close()
+    
+    def grep_many(self, patterns: List[str], path: str = ".", file_pattern: str = "*",
+                  fixed_strings: bool = False, max_results: Optional[int] = None,
+                  max_per_file: Optional[int] = None,
+                  timeout: Optional[float] = None) -> List[SearchMatch]:
+        """Search for several patterns at once; see iter_grep_many."""
+        return list(self.iter_grep_many(patterns, path, file_pattern, fixed_strings,
+                                        max_results, max_per_file, timeout))
+    
+    def iter_grep_many(self, patterns: List[str], path: str = ".", file_pattern: str = "*",
+                       fixed_strings: bool = False, max_results: Optional[int] = None,
+                       max_per_file: Optional[int] = None,
+                       timeout: Optional[float] = None) -> Iterator[SearchMatch]:
+        """Search for all patterns in one pass, tagging each match's pattern.
+        
+        Every file is walked and read once, however many patterns there
+        are. Patterns without regex metacharacters (all of them with
+        fixed_strings) are matched as literals. Each pattern reports all of
+        its matches, so where two hit at the same place (load and
+        load_config) both are yielded, in pattern order.
+        """
+        from .multi_pattern import MultiPattern
+        
+        multi = MultiPattern(patterns, fixed_strings)
+        if not multi:
+            return iter(())
+        return self._iter_grep(multi, path, file_pattern, max_results, max_per_file, timeout)
+    
+    def _grep_serial(self, regex, files: Iterable[Path], max_per_file: Optional[int],
+                     max_results: Optional[int],
+                     deadline: Optional[float]) -> Iterator[SearchMatch]:
+        """Scan files one at a time in this process."""
+        found = 0
+        for file_path in files:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            limit = _file_limit(max_per_file, max_results, found)
+            if limit == 0:
+                return
+            try:
+                matches = search_file(file_path, regex, self.working_dir, limit, deadline)
+            except (UnicodeDecodeError, OSError):
+                continue
+            found += len(matches)
+            yield from matches
+    
+    def _grep_parallel(self, regex, files: Iterable[Path], max_per_file: Optional[int],
+                       max_results: Optional[int],
+                       deadline: Optional[float]) -> Iterator[SearchMatch]:
+        """Scan files on a process pool, falling back to serial if unavailable.
+        
+        Only a few shards per worker are in flight at a time, so the walk
+        and the pool both stop soon after the consumer does.
+        """
+        from concurrent.futures import ProcessPoolExecutor, TimeoutError
+        
+        try:
+            # Termux lacks sem_open, which process pools need
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+        except (ImportError, OSError, NotImplementedError):
+            yield from self._grep_serial(regex, files, max_per_file, max_results, deadline)
+            return
         
-        for file_path in search_path.rglob(file_pattern):
-            if file_path.is_file():
-                try:
-                    matches = self._search_file(file_path, regex)
-                    results.extend(matches)
-                except (UnicodeDecodeError, PermissionError):
+        pending = deque()
+        
+        def submit(chunk):
+            pending.append(executor.submit(
+                _search_chunk, self.working_dir, regex, chunk, max_per_file, max_results, deadline
+            ))
+        
+        def collect():
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            return pending.popleft().result(timeout=remaining)
+        
+        try:
+            chunk = []
+            for file_path in files:
+                chunk.append(file_path)
+                if len(chunk) < self.CHUNK_SIZE:
                     continue
+                submit(chunk)
+                chunk = []
+                if len(pending) >= self.workers * 2:
+                    yield from collect()
+            if chunk:
+                submit(chunk)
+            while pending:
+                yield from collect()
+        except TimeoutError:
+            return
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    def _grep_files(self, search_path: Path, file_pattern: str, regex,
+                    deadline: Optional[float] = None):
+        """Files grep has to scan, narrowed by the trigram index if enabled."""
+        if self.index is not None:
+            self.index.update()
+            candidates = set()
+            for compiled in _regexes(regex):
+                found = self.index.candidates(compiled.pattern, compiled.flags)
+                if found is None:
+                    candidates = None
+                    break
+                candidates |= found
+            if candidates is not None:
+                for rel in sorted(candidates):
+                    file_path = self.working_dir / rel
+                    if (fnmatch(file_path.name, file_pattern)
+                            and (file_path == search_path or search_path in file_path.parents)):
+                        yield file_path
+                return
         
-        return results
+        yield from self.walker.files(search_path, file_pattern, deadline)
+    
+    def find_definition(self, name: str) -> List["Symbol"]:
+        """Where name is defined; "Class.method" narrows by container."""
+        self.build_symbols()
+        return self.symbols.find_definition(name)
+    
+    def find_references(self, name: str, limit: Optional[int] = None) -> List["SymbolRef"]:
+        """Lines that use name, outside its definitions."""
+        self.build_symbols()
+        return self.symbols.find_references(name, limit)
+    
+    def build_symbols(self):
+        """Build or refresh the symbol index; returns the update counts."""
+        if self.symbols is None:
+            from .symbols import SymbolIndex
+            self.symbols = SymbolIndex(str(self.working_dir), walker=self.walker)
+        return self.symbols.update()
+    
+    def semantic_search(self, query: str, limit: int = 10) -> List["SemanticMatch"]:
+        """Chunks of code most similar in meaning to query; needs numpy."""
+        self.build_vectors()
+        return self.vectors.search(query, limit)
+    
+    def build_vectors(self, embedder=None):
+        """Build or refresh the semantic index; returns the update counts.
+        
+        embedder defaults to the offline HashingEmbedder.
+        """
+        if self.vectors is None or embedder is not None:
+            from .semantic import SemanticIndex
+            self.vectors = SemanticIndex(str(self.working_dir), embedder, walker=self.walker)
+        return self.vectors.update()
+    
+    def build_index(self):
+        """Build or refresh the trigram index; returns the update counts."""
+        if self.index is None:
+            from .search_index import TrigramIndex
+            self.index = TrigramIndex(str(self.working_dir), walker=self.walker)
+        return self.index.update()
     
     def _search_file(self, filepath: Path, regex) -> List[SearchMatch]:
         """Search within a single file."""
-        matches = []
-        with open(filepath, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                for match in regex.finditer(line):
-                    matches.append(SearchMatch(
-                        file=str(filepath.relative_to(self.working_dir)),
-                        line_number=line_num,
-                        line_content=line.strip(),
-                        match=match.group()
-                    ))
-        return matches
+        return search_file(filepath, regex, self.working_dir)
     
     def _resolve_path(self, path: str) -> Path:
         """Resolve path relative to working directory."""
@@ -0,0 +1,317 @@
+"""Search index - Persistent trigram index for grep
+
+Maps every 3-byte sequence (ASCII-lowercased) to the files containing it.
+A regex is reduced to the literal runs it must contain; only files holding
+all of their trigrams are scanned. Patterns without a usable literal fall
+back to a full scan. The index is updated incrementally by mtime and size
+and stored with marshal under ~/.termux-cli/cache/index/.
+"""
+
+import hashlib
+import marshal
+import os
+import re
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from utils.helpers import is_binary_data
+
+INDEX_VERSION = 1
+BINARY = -1  # File id for binary files (never candidates)
+UNINDEXED = -2  # File id for files too large to index (always candidates)
+
+def trigrams(data: bytes) -> Set[int]:
+    """Distinct trigrams of ASCII-lowercased data as 24-bit integers."""
+    data = data.lower()
+    return {a << 16 | b << 8 | c for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+def _literal_plan(items) -> List[List[str]]:
+    """Reduce a parsed regex to alternatives of literal runs it must contain."""
+    runs: List[str] = []
+    current: List[str] = []
+    
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+    
+    if len(items) == 1 and items[0][0] is sre_parse.BRANCH:
+        alternatives = []
+        for branch in items[0][1][1]:
+            alternatives.extend(_literal_plan(branch))
+        return alternatives
+    
+    for op, av in items:
+        if op is sre_parse.LITERAL and av < 128:
+            current.append(chr(av))
+            continue
+        flush()
+        inner = None
+        if op is sre_parse.SUBPATTERN:
+            inner = _literal_plan(av[-1])
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            inner = _literal_plan(av[2])
+        if inner is not None and len(inner) == 1:
+            runs.extend(inner[0])
+    flush()
+    return [runs]
+
+def _walk(items) -> Iterable[Tuple]:
+    """Every (op, av) of a parsed regex, nested ones included."""
+    for op, av in items:
+        yield op, av
+        for part in av if isinstance(av, (tuple, list)) else ():
+            for sub in part if isinstance(part, list) else [part]:
+                if isinstance(sub, sre_parse.SubPattern):
+                    yield from _walk(sub)
+
+def _parse(pattern: str, flags: int = 0) -> Optional[Tuple[List, bool]]:
+    """Parsed items of pattern and whether any part of it ignores case,
+    globally or in a scoped (?i:...) group; None if it does not parse."""
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return None
+    items = list(parsed)
+    ignorecase = bool((flags | parsed.state.flags) & re.IGNORECASE) or any(
+        op is sre_parse.SUBPATTERN and av[1] & re.IGNORECASE for op, av in _walk(items))
+    return items, ignorecase
+
+def _case_runs(runs: List[str], ignorecase: bool) -> List[str]:
+    """Runs cut at i, k and s when ignoring case: those also match
+    non-ASCII letters (dotted/dotless I, Kelvin sign, long s)."""
+    if not ignorecase:
+        return runs
+    return [piece for run in runs for piece in re.split(r'[iksIKS]', run)]
+
+def ignores_case(pattern: str, flags: int = 0) -> bool:
+    """True if any part of pattern matches case-insensitively."""
+    parsed = _parse(pattern, flags)
+    return parsed is not None and parsed[1]
+
+def query_trigrams(pattern: str, flags: int = 0) -> Optional[List[Set[int]]]:
+    """Trigram sets (one per alternative) a match requires, or None if any
+    alternative has no literal of three or more characters."""
+    parsed = _parse(pattern, flags)
+    if parsed is None:
+        return None
+    
+    items, ignorecase = parsed
+    query = []
+    for runs in _literal_plan(items):
+        grams: Set[int] = set()
+        for run in _case_runs(runs, ignorecase):
+            grams |= trigrams(run.encode("ascii"))
+        if not grams:
+            return None
+        query.append(grams)
+    return query
+
+def required_literals(pattern: str, flags: int = 0) -> Optional[List[str]]:
+    """One ASCII literal per alternative that every match of pattern must
+    contain (the longest run), or None if an alternative has none.
+    
+    When any part of pattern ignores case, runs are cut as _case_runs
+    describes and the literals are to be matched case-insensitively.
+    """
+    parsed = _parse(pattern, flags)
+    if parsed is None:
+        return None
+    
+    items, ignorecase = parsed
+    literals = []
+    for runs in _literal_plan(items):
+        longest = max(_case_runs(runs, ignorecase), key=len, default="")
+        if not longest:
+            return None
+        literals.append(longest)
+    return literals
+
+class TrigramIndex:
+    """On-disk trigram index of the files under a directory."""
+    
+    MAX_FILE_SIZE = 8 * 1024 * 1024
+    
+    def __init__(self, root: str = ".", index_path: Optional[Path] = None, walker=None):
+        self.root = Path(root).resolve()
+        if walker is None:
+            from .walker import Walker
+            walker = Walker(str(self.root))
+        self.walker = walker
+        if index_path is None:
+            name = hashlib.sha256(str(self.root).encode()).hexdigest()[:16]
+            index_path = Path.home() / ".termux-cli" / "cache" / "index" / f"{name}.trigrams"
+        self.path = Path(index_path)
+        self.files: List[Optional[str]] = []  # file id -> relative path, None if stale
+        self.entries: Dict[str, Tuple[int, int, int]] = {}  # path -> (id, mtime_ns, size)
+        self.postings: Dict[int, bytes] = {}  # trigram -> packed uint32 file ids
+        self._load()
+    
+    def _load(self):
+        """Load the index from disk; a missing or damaged file means empty."""
+        try:
+            with open(self.path, "rb") as f:
+                data = marshal.load(f)
+            if data["version"] != INDEX_VERSION or data["root"] != str(self.root):
+                return
+            self.files = data["files"]
+            self.entries = {path: tuple(entry) for path, entry in data["entries"].items()}
+            self.postings = data["postings"]
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            self.files, self.entries, self.postings = [], {}, {}
+    
+    def save(self):
+        """Write the index atomically."""
+        data = {
+            "version": INDEX_VERSION,
+            "root": str(self.root),
+            "files": self.files,
+            "entries": self.entries,
+            "postings": self.postings,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            marshal.dump(data, f)
+        os.replace(tmp, self.path)
+    
+    def _walk(self) -> Iterable[os.DirEntry]:
+        """Files to index, as entries whose stat results are cached."""
+        own_dir = str(self.path.parent) + os.sep
+        for entry in self.walker.walk(self.root):
+            if not entry.path.startswith(own_dir):
+                yield entry
+    
+    def update(self, paths: Optional[Iterable[Path]] = None) -> Dict[str, int]:
+        """Re-index new and changed files and drop deleted ones.
+
+        Only files whose (mtime_ns, size) changed are read. paths may hold
+        Paths or os.DirEntry objects. Returns counts of added, updated and
+        removed files.
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        seen = set()
+        additions: Dict[int, List[int]] = {}
+        
+        for path in (self._walk() if paths is None else paths):
+            try:
+                st = path.stat()
+                rel = str(Path(path).relative_to(self.root))
+            except (OSError, ValueError):
+                continue
+            seen.add(rel)
+            entry = self.entries.get(rel)
+            if entry is not None and entry[1:] == (st.st_mtime_ns, st.st_size):
+                continue
+            
+            if entry is not None:
+                self._forget(rel)
+                stats["updated"] += 1
+            else:
+                stats["added"] += 1
+            self._add(path, rel, st, additions)
+        
+        for rel in list(self.entries):
+            if rel not in seen:
+                self._forget(rel)
+                del self.entries[rel]
+                stats["removed"] += 1
+        
+        for gram, ids in additions.items():
+            self.postings[gram] = self.postings.get(gram, b"") + array("I", ids).tobytes()
+        
+        if any(stats.values()):
+            if self.stale_ratio() > 0.25:
+                self.compact()
+            self.save()
+        return stats
+    
+    def _add(self, path, rel: str, st: os.stat_result,
+             additions: Dict[int, List[int]]):
+        """Index one file, queueing its postings in additions."""
+        if st.st_size > self.MAX_FILE_SIZE:
+            self.entries[rel] = (UNINDEXED, st.st_mtime_ns, st.st_size)
+            return
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.entries.pop(rel, None)
+            return
+        if is_binary_data(data):
+            self.entries[rel] = (BINARY, st.st_mtime_ns, st.st_size)
+            return
+        
+        file_id = len(self.files)
+        self.files.append(rel)
+        self.entries[rel] = (file_id, st.st_mtime_ns, st.st_size)
+        for gram in trigrams(data):
+            additions.setdefault(gram, []).append(file_id)
+    
+    def _forget(self, rel: str):
+        """Mark a file's old postings as stale."""
+        file_id = self.entries[rel][0]
+        if file_id >= 0:
+            self.files[file_id] = None
+    
+    def stale_ratio(self) -> float:
+        """Fraction of file ids whose postings are stale."""
+        if not self.files:
+            return 0.0
+        return sum(1 for f in self.files if f is None) / len(self.files)
+    
+    def compact(self):
+        """Drop stale file ids from every posting list and renumber."""
+        remap = {}
+        files = []
+        for old_id, rel in enumerate(self.files):
+            if rel is not None:
+                remap[old_id] = len(files)
+                files.append(rel)
+        
+        postings = {}
+        for gram, packed in self.postings.items():
+            ids = array("I")
+            ids.frombytes(packed)
+            kept = array("I", (remap[i] for i in ids if i in remap))
+            if kept:
+                postings[gram] = kept.tobytes()
+        
+        self.files = files
+        self.postings = postings
+        self.entries = {
+            rel: (remap.get(entry[0], entry[0]) if entry[0] >= 0 else entry[0],) + entry[1:]
+            for rel, entry in self.entries.items()
+        }
+    
+    def _ids(self, gram: int) -> Set[int]:
+        ids = array("I")
+        ids.frombytes(self.postings.get(gram, b""))
+        return set(ids)
+    
+    def candidates(self, pattern: str, flags: int = 0) -> Optional[Set[str]]:
+        """Files that may match pattern, or None if it needs a full scan."""
+        query = query_trigrams(pattern, flags)
+        if query is None:
+            return None
+        
+        ids: Set[int] = set()
+        for grams in query:
+            # Intersect the rarest trigrams first
+            ordered = sorted(grams, key=lambda g: len(self.postings.get(g, b"")))
+            matched = self._ids(ordered[0])
+            for gram in ordered[1:]:
+                if not matched:
+                    break
+                matched &= self._ids(gram)
+            ids |= matched
+        
+        result = {self.files[i] for i in ids if self.files[i] is not None}
+        result.update(rel for rel, entry in self.entries.items() if entry[0] == UNINDEXED)
+        return result
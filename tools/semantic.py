@@ -0,0 +1,326 @@
+"""Semantic index - Chunked vector search over the working directory
+
+Text files are cut into chunks of a few dozen lines, each embedded as a
+unit vector. The vectors live in a float32 matrix saved as .npy and opened
+memory-mapped, so a search reads rows straight from the page cache; a
+marshal sidecar holds the file and chunk table. Search is a cosine top-k
+over the matrix in batched matrix-vector products. On update only chunks
+whose text changed are embedded again; the rest are copied over.
+
+Embedders are pluggable: HashingEmbedder works offline with no extra
+models, OllamaEmbedder calls a local Ollama server. Requires numpy.
+"""
+
+import hashlib
+import marshal
+import math
+import os
+import re
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from utils.helpers import BINARY_SNIFF_SIZE, is_binary_data
+
+INDEX_VERSION = 1
+CHUNK_LINES = 40
+MAX_FILE_SIZE = 1024 * 1024
+EMBED_BATCH = 64  # Chunks per embedder call
+SEARCH_BATCH = 65536  # Matrix rows per product
+
+# (file, start line, end line, digest of the embedded text)
+Chunk = Tuple[str, int, int, bytes]
+
+SUBWORD_PATTERN = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+')
+STOPWORDS = {
+    "and", "are", "as", "at", "be", "by", "def", "do", "else", "for", "from", "if",
+    "import", "in", "is", "it", "none", "not", "of", "on", "or", "return", "self",
+    "the", "this", "to", "we", "where", "with",
+}
+
+@dataclass
+class SemanticMatch:
+    """A chunk ranked by similarity to a query."""
+    file: str
+    start_line: int
+    end_line: int
+    score: float
+    text: str = ""
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy package required: pip install numpy")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase subwords, splitting snake_case and camelCase identifiers."""
+    words = []
+    for word in SUBWORD_PATTERN.findall(text):
+        word = word.lower()
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        # Crude stemming so "retries", "retrying" and "retry" meet
+        if word.endswith("ies") and len(word) > 4:
+            word = word[:-3] + "y"
+        else:
+            for suffix in ("ing", "ed", "es", "s"):
+                if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                    word = word[:-len(suffix)]
+                    break
+        words.append(word)
+    return words
+
+class Embedder(ABC):
+    """Turns texts into vectors of a fixed dimension."""
+    
+    name: str = "base"
+    
+    @property
+    def key(self) -> str:
+        """Identifies the vector space; an index built with another is discarded."""
+        return self.name
+    
+    @abstractmethod
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        """A (len(texts), dim) float32 matrix."""
+        pass
+
+class HashingEmbedder(Embedder):
+    """Offline embedder: sublinear term counts of subwords and subword
+    pairs, feature-hashed into dim buckets with a random sign."""
+    
+    name = "hashing"
+    
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+    
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.dim}"
+    
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        _require_numpy()
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = tokenize(text)
+            counts = Counter(words)
+            counts.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+            for feature, tf in counts.items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                weight = 1.0 + math.log(tf)
+                out[row, h % self.dim] += -weight if h & 0x80000000 else weight
+        return out
+
+class OllamaEmbedder(Embedder):
+    """Embeddings from a local Ollama server (e.g. nomic-embed-text)."""
+    
+    name = "ollama"
+    
+    def __init__(self, model: str = "nomic-embed-text", client=None,
+                 base_url: str = "http://localhost:11434"):
+        if client is None:
+            from models.ollama import OllamaModel
+            client = OllamaModel(model=model, base_url=base_url)
+        self.client = client
+        self.model = model
+    
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.model}"
+    
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        _require_numpy()
+        return np.asarray(self.client.embed(texts, model=self.model), dtype=np.float32)
+
+def chunk_text(text: str, lines: int = CHUNK_LINES) -> List[Tuple[int, int, str]]:
+    """(start line, end line, text) windows of a file, 1-based and inclusive."""
+    all_lines = text.splitlines()
+    return [
+        (start + 1, min(start + lines, len(all_lines)), "\n".join(all_lines[start:start + lines]))
+        for start in range(0, len(all_lines), lines)
+    ]
+
+def _normalize(vectors: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+class SemanticIndex:
+    """Persistent chunk embeddings for a directory tree."""
+    
+    def __init__(self, root: str = ".", embedder: Optional[Embedder] = None,
+                 index_path: Optional[Path] = None, walker=None):
+        _require_numpy()
+        self.root = Path(root).resolve()
+        if index_path is None:
+            name = hashlib.sha256(str(self.root).encode()).hexdigest()[:16]
+            index_path = Path.home() / ".termux-cli" / "cache" / "index" / f"{name}.vectors"
+        self.path = Path(index_path)
+        self.matrix_path = self.path.with_name(self.path.name + ".npy")
+        if walker is None:
+            from .walker import Walker
+            walker = Walker(str(self.root))
+        self.walker = walker
+        self.embedder = embedder or HashingEmbedder()
+        # path -> (mtime_ns, size, first row, row count)
+        self.files: Dict[str, Tuple[int, int, int, int]] = {}
+        self.chunks: List[Chunk] = []  # One per matrix row
+        self.matrix = None
+        self._load()
+    
+    def _load(self):
+        """Load the table and map the matrix; anything inconsistent means empty."""
+        try:
+            with open(self.path, "rb") as f:
+                data = marshal.load(f)
+            if (data["version"] != INDEX_VERSION or data["root"] != str(self.root)
+                    or data["embedder"] != self.embedder.key):
+                return
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+            if matrix.ndim != 2 or matrix.shape[0] != len(data["chunks"]):
+                return
+            self.files, self.chunks, self.matrix = data["files"], data["chunks"], matrix
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            self.files, self.chunks, self.matrix = {}, [], None
+    
+    def save(self, matrix: "np.ndarray"):
+        """Write the matrix, then the table that describes it, atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp.npy")
+        np.save(tmp, matrix)
+        os.replace(tmp, self.matrix_path)
+        data = {"version": INDEX_VERSION, "root": str(self.root),
+                "embedder": self.embedder.key, "files": self.files, "chunks": self.chunks}
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            marshal.dump(data, f)
+        os.replace(tmp, self.path)
+        self.matrix = np.load(self.matrix_path, mmap_mode="r")
+    
+    def update(self) -> Dict[str, int]:
+        """Re-chunk new and changed files and embed the chunks not seen before.
+
+        Returns counts of added, updated and removed files and of chunks
+        embedded.
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0, "embedded": 0}
+        current: Dict[str, Tuple[int, int]] = {}
+        for entry in self.walker.walk(self.root):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if st.st_size <= MAX_FILE_SIZE:
+                current[Path(entry.path).relative_to(self.root).as_posix()] = (
+                    st.st_mtime_ns, st.st_size)
+        
+        changed = [rel for rel, stat in current.items()
+                   if rel not in self.files or self.files[rel][:2] != stat]
+        removed = [rel for rel in self.files if rel not in current]
+        if not changed and not removed:
+            return stats
+        for rel in changed:
+            stats["updated" if rel in self.files else "added"] += 1
+        stats["removed"] = len(removed)
+        
+        # Rows of unchanged chunk text can be reused wherever they moved
+        old_rows = {chunk[3]: row for row, chunk in enumerate(self.chunks)}
+        fresh: Dict[str, List[Tuple[int, int, str, bytes]]] = {}
+        for rel in changed:
+            fresh[rel] = self._chunk_file(rel)
+        
+        files: Dict[str, Tuple[int, int, int, int]] = {}
+        chunks: List[Chunk] = []
+        sources: List[int] = []  # Old row per new row, -1 for rows to embed
+        pending: List[Tuple[int, str]] = []
+        for rel in sorted(current):
+            first = len(chunks)
+            if rel in fresh:
+                for start, end, text, digest in fresh[rel]:
+                    row = old_rows.get(digest, -1)
+                    if row == -1:
+                        pending.append((len(chunks), text))
+                    sources.append(row)
+                    chunks.append((rel, start, end, digest))
+            else:
+                _, _, old_first, count = self.files[rel]
+                sources.extend(range(old_first, old_first + count))
+                chunks.extend(self.chunks[old_first:old_first + count])
+            files[rel] = current[rel] + (first, len(chunks) - first)
+        
+        dim = self.matrix.shape[1] if self.matrix is not None else None
+        embedded: List["np.ndarray"] = []
+        for i in range(0, len(pending), EMBED_BATCH):
+            vectors = _normalize(self.embedder.embed([text for _, text in pending[i:i + EMBED_BATCH]]))
+            embedded.append(vectors)
+            dim = vectors.shape[1]
+        stats["embedded"] = len(pending)
+        
+        matrix = np.zeros((len(chunks), dim or 0), dtype=np.float32)
+        sources = np.asarray(sources, dtype=np.int64)
+        kept = np.nonzero(sources >= 0)[0]
+        if len(kept):
+            matrix[kept] = self.matrix[sources[kept]]
+        if pending:
+            matrix[[row for row, _ in pending]] = np.concatenate(embedded)
+        
+        self.files, self.chunks = files, chunks
+        self.save(matrix)
+        return stats
+    
+    def _chunk_file(self, rel: str) -> List[Tuple[int, int, str, bytes]]:
+        """Chunks of a text file with digests of their embedded form."""
+        try:
+            data = (self.root / rel).read_bytes()
+        except OSError:
+            return []
+        if is_binary_data(data[:BINARY_SNIFF_SIZE]):
+            return []
+        result = []
+        for start, end, text in chunk_text(data.decode("utf-8", errors="replace")):
+            if not text.strip():
+                continue
+            # The path is part of the text, so file names count as context
+            text = f"{rel}\n{text}"
+            digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+            result.append((start, end, text, digest))
+        return result
+    
+    def search(self, query: str, limit: int = 10) -> List[SemanticMatch]:
+        """The limit chunks most similar to query, best first."""
+        if self.matrix is None or not len(self.chunks) or limit <= 0:
+            return []
+        vector = _normalize(self.embedder.embed([query]))[0]
+        
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, len(self.chunks), SEARCH_BATCH):
+            scores = self.matrix[start:start + SEARCH_BATCH] @ vector
+            if len(scores) > limit:
+                top = np.argpartition(-scores, limit)[:limit]
+            else:
+                top = np.arange(len(scores))
+            best_scores = np.concatenate([best_scores, scores[top]])
+            best_rows = np.concatenate([best_rows, top + start])
+        order = np.argsort(-best_scores, kind="stable")[:limit]
+        
+        matches = []
+        for i in order:
+            rel, first, last, _ = self.chunks[best_rows[i]]
+            matches.append(SemanticMatch(rel, first, last, float(best_scores[i]),
+                                         self._read_lines(rel, first, last)))
+        return matches
+    
+    def _read_lines(self, rel: str, first: int, last: int) -> str:
+        try:
+            text = (self.root / rel).read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return ""
+        return "\n".join(text.splitlines()[first - 1:last])
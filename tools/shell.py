@@ -1,9 +1,31 @@
-"""Shell tool - Execute shell commands"""
+"""Shell tool - Execute shell commands
 
-import subprocess
+By default every command runs in a fresh shell. With persistent=True the
+commands share one long-lived bash process instead, so cd, exported
+variables and activated virtualenvs carry over and no shell is started
+per command. Each command is sent as an eval of its quoted text, in a
+one-pass loop, followed by sentinel lines on stdout and stderr; the reader
+collects both streams up to their sentinels and takes the exit code from
+the stdout one. A command that times out has the shell and its child
+processes interrupted; the shell's SIGINT trap breaks out of the loop, so
+the rest of the command line is skipped while the shell and its state are
+kept. (Interrupted inside a shell function, the trap can only return from
+that function, and the line goes on after the call.) A shell that exits
+is restarted for the next command; one that cannot be interrupted, or
+that closes its output, is restarted at once and its state is lost.
+"""
+
+import os
+import selectors
 import shlex
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import uuid
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
 @dataclass
@@ -14,6 +36,187 @@ class ShellResult:
     returncode: int
     command: str
 
+class ShellSession:
+    """One long-lived bash process running commands in turn."""
+    
+    KILL_GRACE = 1.0  # Seconds an interrupted command gets to finish
+    RESTARTED = "Shell restarted, session state lost"
+    
+    # Set before each command, in case the last one replaced it
+    TRAP = ("""trap '__termux_cli_int=1; [ "${FUNCNAME[0]}" ] && return 130; """
+            """break 1000 2>/dev/null' INT\n""")
+    
+    def __init__(self, working_dir: Path):
+        self.working_dir = Path(working_dir)
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+    
+    def start(self):
+        """Start the shell, replacing a dead one."""
+        if self.process is not None:
+            self.close()
+            self.restarts += 1
+        shell = shutil.which("bash") or "/bin/sh"
+        args = [shell, "--noprofile", "--norc"] if shell.endswith("bash") else [shell]
+        self.process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.working_dir,
+            start_new_session=True,
+        )
+    
+    def run(self, command: str, timeout: float) -> Tuple[str, str, int, bool]:
+        """Run command; returns (stdout, stderr, returncode, timed_out)."""
+        with self._lock:
+            if not self.alive:
+                self.start()
+            token = uuid.uuid4().hex
+            script = (
+                self.TRAP +
+                "__termux_cli_int=\n"
+                f"for __termux_cli_once in 1; do eval {shlex.quote(command)} < /dev/null; done\n"
+                "__termux_cli_status=$?\n"
+                '[ "$__termux_cli_int" ] && __termux_cli_status=130\n'
+                f"printf '\\n{token}:%d\\n' $__termux_cli_status\n"
+                f"printf '\\n{token}\\n' >&2\n"
+            )
+            try:
+                self.process.stdin.write(script.encode("utf-8"))
+                self.process.stdin.flush()
+            except OSError:
+                # Died since the liveness check; one restart, then give up
+                self.start()
+                self.process.stdin.write(script.encode("utf-8"))
+                self.process.stdin.flush()
+            
+            out, err = bytearray(), bytearray()
+            marker = f"\n{token}".encode()
+            deadline = time.monotonic() + timeout
+            done = self._read(out, err, marker, deadline)
+            timed_out = done is None
+            if timed_out:
+                self._interrupt()
+                done = self._read(out, err, marker, time.monotonic() + self.KILL_GRACE)
+                if done is None:
+                    self._interrupt(signal.SIGKILL)
+                    done = self._read(out, err, marker, time.monotonic() + self.KILL_GRACE)
+            
+            returncode = -1
+            restarted = False
+            if done:
+                end = out.rindex(marker)
+                returncode = int(out[end + len(marker) + 1:].split(b"\n")[0])
+                del out[end:]
+                del err[err.rindex(marker):]
+            elif done is None:
+                # Stuck in the shell itself, e.g. a loop that traps SIGINT
+                restarted = True
+            else:
+                # A stream closed: the command exited the shell, or
+                # redirected its output away (exec 2>&1) and it lives on
+                try:
+                    returncode = self.process.wait(max(deadline - time.monotonic(), 0))
+                except subprocess.TimeoutExpired:
+                    restarted = True
+            if restarted:
+                self.start()
+                if err and not err.endswith(b"\n"):
+                    err.extend(b"\n")
+                err.extend(self.RESTARTED.encode())
+            return (out.decode("utf-8", errors="replace"),
+                    err.decode("utf-8", errors="replace"), returncode, timed_out)
+    
+    def _read(self, out: bytearray, err: bytearray, marker: bytes,
+              deadline: float) -> Optional[bool]:
+        """Read both streams until their sentinels: True once both arrived,
+        False if the shell exited first, None at the deadline."""
+        stdout = self.process.stdout.fileno()
+        streams = {stdout: out, self.process.stderr.fileno(): err}
+        pending = {fd for fd, buf in streams.items()
+                   if not self._framed(buf, marker, fd == stdout)}
+        with selectors.DefaultSelector() as selector:
+            for fd in pending:
+                selector.register(fd, selectors.EVENT_READ)
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                for key, _ in selector.select(remaining):
+                    data = os.read(key.fd, 65536)
+                    if not data:
+                        return False
+                    buf = streams[key.fd]
+                    buf.extend(data)
+                    if self._framed(buf, marker, key.fd == stdout):
+                        selector.unregister(key.fd)
+                        pending.discard(key.fd)
+        return True
+    
+    @staticmethod
+    def _framed(buf: bytearray, marker: bytes, with_code: bool) -> bool:
+        """True once buf ends with the sentinel (and its exit code line)."""
+        if with_code:
+            end = buf.rfind(marker)
+            return end != -1 and buf.endswith(b"\n") and end + len(marker) < len(buf) - 1
+        return buf.endswith(marker + b"\n")
+    
+    def _interrupt(self, sig: int = signal.SIGINT):
+        """Signal the processes the running command started; SIGINT goes to
+        the shell too, first, so its trap runs as soon as they exit."""
+        pids = _descendants(self.process.pid)
+        if sig == signal.SIGINT:
+            pids.insert(0, self.process.pid)
+        for pid in pids:
+            try:
+                os.kill(pid, sig)
+            except OSError:
+                pass
+    
+    def close(self):
+        """Stop the shell and everything it started."""
+        if self.process is None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            stream.close()
+        self.process = None
+
+def _descendants(pid: int) -> List[int]:
+    """Processes below pid, from /proc; empty where there is no /proc."""
+    children = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; fields resume after ")"
+        ppid = int(stat[stat.rindex(b")") + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
 class Shell:
     """Execute shell commands safely."""
     
@@ -24,11 +227,12 @@ class Shell:
         ':(){:|:&};:',  # Fork bomb
     }
     
-    def __init__(self, working_dir: str = ".", timeout: int = 60):
+    def __init__(self, working_dir: str = ".", timeout: int = 60, persistent: bool = False):
         self.working_dir = Path(working_dir).resolve()
         self.timeout = timeout
+        self.session = ShellSession(self.working_dir) if persistent else None
     
-    def execute(self, command: str) -> ShellResult:
+    def execute(self, command: str, timeout: Optional[float] = None) -> ShellResult:
         """Execute a shell command."""
         # Safety check
         if self._is_dangerous(command):
@@ -39,6 +243,14 @@ class Shell:
                 command=command
             )
         
+        timeout = self.timeout if timeout is None else timeout
+        if self.session is not None:
+            stdout, stderr, returncode, timed_out = self.session.run(command, timeout)
+            if timed_out:
+                stderr += ("\n" if stderr and not stderr.endswith("\n") else "") + "Command timed out"
+                returncode = -1
+            return ShellResult(stdout, stderr, returncode, command)
+        
         try:
             result = subprocess.run(
                 command,
@@ -46,7 +258,7 @@ class Shell:
                 cwd=self.working_dir,
                 capture_output=True,
                 text=True,
-                timeout=self.timeout
+                timeout=timeout
             )
             return ShellResult(
                 stdout=result.stdout,
@@ -62,6 +274,11 @@ class Shell:
                 command=command
             )
     
+    def close(self):
+        """Stop the persistent shell, if any."""
+        if self.session is not None:
+            self.session.close()
+    
     def _is_dangerous(self, command: str) -> bool:
         """Check if command is potentially dangerous."""
         cmd_lower = command.lower()
@@ -0,0 +1,322 @@
+"""Symbol index - Definitions and references for code navigation
+
+Python files are parsed with ast; JavaScript, TypeScript, Go and shell
+files use line-based regex extractors. For every file the index keeps its
+definitions and the set of identifiers it mentions, keyed by (mtime_ns,
+size) so only changed files are parsed again. Changed files are parsed on
+a process pool. The index is stored with marshal next to the trigram
+index under ~/.termux-cli/cache/index/.
+"""
+
+import ast
+import gc
+import hashlib
+import marshal
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+INDEX_VERSION = 1
+MAX_FILE_SIZE = 2 * 1024 * 1024
+
+# Definition tuples as stored: (name, kind, line, container)
+Definition = Tuple[str, str, int, str]
+
+@dataclass
+class Symbol:
+    """A symbol definition."""
+    name: str
+    kind: str
+    file: str
+    line: int
+    container: str = ""  # Enclosing class or function, if any
+    
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.container}.{self.name}" if self.container else self.name
+
+@dataclass
+class SymbolRef:
+    """A line that refers to a symbol."""
+    file: str
+    line: int
+    text: str
+
+IDENT_PATTERN = re.compile(r'[A-Za-z_$][\w$]*')
+
+JS_IDENT = r'[A-Za-z_$][\w$]*'
+JS_PATTERNS = [
+    ("function", re.compile(
+        rf'^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*({JS_IDENT})', re.M)),
+    ("class", re.compile(
+        rf'^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+({JS_IDENT})', re.M)),
+    ("type", re.compile(
+        rf'^\s*(?:export\s+)?(?:declare\s+)?(?:interface|type|enum)\s+({JS_IDENT})', re.M)),
+    ("variable", re.compile(
+        rf'^\s*(?:export\s+)?(?:const|let|var)\s+({JS_IDENT})\s*[:=]', re.M)),
+    ("method", re.compile(
+        rf'^\s+(?:(?:static|async|public|private|protected|readonly|get|set)\s+)*'
+        rf'({JS_IDENT})\s*\([^)]*\)\s*(?::\s*[^{{;]+)?\{{', re.M)),
+]
+JS_NOT_METHODS = {"if", "for", "while", "switch", "catch", "function", "return", "with"}
+
+GO_PATTERNS = [
+    ("method", re.compile(r'^func\s+\([^)]*\)\s*([A-Za-z_]\w*)', re.M)),
+    ("function", re.compile(r'^func\s+([A-Za-z_]\w*)', re.M)),
+    ("type", re.compile(r'^type\s+([A-Za-z_]\w*)', re.M)),
+    ("variable", re.compile(r'^(?:var|const)\s+([A-Za-z_]\w*)', re.M)),
+]
+
+SHELL_PATTERNS = [
+    ("function", re.compile(r'^\s*function\s+([A-Za-z_][\w-]*)', re.M)),
+    ("function", re.compile(r'^\s*([A-Za-z_][\w-]*)\s*\(\)\s*\{?', re.M)),
+]
+
+LANGUAGES = {
+    ".py": "python",
+    ".js": "js", ".jsx": "js", ".mjs": "js", ".cjs": "js", ".ts": "js", ".tsx": "js",
+    ".go": "go",
+    ".sh": "shell", ".bash": "shell", ".zsh": "shell",
+}
+
+def _python_symbols(source: str) -> Tuple[List[Definition], Set[str]]:
+    """Definitions and mentioned names of a Python module.
+    
+    Only module and class bodies (and the blocks nested in them) are
+    visited, so functions defined inside functions are not indexed.
+    """
+    tree = ast.parse(source)
+    definitions: List[Definition] = []
+    
+    def visit(body, container: str, in_class: bool):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if in_class else "function"
+                definitions.append((node.name, kind, node.lineno, container))
+            elif isinstance(node, ast.ClassDef):
+                definitions.append((node.name, "class", node.lineno, container))
+                visit(node.body, node.name, True)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                if container:
+                    continue
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        definitions.append((target.id, "variable", node.lineno, ""))
+            else:
+                # if/try/with blocks at this level
+                for field in ("body", "orelse", "finalbody", "handlers"):
+                    block = getattr(node, field, None)
+                    if isinstance(block, list):
+                        visit(block, container, in_class)
+    
+    visit(tree.body, "", False)
+    return definitions, set(IDENT_PATTERN.findall(source))
+
+def _regex_symbols(source: str, patterns) -> Tuple[List[Definition], Set[str]]:
+    """Definitions found by line-anchored patterns, plus every identifier."""
+    found = {}
+    for kind, pattern in patterns:
+        for match in pattern.finditer(source):
+            name = match.group(1)
+            if kind == "method" and name in JS_NOT_METHODS:
+                continue
+            # The first pattern to claim a position wins (e.g. Go methods)
+            found.setdefault(match.start(1), (name, kind))
+    
+    definitions = []
+    line, counted = 1, 0
+    for pos in sorted(found):
+        line += source.count("\n", counted, pos)
+        counted = pos
+        name, kind = found[pos]
+        definitions.append((name, kind, line, ""))
+    return definitions, set(IDENT_PATTERN.findall(source))
+
+def extract_symbols(source: str, language: str) -> Tuple[List[Definition], Set[str]]:
+    """Definitions and identifiers of a source file in language."""
+    if language == "python":
+        try:
+            return _python_symbols(source)
+        except (SyntaxError, ValueError, RecursionError):
+            patterns = [("function", re.compile(r'^\s*(?:async\s+)?def\s+(\w+)', re.M)),
+                        ("class", re.compile(r'^\s*class\s+(\w+)', re.M))]
+            return _regex_symbols(source, patterns)
+    if language == "js":
+        return _regex_symbols(source, JS_PATTERNS)
+    if language == "go":
+        return _regex_symbols(source, GO_PATTERNS)
+    if language == "shell":
+        return _regex_symbols(source, SHELL_PATTERNS)
+    return [], set()
+
+def _parse_chunk(root: Path, rels: List[str]) -> List[Tuple[str, List[Definition], List[str]]]:
+    """Worker entry point: extract symbols from a shard of files."""
+    results = []
+    # Syntax trees are acyclic and freed by refcount; collecting while
+    # building them only costs time
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for rel in rels:
+            language = LANGUAGES.get(os.path.splitext(rel)[1])
+            try:
+                source = (root / rel).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            definitions, names = extract_symbols(source, language)
+            results.append((rel, definitions, sorted(names)))
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return results
+
+class SymbolIndex:
+    """Persistent index of the definitions in a source tree."""
+    
+    CHUNK_SIZE = 32  # Files per worker task
+    
+    def __init__(self, root: str = ".", index_path: Optional[Path] = None,
+                 walker=None, workers: int = 0):
+        self.root = Path(root).resolve()
+        if index_path is None:
+            name = hashlib.sha256(str(self.root).encode()).hexdigest()[:16]
+            index_path = Path.home() / ".termux-cli" / "cache" / "index" / f"{name}.symbols"
+        self.path = Path(index_path)
+        if walker is None:
+            from .walker import Walker
+            walker = Walker(str(self.root))
+        self.walker = walker
+        # Worker processes for parsing; 0 or None means one per CPU
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        # path -> (mtime_ns, size, definitions, identifiers)
+        self.files: Dict[str, Tuple[int, int, List[Definition], List[str]]] = {}
+        self._definitions: Optional[Dict[str, List[Symbol]]] = None
+        self._mentions: Optional[Dict[str, List[str]]] = None
+        self._load()
+    
+    def _load(self):
+        """Load the index from disk; a missing or damaged file means empty."""
+        try:
+            with open(self.path, "rb") as f:
+                data = marshal.load(f)
+            if data["version"] != INDEX_VERSION or data["root"] != str(self.root):
+                return
+            self.files = data["files"]
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            self.files = {}
+    
+    def save(self):
+        """Write the index atomically."""
+        data = {"version": INDEX_VERSION, "root": str(self.root), "files": self.files}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            marshal.dump(data, f)
+        os.replace(tmp, self.path)
+    
+    def update(self) -> Dict[str, int]:
+        """Parse new and changed source files and drop deleted ones.
+
+        Returns counts of added, updated and removed files.
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        seen = set()
+        changed: Dict[str, Tuple[int, int]] = {}
+        for entry in self.walker.walk(self.root):
+            if os.path.splitext(entry.name)[1] not in LANGUAGES:
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if st.st_size > MAX_FILE_SIZE:
+                continue
+            rel = Path(entry.path).relative_to(self.root).as_posix()
+            seen.add(rel)
+            known = self.files.get(rel)
+            if known is None or known[:2] != (st.st_mtime_ns, st.st_size):
+                stats["updated" if known else "added"] += 1
+                changed[rel] = (st.st_mtime_ns, st.st_size)
+        
+        for rel in [rel for rel in self.files if rel not in seen]:
+            del self.files[rel]
+            stats["removed"] += 1
+        
+        for rel, definitions, names in self._parse(list(changed)):
+            self.files[rel] = changed[rel] + (definitions, names)
+        
+        if any(stats.values()):
+            self._definitions = self._mentions = None
+            self.save()
+        return stats
+    
+    def _parse(self, rels: List[str]) -> Iterable[Tuple[str, List[Definition], List[str]]]:
+        """Parse files on a process pool, falling back to serial if unavailable."""
+        chunks = [rels[i:i + self.CHUNK_SIZE] for i in range(0, len(rels), self.CHUNK_SIZE)]
+        if self.workers <= 1 or len(chunks) <= 1:
+            return _parse_chunk(self.root, rels)
+        
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            # Termux lacks sem_open, which process pools need
+            executor = ProcessPoolExecutor(max_workers=min(self.workers, len(chunks)))
+        except (ImportError, OSError, NotImplementedError):
+            return _parse_chunk(self.root, rels)
+        with executor:
+            results = []
+            for parsed in executor.map(_parse_chunk, [self.root] * len(chunks), chunks):
+                results.extend(parsed)
+            return results
+    
+    def _build_maps(self):
+        """Invert the per-file data into name -> definitions and mentions."""
+        definitions: Dict[str, List[Symbol]] = {}
+        mentions: Dict[str, List[str]] = {}
+        for rel in sorted(self.files):
+            _, _, defs, names = self.files[rel]
+            for name, kind, line, container in defs:
+                definitions.setdefault(name, []).append(Symbol(name, kind, rel, line, container))
+            for name in names:
+                mentions.setdefault(name, []).append(rel)
+        self._definitions, self._mentions = definitions, mentions
+    
+    def find_definition(self, name: str) -> List[Symbol]:
+        """Definitions of name; "Class.method" narrows by container."""
+        if self._definitions is None:
+            self._build_maps()
+        container, _, name = name.rpartition(".")
+        symbols = self._definitions.get(name, [])
+        if container:
+            symbols = [s for s in symbols if s.container == container.rpartition(".")[2]]
+        return symbols
+    
+    def mentioned_in(self, name: str) -> List[str]:
+        """Files whose identifiers include name."""
+        if self._mentions is None:
+            self._build_maps()
+        return self._mentions.get(name, [])
+    
+    def find_references(self, name: str, limit: Optional[int] = None) -> List[SymbolRef]:
+        """Lines that mention name as a whole word, outside its definitions.
+
+        Only files whose identifiers include name are read.
+        """
+        name = name.rpartition(".")[2]
+        defined = {(s.file, s.line) for s in self.find_definition(name)}
+        word = re.compile(rf'(?<![\w$]){re.escape(name)}(?![\w$])')
+        refs = []
+        for rel in self.mentioned_in(name):
+            try:
+                text = (self.root / rel).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            # Only "\n" ends a line, as for the indexed definitions
+            for line_num, line in enumerate(text.split("\n"), 1):
+                if word.search(line) and (rel, line_num) not in defined:
+                    refs.append(SymbolRef(rel, line_num, line.strip()))
+                    if limit is not None and len(refs) >= limit:
+                        return refs
+        return refs
@@ -0,0 +1,248 @@
+"""Walker - .gitignore-aware directory traversal for the file tools
+
+Walks a tree with os.scandir and prunes ignored directories before
+descending into them. Rules come from .gitignore and .ignore files in
+every directory from the repository root down, .git/info/exclude, and the
+configured ignore list (tools.search.ignore), whose patterns match at any
+depth unless they start with a slash. Yields os.DirEntry objects
+so callers can reuse their cached stat results.
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+IGNORE_FILES = (".gitignore", ".ignore")
+
+@dataclass
+class IgnoreRule:
+    """One compiled gitignore pattern."""
+    regex: "re.Pattern"
+    negate: bool
+    dir_only: bool
+
+@dataclass
+class IgnoreRules:
+    """The rules of one ignore file, relative to the directory holding it."""
+    base: str  # Directory relative to the walk top, "" for the top itself
+    rules: List[IgnoreRule]
+    
+    def match(self, rel: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included, None if no rule applies."""
+        if self.base:
+            rel = rel[len(self.base) + 1:]
+        for rule in reversed(self.rules):
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.fullmatch(rel):
+                return not rule.negate
+        return None
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob to a regex over a relative posix path."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            # ** only spans directories as a whole path segment
+            if (pattern.startswith("**", i) and (i == 0 or pattern[i - 1] == "/")
+                    and (i + 2 == n or pattern[i + 2] == "/")):
+                i += 2
+                if i < n:
+                    out.append("(?:.*/)?")
+                    i += 1
+                else:
+                    out.append(".*")
+                continue
+            while i + 1 < n and pattern[i + 1] == "*":
+                i += 1
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+def parse_rules(lines: List[str], floating: bool = False) -> List[IgnoreRule]:
+    """Compile gitignore lines; blank lines and comments are skipped.
+    
+    With floating, only a leading slash anchors a pattern, so "a/b/"
+    matches an a/b directory at any depth.
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.endswith("\\ "):
+            line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # A slash anywhere but the end anchors the pattern to its directory
+        anchored = line.startswith("/") if floating else "/" in line
+        regex = _translate(line.lstrip("/"))
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        try:
+            rules.append(IgnoreRule(re.compile(regex, re.DOTALL), negate, dir_only))
+        except re.error:
+            continue
+    return rules
+
+def _read_rules(path: Path, base: str) -> Optional[IgnoreRules]:
+    try:
+        lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+    except OSError:
+        return None
+    rules = parse_rules(lines)
+    return IgnoreRules(base, rules) if rules else None
+
+def _relative(path: Path, top: Path) -> str:
+    rel = path.relative_to(top).as_posix()
+    return "" if rel == "." else rel
+
+@lru_cache(maxsize=64)
+def _path_regex(pattern: str) -> "re.Pattern":
+    return re.compile("(?:.*/)?" + _translate(pattern), re.DOTALL)
+
+def matches_pattern(rel: str, name: str, pattern: str) -> bool:
+    """Match a walk result against a glob the way Path.rglob would.
+    
+    A pattern with a slash matches the end of rel, and ** stands for zero
+    or more directories: "src/**/x.py" matches src/x.py and src/a/b/x.py.
+    """
+    while pattern.startswith("**/"):
+        pattern = pattern[3:]
+    if "/" in pattern:
+        return _path_regex(pattern).fullmatch(rel) is not None
+    return fnmatchcase(name, pattern)
+
+class Walker:
+    """Walks files under a root, skipping ignored paths."""
+    
+    def __init__(self, root: str = ".", ignore: Optional[List[str]] = None,
+                 gitignore: bool = True):
+        self.root = Path(root).resolve()
+        if ignore is None:
+            from config.defaults import DEFAULTS
+            ignore = DEFAULTS["tools"]["search"]["ignore"]
+        self.ignore = list(ignore)
+        self.gitignore = gitignore
+        self._config_rules = IgnoreRules("", parse_rules(self.ignore, floating=True))
+    
+    def _top(self, start: Path) -> Path:
+        """Directory ignore paths are relative to: the git root or the walk root."""
+        if self.gitignore:
+            for directory in (start, *start.parents):
+                if (directory / ".git").exists():
+                    return directory
+        return self.root if start == self.root or self.root in start.parents else start
+    
+    def _rules_above(self, top: Path, start: Path) -> Tuple[IgnoreRules, ...]:
+        """Rules from top down to (not including) start."""
+        rules = [self._config_rules]
+        if not self.gitignore:
+            return tuple(rules)
+        exclude = _read_rules(top / ".git" / "info" / "exclude", "")
+        if exclude:
+            rules.append(exclude)
+        directory = top
+        for part in start.relative_to(top).parts:
+            for name in IGNORE_FILES:
+                found = _read_rules(directory / name, _relative(directory, top))
+                if found:
+                    rules.append(found)
+            directory = directory / part
+        return tuple(rules)
+    
+    @staticmethod
+    def _ignored(rules: Tuple[IgnoreRules, ...], rel: str, is_dir: bool) -> bool:
+        # Deeper files and later lines take precedence
+        for ruleset in reversed(rules):
+            verdict = ruleset.match(rel, is_dir)
+            if verdict is not None:
+                return verdict
+        return False
+    
+    def walk(self, start: Optional[Path] = None, pattern: str = "*",
+             dirs: bool = False, deadline: Optional[float] = None,
+             recursive: bool = True) -> Iterator[os.DirEntry]:
+        """Yield entries of files (and directories if dirs) matching pattern.
+
+        Ignored directories are pruned without being listed. Symlinked
+        directories are not followed. The walk ends early once
+        time.monotonic() passes deadline; with recursive=False only start
+        itself is listed.
+        """
+        start = Path(start).resolve() if start is not None else self.root
+        top = self._top(start)
+        pending = [(str(start), _relative(start, top), self._rules_above(top, start))]
+        
+        while pending:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            directory, dir_rel, rules = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            
+            if self.gitignore:
+                names = {entry.name for entry in entries}
+                for name in IGNORE_FILES:
+                    if name in names:
+                        found = _read_rules(Path(directory, name), dir_rel)
+                        if found:
+                            rules = rules + (found,)
+            
+            subdirs = []
+            for entry in entries:
+                rel = f"{dir_rel}/{entry.name}" if dir_rel else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if self._ignored(rules, rel, is_dir):
+                    continue
+                if is_dir:
+                    subdirs.append((entry.path, rel, rules))
+                    if not dirs:
+                        continue
+                elif not entry.is_file():
+                    continue
+                if matches_pattern(rel, entry.name, pattern):
+                    yield entry
+            if recursive:
+                pending.extend(reversed(subdirs))
+    
+    def files(self, start: Optional[Path] = None, pattern: str = "*",
+              deadline: Optional[float] = None) -> Iterator[Path]:
+        """Paths of the files walk() yields."""
+        for entry in self.walk(start, pattern, deadline=deadline):
+            yield Path(entry.path)
@@ -5,6 +5,8 @@ import hashlib
 from pathlib import Path
 from typing import Any, Dict, List
 
+BINARY_SNIFF_SIZE = 1024
+
 def ensure_dir(path: str) -> Path:
     """Ensure directory exists."""
     p = Path(path)
@@ -35,11 +37,14 @@ def deep_merge(base: Dict, override: Dict) -> Dict:
             result[key] = value
     return result
 
+def is_binary_data(data: bytes) -> bool:
+    """Check if the start of a buffer looks binary."""
+    return b'\x00' in data[:BINARY_SNIFF_SIZE]
+
 def is_binary_file(filepath: str) -> bool:
     """Check if file is binary."""
     try:
         with open(filepath, 'rb') as f:
-            chunk = f.read(1024)
-            return b'\x00' in chunk
+            return is_binary_data(f.read(BINARY_SNIFF_SIZE))
     except:
         return True
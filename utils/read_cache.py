@@ -0,0 +1,114 @@
+"""Read cache - Shared, content-addressed LRU cache of file text
+
+Entries are keyed by path and validated against (inode, mtime_ns, size) on
+every read, so an edited file is re-read while an unchanged one costs a
+single stat. Contents are stored by hash: files with identical bytes share
+one string in memory and are counted once against the byte cap. The least
+recently read paths are evicted once the cap is exceeded.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# (inode, mtime_ns, size)
+StatKey = Tuple[int, int, int]
+
+class ReadCache:
+    """LRU cache of decoded file contents, deduplicated by hash."""
+    
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_bytes // 4  # Larger files are read but not kept
+        self._entries: "OrderedDict[Path, Tuple[StatKey, bytes]]" = OrderedDict()
+        self._blobs: Dict[bytes, list] = {}  # digest -> [text, size, references]
+        self._lock = threading.Lock()
+        self.bytes_cached = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0  # Bytes served without reading the file
+    
+    @staticmethod
+    def stat_key(path: Path) -> StatKey:
+        st = os.stat(path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
+    def read_text(self, path: Path) -> str:
+        """Read a UTF-8 file like Path.read_text, from memory when unchanged."""
+        path = Path(path).absolute()
+        key = self.stat_key(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                self.bytes_saved += key[2]
+                return self._blobs[entry[1]][0]
+            self.misses += 1
+        
+        data = path.read_bytes()
+        # Universal newlines, as text mode reads would give
+        text = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+        if len(data) > self.max_file_bytes:
+            return text
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            self._drop(path)
+            blob = self._blobs.get(digest)
+            if blob is None:
+                blob = self._blobs[digest] = [text, len(data), 0]
+                self.bytes_cached += len(data)
+            blob[2] += 1
+            self._entries[path] = (key, digest)
+            self._evict()
+            return blob[0]
+    
+    def invalidate(self, path: Optional[Path] = None):
+        """Forget one path, or everything when no path is given."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._blobs.clear()
+                self.bytes_cached = 0
+            else:
+                self._drop(Path(path).absolute())
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, hit rate, bytes saved and current size."""
+        with self._lock:
+            reads = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / reads if reads else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "bytes_cached": self.bytes_cached,
+                "entries": len(self._entries),
+                "blobs": len(self._blobs),
+            }
+    
+    def _drop(self, path: Path):
+        """Remove a path's entry and release its blob (lock held)."""
+        entry = self._entries.pop(path, None)
+        if entry is None:
+            return
+        blob = self._blobs[entry[1]]
+        blob[2] -= 1
+        if blob[2] == 0:
+            del self._blobs[entry[1]]
+            self.bytes_cached -= blob[1]
+    
+    def _evict(self):
+        """Drop least recently read paths until under the cap (lock held)."""
+        while self.bytes_cached > self.max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+
+# Created at import, so threads never race to create it
+_shared = ReadCache()
+
+def get_read_cache() -> ReadCache:
+    """The process-wide cache shared by file tools, memory and commands."""
+    return _shared